@@ -3,6 +3,7 @@ from rasa_sdk import Action, Tracker, FormValidationAction
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
 from rasa_sdk.events import SlotSet, FollowupAction, AllSlotsReset, ActiveLoop
+import os
 import requests
 import datetime
 import re
@@ -12,6 +13,22 @@ import random
 # CONNECT TO FASTAPI BACKEND (Use 127.0.0.1 for stability)
 BACKEND_URL = "http://127.0.0.1:8000"
 
+# Identifies us to the backend's session routes (see ACTION_SERVER_TOKEN there)
+ACTION_HEADERS = {"X-Action-Token": os.getenv("ACTION_SERVER_TOKEN", "")}
+
+# --- HELPER: DOCTOR NAME -> ID ---
+def resolve_doctor_id(doc_name: Text, default: int = 1) -> int:
+    """Best match from the backend's doctor index; the default doctor if nothing matches."""
+    if not doc_name:
+        return default
+    try:
+        resp = requests.get(f"{BACKEND_URL}/appointments/doctors/resolve", params={"name": doc_name, "limit": 1}, timeout=5)
+        if resp.status_code == 200 and resp.json():
+            return resp.json()[0]["id"]
+    except Exception:
+        pass
+    return default
+
 # -------------------------------------------------------------------------
 # 1. GREET & RESTART (Logic: Context Aware)
 # -------------------------------------------------------------------------
@@ -52,6 +69,8 @@ class ActionSuggestNextSteps(Action):
 class ActionRestartConversation(Action):
     def name(self) -> Text: return "action_restart_conversation"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
+        try: requests.delete(f"{BACKEND_URL}/sessions/{tracker.sender_id}", headers=ACTION_HEADERS, timeout=5)
+        except: pass
         return [AllSlotsReset(), FollowupAction("action_suggest_next_steps")]
 
 # -------------------------------------------------------------------------
@@ -90,10 +109,11 @@ class ActionCreateNewPatient(Action):
         payload = {
             "name": slots.get("patient_name"), "email": slots.get("patient_email"),
             "age": int(slots.get("patient_age") or 30), "gender": slots.get("patient_gender"),
-            "health_conditions": slots.get("health_conditions"), "phone": "0000000000"
+            "health_conditions": slots.get("health_conditions"), "phone": "0000000000",
+            "sender_id": tracker.sender_id
         }
         try:
-            resp = requests.post(f"{BACKEND_URL}/patients", json=payload)
+            resp = requests.post(f"{BACKEND_URL}/patients", json=payload, headers=ACTION_HEADERS)
             if resp.status_code == 200:
                 data = resp.json()
                 # Use name from backend or slot
@@ -116,10 +136,18 @@ class ActionLoginPatient(Action):
             dispatcher.utter_message(text="Please provide your Patient ID.")
             return []
         
-        # Simulate Verification/Fetch Name
-        # In a real scenario, you'd GET /patients/{pid} here
-        dispatcher.utter_message(text=f"✅ Login successful for **{pid}**.")
-        return [SlotSet("patient_id", pid), FollowupAction("action_suggest_next_steps")]
+        # Verify against the backend; it also binds this sender's session
+        try:
+            resp = requests.post(f"{BACKEND_URL}/patients/login", json={"sender_id": tracker.sender_id, "patient_id": pid}, headers=ACTION_HEADERS, timeout=5)
+        except:
+            dispatcher.utter_message(text="⚠️ System offline.")
+            return []
+        if resp.status_code != 200:
+            dispatcher.utter_message(text=f"❌ No patient found with ID **{pid}**.")
+            return [SlotSet("patient_id", None)]
+        data = resp.json()
+        dispatcher.utter_message(text=f"✅ Login successful for **{data['name']}** ({data['patient_id']}).")
+        return [SlotSet("patient_id", data['patient_id']), SlotSet("user_name", data['name']), FollowupAction("action_suggest_next_steps")]
 
 class ActionLookupPatientId(Action):
     def name(self) -> Text: return "action_lookup_patient_id"
@@ -193,8 +221,7 @@ class ActionSubmitAppointment(Action):
         doc_name = tracker.get_slot("doctor_name")
         
         # INTEGRATED: Doctor ID Mapping (Crucial for Dashboard)
-        doctor_map = {"Dr. Sarah Smith": 1, "Dr. John Doe": 2, "Any Available Doctor": 1}
-        doc_id = doctor_map.get(doc_name, 1)
+        doc_id = resolve_doctor_id(doc_name)
 
         payload = {
             "patient_id": pid, "doctor_id": doc_id,
@@ -230,29 +257,20 @@ class ActionRunTriage(Action):
     def name(self) -> Text: return "action_run_triage"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         symptoms = tracker.get_slot("symptom_description") or ""
-        
-        # INTEGRATED: Keyword Fallback
-        forced_level = None
-        s_low = symptoms.lower()
-        if any(x in s_low for x in ["chest pain", "heart attack", "unconscious", "stroke"]): forced_level = "EMERGENCY"
-        elif any(x in s_low for x in ["fever", "severe pain", "bleeding"]): forced_level = "URGENT"
-
-        # INTEGRATED: LLM Call
-        prompt = f"""Act as a medical triage AI. Analyze: "{symptoms}". Determine level (Emergency/Urgent/Self-Care) and advice."""
-        
         try:
-            # Attempt to call knowledge endpoint
-            resp = requests.post(f"{BACKEND_URL}/knowledge/query", json={"query": prompt})
-            ai_text = resp.json().get("response", "")
-            if forced_level == "EMERGENCY":
-                dispatcher.utter_message(text=f"🟥 **CRITICAL ALERT**\nYour symptoms suggest a medical emergency.\n\nAI Analysis: {ai_text}")
-            else:
-                dispatcher.utter_message(text=f"**Symptom Analysis:**\n{ai_text}")
-        except:
-            # Fallback if LLM offline
-            msg = "🟥 **EMERGENCY**" if forced_level == "EMERGENCY" else "🟧 **Urgent Care**"
-            dispatcher.utter_message(text=f"{msg}\nBased on keywords, please consult a doctor immediately.")
-
+            # Classified in the backend; emergencies are answered without an LLM call
+            resp = requests.post(f"{BACKEND_URL}/knowledge/triage", json={"query": symptoms, "patient_id": tracker.get_slot("patient_id")}, timeout=30)
+            result = resp.json()
+            level, ai_text = result.get("level"), result.get("response", "")
+        except Exception:
+            level, ai_text = None, ""
+
+        if level == "Critical":
+            dispatcher.utter_message(text=f"🟥 **CRITICAL ALERT**\nYour symptoms suggest a medical emergency.\n\n{ai_text}")
+        elif ai_text:
+            dispatcher.utter_message(text=f"**Symptom Analysis:**\n{ai_text}")
+        else:
+            dispatcher.utter_message(text="🟧 **Urgent Care**\nI couldn't analyze your symptoms right now. If they are severe, call emergency services; otherwise please consult a doctor.")
         return [FollowupAction("action_suggest_next_steps")]
 
 class ValidateSymptomCheckerForm(FormValidationAction):
@@ -0,0 +1,230 @@
+# backend/analytics.py
+"""
+Rollup maintenance for the /analytics API.
+
+Management dashboards read small rollup tables (models.DoctorDailyStats,
+LabDailyStats, QueueStats) instead of scanning the operational tables.
+
+Incremental path: booking and status-change endpoints mark what they
+touched (appointment ids, a doctor-day, lab ids, a queue) after they
+commit. Marking is an in-memory set add. Every ANALYTICS_FLUSH_SECONDS the
+refresher recomputes just those doctor-days / lab-days with aggregated
+SQL (delete + insert ... select ... group by, in one transaction), so 200
+updates to the same day cost one recompute.
+
+Periodic path: every ANALYTICS_FULL_REFRESH_SECONDS the whole window
+(ANALYTICS_REFRESH_DAYS_BACK .. _AHEAD) is recomputed, which picks up
+writes made by other workers that died before flushing, or direct SQL
+edits. Both paths are idempotent recomputes; if two workers recompute the
+same key at once, the loser's flush fails and its keys are retried.
+
+Rollups are keyed by values that never change for a row (a slot's doctor
+and date, a lab request's date), so a status change only ever affects the
+key it already belongs to.
+"""
+import asyncio
+from datetime import date, timedelta
+from typing import Iterable, Optional, Set, Tuple
+
+from sqlalchemy import select, delete, insert, func, distinct, tuple_, cast, literal, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import ANALYTICS_FLUSH_SECONDS, ANALYTICS_FULL_REFRESH_SECONDS, ANALYTICS_REFRESH_DAYS_BACK, ANALYTICS_REFRESH_DAYS_AHEAD
+from .database import AsyncSessionLocal
+from .models import Appointment, AvailabilitySlot, LabRequest, Prescription, DoctorDailyStats, LabDailyStats, QueueStats
+
+NO_SHOW_STATUSES = ("No-Show", "No Show")
+
+# Statuses that still need work, per queue (listed explicitly so the count uses the status index)
+OPEN_STATUSES = {
+    "lab": (LabRequest, ("Scheduled", "Pending", "In Progress")),
+    "pharmacy": (Prescription, ("Uploaded", "Processing", "Ordered")),
+}
+
+async def refresh_doctor_days(session: AsyncSession, pairs: Optional[Iterable[Tuple[int, date]]] = None, start: Optional[date] = None, end: Optional[date] = None):
+    """Recomputes DoctorDailyStats for the given (doctor_id, day) pairs, or for every doctor in [start, end]."""
+    s, a = AvailabilitySlot, Appointment
+    if pairs is not None:
+        pairs = list(pairs)
+        if not pairs:
+            return
+        source_filter = tuple_(s.doctor_id, s.date).in_(pairs)
+        rollup_filter = tuple_(DoctorDailyStats.doctor_id, DoctorDailyStats.day).in_(pairs)
+    else:
+        source_filter = s.date.between(start, end)
+        rollup_filter = DoctorDailyStats.day.between(start, end)
+
+    await session.execute(delete(DoctorDailyStats).where(rollup_filter))
+    agg = (
+        select(
+            s.doctor_id,
+            s.date,
+            func.count(distinct(s.id)),
+            func.count(distinct(s.id)).filter(s.is_booked == True),
+            func.count(a.id),
+            func.count(a.id).filter(a.status == "Completed"),
+            func.count(a.id).filter(a.status == "Cancelled"),
+            func.count(a.id).filter(a.status.in_(NO_SHOW_STATUSES)),
+            func.now(),
+        )
+        .select_from(s)
+        .outerjoin(a, a.slot_id == s.id)
+        .where(source_filter, s.doctor_id.is_not(None))
+        .group_by(s.doctor_id, s.date)
+    )
+    await session.execute(insert(DoctorDailyStats).from_select([
+        "doctor_id", "day", "total_slots", "booked_slots", "appointments", "completed", "cancelled", "no_shows", "refreshed_at",
+    ], agg))
+
+async def refresh_lab_days(session: AsyncSession, days: Optional[Iterable[date]] = None, start: Optional[date] = None, end: Optional[date] = None):
+    """Recomputes LabDailyStats for the given request days, or for [start, end]."""
+    lab = LabRequest
+    if days is not None:
+        days = list(days)
+        if not days:
+            return
+        source_filter, rollup_filter = lab.date_requested.in_(days), LabDailyStats.day.in_(days)
+    else:
+        source_filter, rollup_filter = lab.date_requested.between(start, end), LabDailyStats.day.between(start, end)
+
+    done = lab.completed_at.is_not(None)
+    # Rows from before requested_at existed only know the day: measured from its midnight
+    started = func.coalesce(lab.requested_at, cast(lab.date_requested, DateTime))
+    turnaround_hours = func.extract("epoch", lab.completed_at - started) / 3600.0
+    await session.execute(delete(LabDailyStats).where(rollup_filter))
+    agg = (
+        select(
+            lab.date_requested,
+            func.count(lab.id),
+            func.count(lab.id).filter(done),
+            func.coalesce(func.sum(turnaround_hours).filter(done), 0.0),
+            func.now(),
+        )
+        .where(source_filter, lab.date_requested.is_not(None))
+        .group_by(lab.date_requested)
+    )
+    await session.execute(insert(LabDailyStats).from_select(["day", "requested", "completed", "turnaround_hours_total", "refreshed_at"], agg))
+
+async def refresh_queues(session: AsyncSession, queues: Iterable[str]):
+    for queue in queues:
+        model, statuses = OPEN_STATUSES[queue]
+        await session.execute(delete(QueueStats).where(QueueStats.queue == queue))
+        agg = (
+            select(literal(queue), model.status, func.count(model.id), func.now())
+            .where(model.status.in_(statuses))
+            .group_by(model.status)
+        )
+        await session.execute(insert(QueueStats).from_select(["queue", "status", "count", "refreshed_at"], agg))
+
+class AnalyticsRefresher:
+    def __init__(self):
+        self._doctor_days: Set[Tuple[int, date]] = set()
+        self._appointment_ids: Set[int] = set()
+        self._lab_ids: Set[int] = set()
+        self._queues: Set[str] = set()
+        self._lock: Optional[asyncio.Lock] = None
+        self.flushes = 0
+        self.full_refreshes = 0
+
+    # --- Called by write paths after commit ---
+    def mark_doctor_day(self, doctor_id: int, day: date):
+        self._doctor_days.add((doctor_id, day))
+
+    def mark_appointments(self, ids: Iterable[int]):
+        self._appointment_ids.update(ids)
+
+    def mark_labs(self, ids: Iterable[int]):
+        self._lab_ids.update(ids)
+        self._queues.add("lab")
+
+    def mark_queue(self, queue: str):
+        self._queues.add(queue)
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._doctor_days or self._appointment_ids or self._lab_ids or self._queues)
+
+    def _guard(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def flush(self):
+        """Recomputes everything marked since the last flush."""
+        if not self.pending:
+            return
+        async with self._guard():
+            doctor_days, self._doctor_days = self._doctor_days, set()
+            appointment_ids, self._appointment_ids = self._appointment_ids, set()
+            lab_ids, self._lab_ids = self._lab_ids, set()
+            queues, self._queues = self._queues, set()
+            try:
+                async with AsyncSessionLocal() as session:
+                    if appointment_ids:
+                        res = await session.execute(
+                            select(AvailabilitySlot.doctor_id, AvailabilitySlot.date).distinct()
+                            .join(Appointment, Appointment.slot_id == AvailabilitySlot.id)
+                            .where(Appointment.id.in_(appointment_ids))
+                        )
+                        doctor_days.update((d, day) for d, day in res.all())
+                    lab_days = set()
+                    if lab_ids:
+                        res = await session.execute(select(LabRequest.date_requested).distinct().where(LabRequest.id.in_(lab_ids)))
+                        lab_days = set(res.scalars())
+                    await refresh_doctor_days(session, doctor_days)
+                    await refresh_lab_days(session, lab_days)
+                    await refresh_queues(session, queues)
+                    await session.commit()
+                self.flushes += 1
+            except Exception as e:
+                # Keep the keys for the next attempt
+                print(f"ANALYTICS: Flush failed: {e}")
+                self._doctor_days |= doctor_days
+                self._appointment_ids |= appointment_ids
+                self._lab_ids |= lab_ids
+                self._queues |= queues
+
+    async def refresh_window(self, start: Optional[date] = None, end: Optional[date] = None):
+        """Recomputes every rollup in [start, end] (default: the configured window) and the queues."""
+        today = date.today()
+        start = start or today - timedelta(days=ANALYTICS_REFRESH_DAYS_BACK)
+        end = end or today + timedelta(days=ANALYTICS_REFRESH_DAYS_AHEAD)
+        async with self._guard():
+            async with AsyncSessionLocal() as session:
+                await refresh_doctor_days(session, start=start, end=end)
+                await refresh_lab_days(session, start=start, end=end)
+                await refresh_queues(session, OPEN_STATUSES)
+                await session.commit()
+        self.full_refreshes += 1
+        print(f"ANALYTICS: Rollups refreshed for {start} .. {end}.")
+
+    async def run(self):
+        """Background loop: frequent targeted flushes, occasional full window refresh."""
+        since_full = ANALYTICS_FULL_REFRESH_SECONDS # Refresh the window once at startup
+        while True:
+            try:
+                if since_full >= ANALYTICS_FULL_REFRESH_SECONDS:
+                    await self.refresh_window()
+                    since_full = 0.0
+                else:
+                    await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ANALYTICS: Refresh failed: {e}")
+            await asyncio.sleep(ANALYTICS_FLUSH_SECONDS)
+            since_full += ANALYTICS_FLUSH_SECONDS
+
+analytics = AnalyticsRefresher()
+
+async def _refresh_once(start: Optional[date] = None, end: Optional[date] = None):
+    from .database import engine
+    try:
+        await analytics.refresh_window(start, end)
+    finally:
+        await engine.dispose()
+
+if __name__ == "__main__":
+    import sys
+    # python -m backend.analytics [start] [end]  (ISO dates; default: the configured window)
+    asyncio.run(_refresh_once(*[date.fromisoformat(a) for a in sys.argv[1:3]]))
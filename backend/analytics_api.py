@@ -0,0 +1,127 @@
+# backend/analytics_api.py
+"""
+Management analytics, read from the rollup tables only (see analytics.py).
+
+    GET  /analytics/doctors       per-doctor utilization, cancellation and no-show rates
+    GET  /analytics/specialties   the same, summed per specialty
+    GET  /analytics/labs          lab volume and turnaround per request day
+    GET  /analytics/queues        open lab / pharmacy items by status
+
+To recompute a date range now (no HTTP route: it rewrites every rollup in range):
+    python -m backend.analytics [start] [end]
+
+Date filters are inclusive and default to the last 30 days (through today).
+Reads flush this worker's pending changes first, so its own writes are visible
+(after replication, when reads go to a replica; see database.get_read_session).
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import get_read_session
+from .models import Doctor, DoctorDailyStats, LabDailyStats, QueueStats
+from .analytics import analytics
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"]
+)
+
+def _window(start: Optional[date], end: Optional[date]):
+    end = end or date.today()
+    return start or end - timedelta(days=29), end
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole, 3) if whole else 0.0
+
+def _utilization(row) -> Dict[str, Any]:
+    return {
+        "total_slots": row.total_slots,
+        "booked_slots": row.booked_slots,
+        "open_slots": row.total_slots - row.booked_slots,
+        "utilization": _rate(row.booked_slots, row.total_slots),
+        "appointments": row.appointments,
+        "completed": row.completed,
+        "cancelled": row.cancelled,
+        "no_shows": row.no_shows,
+        "cancellation_rate": _rate(row.cancelled, row.appointments),
+        "no_show_rate": _rate(row.no_shows, row.appointments),
+    }
+
+_SUMS = [func.sum(getattr(DoctorDailyStats, c)).label(c) for c in ("total_slots", "booked_slots", "appointments", "completed", "cancelled", "no_shows")]
+
+@router.get("/doctors")
+async def doctor_utilization(start: Optional[date] = None, end: Optional[date] = None, doctor_id: Optional[int] = None, daily: bool = False, db: AsyncSession = Depends(get_read_session)):
+    """Totals per doctor over the range; daily=true adds one entry per day."""
+    await analytics.flush()
+    start, end = _window(start, end)
+    stmt = (
+        select(Doctor.id, Doctor.name, Doctor.specialty, *_SUMS)
+        .join(DoctorDailyStats, DoctorDailyStats.doctor_id == Doctor.id)
+        .where(DoctorDailyStats.day.between(start, end))
+        .group_by(Doctor.id, Doctor.name, Doctor.specialty)
+        .order_by(Doctor.name)
+    )
+    if doctor_id is not None:
+        stmt = stmt.where(Doctor.id == doctor_id)
+    doctors = [{"doctor_id": r.id, "name": r.name, "specialty": r.specialty, **_utilization(r)} for r in (await db.execute(stmt)).all()]
+
+    if daily:
+        days_stmt = select(DoctorDailyStats).where(DoctorDailyStats.day.between(start, end)).order_by(DoctorDailyStats.day)
+        if doctor_id is not None:
+            days_stmt = days_stmt.where(DoctorDailyStats.doctor_id == doctor_id)
+        by_doctor: Dict[int, list] = {}
+        for d in (await db.execute(days_stmt)).scalars():
+            by_doctor.setdefault(d.doctor_id, []).append({"day": d.day, **_utilization(d)})
+        for doc in doctors:
+            doc["days"] = by_doctor.get(doc["doctor_id"], [])
+
+    return {"start": start, "end": end, "doctors": doctors}
+
+@router.get("/specialties")
+async def specialty_utilization(start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_read_session)):
+    await analytics.flush()
+    start, end = _window(start, end)
+    res = await db.execute(
+        select(Doctor.specialty, func.count(func.distinct(Doctor.id)).label("doctors"), *_SUMS)
+        .join(DoctorDailyStats, DoctorDailyStats.doctor_id == Doctor.id)
+        .where(DoctorDailyStats.day.between(start, end))
+        .group_by(Doctor.specialty)
+        .order_by(Doctor.specialty)
+    )
+    return {"start": start, "end": end, "specialties": [{"specialty": r.specialty, "doctors": r.doctors, **_utilization(r)} for r in res.all()]}
+
+@router.get("/labs")
+async def lab_turnaround(start: Optional[date] = None, end: Optional[date] = None, db: AsyncSession = Depends(get_read_session)):
+    await analytics.flush()
+    start, end = _window(start, end)
+    res = await db.execute(select(LabDailyStats).where(LabDailyStats.day.between(start, end)).order_by(LabDailyStats.day))
+    days = res.scalars().all()
+    requested = sum(d.requested for d in days)
+    completed = sum(d.completed for d in days)
+    hours = sum(d.turnaround_hours_total for d in days)
+    return {
+        "start": start, "end": end,
+        "requested": requested,
+        "completed": completed,
+        "completion_rate": _rate(completed, requested),
+        "avg_turnaround_hours": round(hours / completed, 1) if completed else None,
+        "days": [{
+            "day": d.day, "requested": d.requested, "completed": d.completed,
+            "avg_turnaround_hours": round(d.turnaround_hours_total / d.completed, 1) if d.completed else None,
+        } for d in days],
+    }
+
+@router.get("/queues")
+async def queue_depth(db: AsyncSession = Depends(get_read_session)):
+    await analytics.flush()
+    res = await db.execute(select(QueueStats).order_by(QueueStats.queue, QueueStats.status))
+    queues: Dict[str, Dict[str, Any]] = {}
+    for q in res.scalars():
+        entry = queues.setdefault(q.queue, {"open": 0, "by_status": {}, "refreshed_at": q.refreshed_at})
+        entry["open"] += q.count
+        entry["by_status"][q.status] = q.count
+    return queues
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Body, UploadFile, File, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -11,15 +11,27 @@ import requests
 import base64
 
 # --- IMPORTS ---
-from .database import get_async_session
+from .database import get_async_session, get_read_session
 from . import models as db_models
 from . import schemas as api_schemas
+from .patient_cache import patient_cache, PatientConflictError
+from .doctor_directory import doctor_directory
+from .specialties import resolve_specialty
+from .analytics import analytics
+from .status_updates import completion_time
 from dotenv import load_dotenv
 
 load_dotenv() 
 
 router = APIRouter()
 
+async def ensure_guest(session: AsyncSession, pid: str, **defaults):
+    """patient_cache.ensure, with an email clash reported as 409 instead of a 500."""
+    try:
+        return await patient_cache.ensure(session, pid, **defaults)
+    except PatientConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 # =========================================================================
 # ZOOM API HELPER
 # =========================================================================
@@ -50,17 +62,27 @@ def generate_zoom_link(topic: str, start_time: str):
 # 1. DOCTORS (REMOVED JOHN DOE)
 # =========================================================================
 @router.get("/appointments/doctors", response_model=List[api_schemas.Doctor])
-async def get_all_doctors(session: AsyncSession = Depends(get_async_session)):
+async def get_all_doctors(session: AsyncSession = Depends(get_read_session)):
     result = await session.execute(select(db_models.Doctor))
     all_docs = result.scalars().all()
     # FILTER: Remove John Doe
     return [d for d in all_docs if "John Doe" not in d.name and "Doe" not in d.name]
 
+# Declared before /doctors/{specialty} so "resolve" isn't taken for a specialty
+@router.get("/appointments/doctors/resolve", response_model=List[api_schemas.DoctorMatch])
+async def resolve_doctor(name: str, limit: int = Query(5, ge=1, le=50), specialty: Optional[str] = None, session: AsyncSession = Depends(get_read_session)):
+    """Ranked doctors for a typed or spoken name ("Dr. Smith", "sarah", "smiht"), best first."""
+    return await doctor_directory.resolve(session, name, limit=limit, specialty=specialty)
+
 @router.get("/appointments/doctors/{specialty}", response_model=List[api_schemas.Doctor])
-async def get_doctors_by_specialty(specialty: str, session: AsyncSession = Depends(get_async_session)):
+async def get_doctors_by_specialty(specialty: str, session: AsyncSession = Depends(get_read_session)):
     clean_spec = unquote(specialty)
-    result = await session.execute(select(db_models.Doctor).where(db_models.Doctor.specialty.ilike(f"%{clean_spec}%")))
-    docs = result.scalars().all() or (await session.execute(select(db_models.Doctor))).scalars().all()
+    # Exact lookup of the normalized name/alias ("heart" -> Cardiology), then doctors by FK
+    spec = await resolve_specialty(session, clean_spec)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown specialty: {clean_spec}")
+    result = await session.execute(select(db_models.Doctor).where(db_models.Doctor.specialty_id == spec.id))
+    docs = result.scalars().all()
     # FILTER: Remove John Doe
     return [d for d in docs if "John Doe" not in d.name and "Doe" not in d.name]
 
@@ -100,11 +122,7 @@ async def book_appointment(payload: dict = Body(...), session: AsyncSession = De
         mode = payload.get("consultation_mode", "In-Person")
 
         # Patient
-        res = await session.execute(select(db_models.Patient).where(db_models.Patient.patient_id == pid))
-        patient = res.scalars().first()
-        if not patient:
-            patient = db_models.Patient(patient_id=pid, name="Guest User", email=f"{pid}@guest.com", phone="000", age=0, gender="U")
-            session.add(patient); await session.flush()
+        patient = await ensure_guest(session, pid, name="Guest User", email=f"{pid}@guest.com", phone="000", age=0, gender="U")
 
         # Doctor - STRICT CHECK (No fallback to Sarah Smith)
         doctor = await session.get(db_models.Doctor, doc_id)
@@ -137,7 +155,11 @@ async def book_appointment(payload: dict = Body(...), session: AsyncSession = De
             reason=payload.get("reason"), consultation_mode=mode, meeting_link=zoom_url, status="Scheduled"
         )
         session.add(new_appt); await session.commit()
+        patient_cache.remember(patient)
+        analytics.mark_doctor_day(doc_id, appt_date)
         return {"message": "Booked", "meeting_link": zoom_url}
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"ERROR: {e}")
         raise HTTPException(500, str(e))
@@ -152,23 +174,17 @@ class LabBooking(BaseModel):
 
 @router.post("/appointments/book_lab")
 async def book_lab_test(payload: LabBooking, session: AsyncSession = Depends(get_async_session)):
-    res = await session.execute(select(db_models.Patient).where(db_models.Patient.patient_id == payload.patient_id))
-    patient = res.scalars().first()
+    patient = await patient_cache.by_patient_id(session, payload.patient_id)
     if not patient: raise HTTPException(404, "Patient not found.")
-    new_lab = db_models.LabRequest(patient_id=patient.id, test_name=payload.test_name, status="Scheduled", date_requested=date.today())
+    new_lab = db_models.LabRequest(patient_id=patient.id, test_name=payload.test_name, status="Scheduled", date_requested=date.today(), requested_at=datetime.now())
     session.add(new_lab); await session.commit()
+    analytics.mark_labs([new_lab.id])
     return {"message": "Lab Scheduled", "id": new_lab.id}
 
 @router.post("/appointments/upload_prescription")
 async def upload_prescription(patient_id: str = Body(...), file: UploadFile = File(...), session: AsyncSession = Depends(get_async_session)):
-    # 1. Find Patient
-    res = await session.execute(select(db_models.Patient).where(db_models.Patient.patient_id == patient_id))
-    patient = res.scalars().first()
-    
-    # 2. Auto-create Guest if missing (crucial for "Guest" uploads)
-    if not patient:
-        patient = db_models.Patient(patient_id=patient_id, name="Guest", email=f"{patient_id}@guest.com", phone="000", age=0, gender="U")
-        session.add(patient); await session.flush()
+    # 1-2. Find Patient, auto-creating a Guest if missing (crucial for "Guest" uploads)
+    patient = await ensure_guest(session, patient_id, name="Guest", email=f"{patient_id}@guest.com", phone="000", age=0, gender="U")
 
     # 3. Save File
     if not os.path.exists("uploads"): os.makedirs("uploads")
@@ -182,15 +198,17 @@ async def upload_prescription(patient_id: str = Body(...), file: UploadFile = Fi
         status="Uploaded"
     )
     session.add(new_rx); await session.commit()
+    patient_cache.remember(patient)
+    analytics.mark_queue("pharmacy")
     return {"message": "Uploaded"}
 
 # =========================================================================
 # 5. CONSOLIDATED STATUS
 # =========================================================================
+# Primary, not the replica: the chat shows this right after a booking
 @router.get("/appointments/status/{patient_id}")
 async def get_patient_status(patient_id: str, session: AsyncSession = Depends(get_async_session)):
-    res = await session.execute(select(db_models.Patient).where(db_models.Patient.patient_id == patient_id))
-    p = res.scalars().first()
+    p = await patient_cache.by_patient_id(session, patient_id)
     if not p: return {"records": []}
 
     # Appointments
@@ -225,15 +243,15 @@ async def get_patient_status(patient_id: str, session: AsyncSession = Depends(ge
 async def order_otc_medicines(payload: dict = Body(...), session: AsyncSession = Depends(get_async_session)):
     try:
         pid = payload.get("patient_id")
-        res = await session.execute(select(db_models.Patient).where(db_models.Patient.patient_id == pid))
-        p = res.scalars().first()
-        if not p:
-            p = db_models.Patient(patient_id=pid, name="Guest", email=f"{pid}@g.com", phone="0", age=0, gender="U")
-            session.add(p); await session.flush()
+        p = await ensure_guest(session, pid, name="Guest", email=f"{pid}@g.com", phone="0", age=0, gender="U")
         
         order = db_models.Prescription(patient_id=p.id, image_filename="OTC Medicines Kit", status="Ordered")
         session.add(order); await session.commit()
+        patient_cache.remember(p)
+        analytics.mark_queue("pharmacy")
         return {"message": "OTC Ordered"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, str(e))
 
@@ -241,7 +259,7 @@ async def order_otc_medicines(payload: dict = Body(...), session: AsyncSession =
 # 7. DASHBOARDS
 # =========================================================================
 @router.get("/appointments/dashboard/doctor/{doctor_id}")
-async def get_doctor_dashboard(doctor_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_doctor_dashboard(doctor_id: int, session: AsyncSession = Depends(get_read_session)):
     res = await session.execute(select(db_models.Appointment).where(db_models.Appointment.doctor_id == doctor_id).options(selectinload(db_models.Appointment.patient), selectinload(db_models.Appointment.slot)).order_by(db_models.Appointment.id.desc()))
     records = []
     for a in res.scalars().all():
@@ -260,13 +278,13 @@ async def get_doctor_dashboard(doctor_id: int, session: AsyncSession = Depends(g
     return {"records": records, "role": f"Dr. {doc_name}"}
 
 @router.get("/appointments/dashboard/lab")
-async def get_lab_dashboard(session: AsyncSession = Depends(get_async_session)):
+async def get_lab_dashboard(session: AsyncSession = Depends(get_read_session)):
     res = await session.execute(select(db_models.LabRequest).options(selectinload(db_models.LabRequest.patient)).order_by(db_models.LabRequest.id.desc()))
     records = [{"id": l.id, "type": "Lab Test", "title": l.patient.name, "subtitle": l.test_name, "date": str(l.date_requested), "status": l.status} for l in res.scalars().all()]
     return {"records": records, "role": "Central Lab"}
 
 @router.get("/appointments/dashboard/pharmacy")
-async def get_pharmacy_dashboard(session: AsyncSession = Depends(get_async_session)):
+async def get_pharmacy_dashboard(session: AsyncSession = Depends(get_read_session)):
     res = await session.execute(select(db_models.Prescription).options(selectinload(db_models.Prescription.patient)).order_by(db_models.Prescription.id.desc()))
     records = [{"id": p.id, "type": "Pharmacy", "title": p.patient.name, "subtitle": p.image_filename, "date": str(p.created_at), "status": p.status} for p in res.scalars().all()]
     return {"records": records, "role": "Pharmacy"}
@@ -274,17 +292,23 @@ async def get_pharmacy_dashboard(session: AsyncSession = Depends(get_async_sessi
 @router.put("/appointments/update/appointment/{appt_id}")
 async def update_appt_status(appt_id: int, status: str = Body(..., embed=True), session: AsyncSession = Depends(get_async_session)):
     appt = await session.get(db_models.Appointment, appt_id)
-    if appt: appt.status = status; await session.commit()
+    if appt:
+        appt.status = status; await session.commit()
+        analytics.mark_appointments([appt_id])
     return {"message": "Updated"}
 
 @router.put("/appointments/update/lab/{id}")
 async def update_lab_status(id: int, status: str = Body(..., embed=True), session: AsyncSession = Depends(get_async_session)):
     item = await session.get(db_models.LabRequest, id)
-    if item: item.status = status; await session.commit()
+    if item:
+        item.status = status; item.completed_at = completion_time(status, item.completed_at); await session.commit()
+        analytics.mark_labs([id])
     return {"message": "Updated"}
 
 @router.put("/appointments/update/pharmacy/{id}")
 async def update_pharmacy_status(id: int, status: str = Body(..., embed=True), session: AsyncSession = Depends(get_async_session)):
     item = await session.get(db_models.Prescription, id)
-    if item: item.status = status; await session.commit()
+    if item:
+        item.status = status; await session.commit()
+        analytics.mark_queue("pharmacy")
     return {"message": "Updated"}
\ No newline at end of file
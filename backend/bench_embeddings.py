@@ -0,0 +1,97 @@
+# backend/bench_embeddings.py
+"""
+Compares embedding backends: startup time, resident memory and queries/sec.
+
+    python -m backend.bench_embeddings                  # all backends
+    python -m backend.bench_embeddings onnx huggingface
+
+Each backend runs in its own subprocess so RSS and import time are measured
+from a cold interpreter, the way a fresh uvicorn worker would see them.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import subprocess
+
+QUERIES = [
+    "What is the co-pay for a specialist visit?",
+    "Do you accept Medicaid?",
+    "What happens if I cancel late?",
+    "When is the pharmacy open?",
+    "Do I need to fast before a blood test?",
+    "How long do lab results take?",
+    "Is Aetna PPO accepted?",
+    "How much is a no-show fee?",
+]
+SEQUENTIAL_QUERIES = 200
+CONCURRENT_QUERIES = 400
+CONCURRENCY = 32
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_worker(backend: str) -> dict:
+    os.environ["EMBEDDING_BACKEND"] = backend
+    started = time.perf_counter()
+    from .embeddings import MicroBatchingEmbeddings, create_embeddings
+    model = MicroBatchingEmbeddings(create_embeddings(backend))
+    model.embed_query("warm up")
+    startup = time.perf_counter() - started
+
+    # One query at a time (old behaviour)
+    t0 = time.perf_counter()
+    for i in range(SEQUENTIAL_QUERIES):
+        model.embed_query(QUERIES[i % len(QUERIES)])
+    sequential_qps = SEQUENTIAL_QUERIES / (time.perf_counter() - t0)
+
+    # Concurrent callers through the micro-batcher
+    async def burst():
+        sem = asyncio.Semaphore(CONCURRENCY)
+        async def one(i):
+            async with sem:
+                await model.aembed_query(QUERIES[i % len(QUERIES)])
+        t = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(CONCURRENT_QUERIES)))
+        return CONCURRENT_QUERIES / (time.perf_counter() - t)
+    batched_qps = asyncio.run(burst())
+
+    return {
+        "backend": backend,
+        "startup_s": round(startup, 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "sequential_qps": round(sequential_qps, 1),
+        "batched_qps": round(batched_qps, 1),
+        "avg_batch": model.metrics()["avg_batch"],
+    }
+
+def main(backends):
+    rows = []
+    for backend in backends:
+        proc = subprocess.run([sys.executable, "-m", "backend.bench_embeddings", "--worker", backend], capture_output=True, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"{backend}: failed\n{proc.stderr.strip()[-500:]}")
+            continue
+        rows.append(json.loads(lines[-1]))
+
+    if not rows: return
+    cols = ["backend", "startup_s", "rss_mb", "sequential_qps", "batched_qps", "avg_batch"]
+    print(" | ".join(f"{c:>14}" for c in cols))
+    for row in rows:
+        print(" | ".join(f"{str(row[c]):>14}" for c in cols))
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--worker":
+        print(json.dumps(run_worker(sys.argv[2])))
+    else:
+        main(sys.argv[1:] or ["huggingface", "onnx"])
@@ -0,0 +1,78 @@
+# backend/bench_symptoms.py
+"""
+Local symptom extractor vs the LLM path.
+
+    python -m backend.bench_symptoms              # fast path only
+    python -m backend.bench_symptoms --llm        # also time extract_symptoms_from_llm on the fallbacks
+
+Reports the fast-path hit rate over SAMPLES and per-call latency.
+"""
+import sys
+import time
+import asyncio
+import statistics
+
+from .symptom_extractor import extract_symptoms, try_fast_path
+from .config import SYMPTOM_FASTPATH_MIN_COVERAGE
+
+SAMPLES = [
+    "headache and fever",
+    "I have a bad headache and fever since yesterday",
+    "cough and cold",
+    "sore throat, runny nose and sneezing",
+    "I feel dizzy and nauseous",
+    "chest pain and shortness of breath",
+    "stomach ache and diarrhoea for 2 days",
+    "vomiting and fever",
+    "I've had a dry cough for a week but no fever",
+    "No fever, chills or cough. Just a sore throat",
+    "back pain",
+    "itchy skin rash on my arms",
+    "I can't sleep and feel anxious",
+    "fatigue, body aches and chills",
+    "burning when I pee",
+    "heart racing and lightheaded",
+    "my knee is swollen after a fall",
+    "I think I sprained my ankle playing football",
+    "feeling off since my vaccination",
+    "there's a lump on my neck that wasn't there before",
+    "my child keeps pulling at her ear and crying",
+    "weird feeling in my stomach after eating shellfish",
+    "headache",
+    "toothache and swelling",
+    "loss of taste and smell",
+]
+ROUNDS = 2000
+
+def run(with_llm: bool):
+    hits = [q for q in SAMPLES if try_fast_path(q)]
+    misses = [q for q in SAMPLES if q not in hits]
+
+    timings = []
+    for _ in range(ROUNDS):
+        for q in SAMPLES:
+            t = time.perf_counter()
+            extract_symptoms(q)
+            timings.append(time.perf_counter() - t)
+    timings.sort()
+
+    print(f"Fast-path hit rate: {len(hits)}/{len(SAMPLES)} ({len(hits) / len(SAMPLES):.0%}) at min coverage {SYMPTOM_FASTPATH_MIN_COVERAGE}")
+    print(f"Local extractor: median {statistics.median(timings) * 1e6:.1f} us, p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} us")
+    print("\nFalls back to the LLM:")
+    for q in misses:
+        print(f"  coverage {extract_symptoms(q).coverage:.2f}  {q}")
+
+    if with_llm and misses:
+        from .llm_integration import extract_symptoms_from_llm
+        async def llm_timings():
+            out = []
+            for q in misses:
+                t = time.perf_counter()
+                await extract_symptoms_from_llm(q)
+                out.append(time.perf_counter() - t)
+            return out
+        llm = asyncio.run(llm_timings())
+        print(f"\nLLM path: median {statistics.median(llm) * 1e3:.1f} ms over {len(llm)} calls")
+
+if __name__ == "__main__":
+    run("--llm" in sys.argv[1:])
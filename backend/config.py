@@ -6,6 +6,15 @@ from zoneinfo import ZoneInfo
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") # Optional read replica for read-only routes; unset = primary
+
+# --- Database Connection Pools (per worker; the read pool uses the same settings) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10")) # Connections kept open
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20")) # Extra connections under bursts, closed when returned
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30")) # Seconds to wait for a free connection before erroring
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Reconnect connections older than this (load balancer / server idle limits)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true" # Check a connection is alive before handing it out
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100")) # asyncpg prepared statements per connection; 0 behind PgBouncer (transaction mode)
 
 # --- UPDATED: Make Ollama Optional ---
 # We provide a default so it doesn't crash, even if you aren't using it.
@@ -16,6 +25,95 @@ RASA_CORE_URL = os.getenv("RASA_CORE_URL")
 # --- Groq Configuration ---
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq") # Default to groq
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+
+# --- LLM Client Pool ---
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", "300")) # "fake" provider: simulated time to first token
+LLM_FAKE_TOKEN_MS = float(os.getenv("LLM_FAKE_TOKEN_MS", "20")) # "fake" provider: delay per streamed token
+
+# --- LLM Scheduler (priority queue + provider rate limits) ---
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", os.getenv("LLM_MAX_CONNECTIONS", "20")))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3")) # Retries after a 429
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+
+def llm_site_setting(site: str, key: str, default=None):
+    """Per-call-site override, e.g. LLM_TRIAGE_PROVIDER or LLM_RAG_MODEL."""
+    return os.getenv(f"LLM_{site.upper()}_{key}", default)
+
+# --- RAG Index Persistence ---
+# The FAISS index is built once and saved here; workers memory-map it on startup.
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag_index")
+RAG_INDEX_MMAP = os.getenv("RAG_INDEX_MMAP", "true").lower() == "true"
+# Policy library (.md / .txt / PDF-extracted text). Falls back to the built-in sample docs if missing.
+RAG_DOCS_DIR = os.getenv("RAG_DOCS_DIR", "policy_docs")
+RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "256"))
+
+# --- Embedding Backend ("huggingface" = PyTorch sentence-transformers, "onnx" = int8 ONNX on CPU) ---
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface").lower()
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "models/minilm-onnx")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "3"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) # 0 = onnxruntime default
+
+# --- Hybrid Retrieval Gating (scores are alpha*cosine + (1-alpha)*normalized BM25, in [0, 1]) ---
+RAG_HYBRID_ALPHA = float(os.getenv("RAG_HYBRID_ALPHA", "0.7"))
+RAG_CANDIDATES = int(os.getenv("RAG_CANDIDATES", "8"))
+RAG_MIN_RELEVANCE = float(os.getenv("RAG_MIN_RELEVANCE", "0.45")) # Below this: no policy covers it, go to the general LLM (calibration: hybrid_search.py)
+RAG_DIRECT_ANSWER_SCORE = float(os.getenv("RAG_DIRECT_ANSWER_SCORE", "0.8")) # Above this: return the policy text, no LLM
+
+# --- Semantic Answer Cache (RAG + LLM knowledge queries) ---
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")) # Cosine similarity
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+
+# --- Exact-Match LLM Response Cache (SQLite file shared by all workers) ---
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+LLM_RESPONSE_CACHE_PATH = os.getenv("LLM_RESPONSE_CACHE_PATH", "cache/llm_responses.sqlite3")
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "10000"))
+
+# --- Local Symptom Extractor (fast path before the LLM) ---
+SYMPTOM_FASTPATH_ENABLED = os.getenv("SYMPTOM_FASTPATH_ENABLED", "true").lower() == "true"
+SYMPTOM_FASTPATH_MIN_COVERAGE = float(os.getenv("SYMPTOM_FASTPATH_MIN_COVERAGE", "0.6")) # Share of content words matched
+
+# --- Local Triage Classifier (risk level before the LLM) ---
+TRIAGE_TRAINING_FILE = os.getenv("TRIAGE_TRAINING_FILE", os.path.join(os.path.dirname(__file__), "data", "triage_training.csv"))
+TRIAGE_MIN_CONFIDENCE = float(os.getenv("TRIAGE_MIN_CONFIDENCE", "0.6")) # Below this the LLM decides
+
+# --- Chat Sessions (Rasa sender_id -> verified patient) ---
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800")) # Idle time before a login expires
+ACTION_SERVER_TOKEN = os.getenv("ACTION_SERVER_TOKEN") # Shared with the Rasa action server (X-Action-Token); unset = loopback callers only
+
+# --- Patient Identity Cache (patient_id / email -> internal id, name) ---
+PATIENT_CACHE_MAX_ENTRIES = int(os.getenv("PATIENT_CACHE_MAX_ENTRIES", "50000"))
+PATIENT_CACHE_TTL_SECONDS = float(os.getenv("PATIENT_CACHE_TTL_SECONDS", "600"))
+PATIENT_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("PATIENT_CACHE_NEGATIVE_TTL_SECONDS", "30")) # "No such patient" answers
+
+# --- Patient ID Allocation (Postgres sequence, handed out in blocks per worker) ---
+PATIENT_ID_FORMAT = os.getenv("PATIENT_ID_FORMAT", "PID-{n}")
+PATIENT_ID_START = int(os.getenv("PATIENT_ID_START", "100000")) # Above the old random PID-10000..99999 range
+PATIENT_ID_BLOCK_SIZE = int(os.getenv("PATIENT_ID_BLOCK_SIZE", "20")) # IDs reserved per sequence call
+
+# --- Bulk Patient Import ---
+PATIENT_IMPORT_BATCH_SIZE = int(os.getenv("PATIENT_IMPORT_BATCH_SIZE", "1000")) # Rows per multi-row INSERT
+PATIENT_IMPORT_MAX_ERRORS = int(os.getenv("PATIENT_IMPORT_MAX_ERRORS", "1000")) # Row errors listed in the response (all are counted)
+
+# --- Streaming Exports (server-side cursor) ---
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000")) # Rows fetched and written per chunk
+
+# --- Analytics Rollups ---
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "5")) # How often changed doctor-days / lab-days are recomputed
+ANALYTICS_FULL_REFRESH_SECONDS = float(os.getenv("ANALYTICS_FULL_REFRESH_SECONDS", "3600")) # Periodic recompute of the whole window
+ANALYTICS_REFRESH_DAYS_BACK = int(os.getenv("ANALYTICS_REFRESH_DAYS_BACK", "90"))
+ANALYTICS_REFRESH_DAYS_AHEAD = int(os.getenv("ANALYTICS_REFRESH_DAYS_AHEAD", "60")) # Future slots count toward utilization
+
+# --- Doctor Name Resolution ---
+DOCTOR_INDEX_TTL_SECONDS = float(os.getenv("DOCTOR_INDEX_TTL_SECONDS", "300")) # In-memory name index reload interval
+DOCTOR_MATCH_MIN_SCORE = float(os.getenv("DOCTOR_MATCH_MIN_SCORE", "0.27")) # 0..1; below this a name doesn't match
 
 ZOOM_ACCOUNT_ID = os.getenv("ZOOM_ACCOUNT_ID")
 ZOOM_CLIENT_ID = os.getenv("ZOOM_CLIENT_ID")
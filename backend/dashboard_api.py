@@ -4,8 +4,12 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
 from typing import List, Optional
-from .database import get_async_session
+from .database import get_async_session, get_read_session
 from .models import Doctor, Appointment, LabRequest, Prescription
+from .schemas import BatchStatusUpdate, StatusUpdateResult
+from .status_updates import apply_status_batch, completion_time
+from .analytics import analytics
+from .doctor_directory import doctor_directory
 
 router = APIRouter()
 
@@ -20,15 +24,8 @@ async def dashboard_login(creds: DashboardLogin, db: AsyncSession = Depends(get_
         raise HTTPException(401, "Invalid password")
     
     if creds.role == "doctor":
-        # FUZZY MATCHING LOGIC
-        # 1. Try exact match
-        res = await db.execute(select(Doctor).where(Doctor.name.ilike(f"%{creds.username}%")))
-        doc = res.scalars().first()
-        
-        # 2. Try partial match (e.g. user typed "Sarah" -> finds "Dr. Sarah Smith")
-        if not doc:
-             res = await db.execute(select(Doctor).where(Doctor.name.ilike(f"%{creds.username.split()[0]}%")))
-             doc = res.scalars().first()
+        # Ranked fuzzy match (exact name, surname, prefix or typo) via the doctor index
+        doc = await doctor_directory.best(db, creds.username)
 
         if doc:
             return {"success": True, "id": doc.id, "name": doc.name, "role": "doctor"}
@@ -39,7 +36,7 @@ async def dashboard_login(creds: DashboardLogin, db: AsyncSession = Depends(get_
 
 # --- 1. APPOINTMENTS (With Cancellation Reason) ---
 @router.get("/appointments/{user_id}")
-async def get_appointments(user_id: int, role: str = "doctor", db: AsyncSession = Depends(get_async_session)):
+async def get_appointments(user_id: int, role: str = "doctor", db: AsyncSession = Depends(get_read_session)):
     query = select(Appointment).options(selectinload(Appointment.patient), selectinload(Appointment.slot)).order_by(Appointment.id.desc())
     if role == "doctor": query = query.where(Appointment.doctor_id == user_id)
     res = await db.execute(query)
@@ -70,11 +67,12 @@ async def update_status(appt_id: int, status: str = Body(..., embed=True), reaso
         
     db.add(appt)
     await db.commit()
+    analytics.mark_appointments([appt_id])
     return {"success": True}
 
 # --- 2. LAB REQUESTS (Real Data) ---
 @router.get("/labs")
-async def get_labs(db: AsyncSession = Depends(get_async_session)):
+async def get_labs(db: AsyncSession = Depends(get_read_session)):
     res = await db.execute(select(LabRequest).options(selectinload(LabRequest.patient)).order_by(LabRequest.id.desc()))
     return [{"id": l.id, "patient": l.patient.name, "test": l.test_name, "status": l.status, "date": l.date_requested} for l in res.scalars().all()]
 
@@ -83,13 +81,15 @@ async def update_lab_status(lab_id: int, status: str = Body(..., embed=True), db
     lab = await db.get(LabRequest, lab_id)
     if lab:
         lab.status = status
+        lab.completed_at = completion_time(status, lab.completed_at)
         db.add(lab)
         await db.commit()
+        analytics.mark_labs([lab_id])
     return {"success": True}
 
 # --- 3. PRESCRIPTIONS (Image & Verification) ---
 @router.get("/prescriptions")
-async def get_prescriptions(db: AsyncSession = Depends(get_async_session)):
+async def get_prescriptions(db: AsyncSession = Depends(get_read_session)):
     res = await db.execute(select(Prescription).options(selectinload(Prescription.patient)).order_by(Prescription.id.desc()))
     return [{
         "id": p.id, 
@@ -106,4 +106,31 @@ async def update_rx_status(pid: int, status: str = Body(..., embed=True), db: As
         rx.status = status
         db.add(rx)
         await db.commit()
-    return {"success": True}
\ No newline at end of file
+        analytics.mark_queue("pharmacy")
+    return {"success": True}
+
+# --- 4. BATCH STATUS UPDATES (many items, one transaction) ---
+async def _batch_update(db: AsyncSession, model, body: BatchStatusUpdate, **columns):
+    try:
+        return await apply_status_batch(db, model, body.items, **columns)
+    except Exception as e:
+        print(f"ERROR: Batch status update on {model.__tablename__} failed: {e}")
+        raise HTTPException(500, str(e))
+
+@router.patch("/appointments/status", response_model=List[StatusUpdateResult])
+async def batch_update_appointment_status(body: BatchStatusUpdate, db: AsyncSession = Depends(get_async_session)):
+    results = await _batch_update(db, Appointment, body, reason_column="cancellation_reason")
+    analytics.mark_appointments(r.id for r in results if r.updated)
+    return results
+
+@router.patch("/labs/status", response_model=List[StatusUpdateResult])
+async def batch_update_lab_status(body: BatchStatusUpdate, db: AsyncSession = Depends(get_async_session)):
+    results = await _batch_update(db, LabRequest, body, completed_column="completed_at")
+    analytics.mark_labs(r.id for r in results if r.updated)
+    return results
+
+@router.patch("/prescriptions/status", response_model=List[StatusUpdateResult])
+async def batch_update_rx_status(body: BatchStatusUpdate, db: AsyncSession = Depends(get_async_session)):
+    results = await _batch_update(db, Prescription, body)
+    analytics.mark_queue("pharmacy")
+    return results
@@ -6,13 +6,36 @@ from typing import AsyncGenerator # <--- IMPORT THIS
 # --- [START] SECURITY FIX ---
 from .config import DATABASE_URL # Import the secure URL
 # --- [END] SECURITY FIX ---
+from .config import (
+    DATABASE_READ_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE,
+)
 
 if not DATABASE_URL:
     raise ValueError("No DATABASE_URL set in the .env file")
 
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        return {} # SQLite picks its own pool; the sizing options don't apply
+    options = dict(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if "+asyncpg" in url:
+        # SQLAlchemy's prepared-statement cache and asyncpg's own one, per connection
+        options["connect_args"] = {
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
 engine = create_async_engine(
     DATABASE_URL,
     echo=False,
+    **_engine_options(DATABASE_URL),
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -21,6 +44,28 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+# Read-only traffic (dashboards, status checks, exports, analytics) goes to the
+# replica when DATABASE_READ_URL is set, keeping it off the primary's pool.
+# Replicas lag slightly: anything that must see its own write uses the primary.
+if DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        DATABASE_READ_URL,
+        echo=False,
+        **_engine_options(DATABASE_READ_URL),
+    )
+    ReadSessionLocal = async_sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
+else:
+    read_engine = engine
+    ReadSessionLocal = AsyncSessionLocal
+
+def reads_replica(session: AsyncSession) -> bool:
+    """True if the session reads from a (possibly lagging) replica, not the primary."""
+    return read_engine is not engine and session.bind is read_engine
+
 Base = declarative_base()
 
 # --- [START] TYPE HINT FIX ---
@@ -38,4 +83,18 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for read-only routes: an AsyncSession on the read replica
+    (or the primary if none is configured). Don't write through it.
+    """
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
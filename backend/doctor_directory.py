@@ -0,0 +1,164 @@
+# backend/doctor_directory.py
+"""
+Doctor-name resolution.
+
+An in-memory index over all doctors: normalized name tokens ("dr." and
+punctuation stripped), with character trigram postings over the distinct
+tokens. Each query token is matched to its best token in a doctor's name,
+1.0 for an exact or prefix match, otherwise trigram similarity
+|shared| / |union| (pg_trgm style, catches typos). A doctor's score is
+0.9 x the mean over the query tokens, or 1.0 for an exact full name:
+
+    "Dr. Sarah Smith" -> 1.0    "smith" / "sar smi" -> 0.9    "smiht" -> 0.3
+
+Only postings for the query's own tokens and trigrams are visited, so a
+lookup stays well under a millisecond with thousands of doctors.
+
+The index is loaded from the database on first use and reloaded after
+DOCTOR_INDEX_TTL_SECONDS, or right away after invalidate().
+"""
+import re
+import time
+import asyncio
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import DOCTOR_INDEX_TTL_SECONDS, DOCTOR_MATCH_MIN_SCORE
+from .models import Doctor
+from .specialties import resolve_specialty
+
+_TITLE = re.compile(r"^\s*(dr|doctor)\b\.?\s*")
+_WORD = re.compile(r"[a-z0-9]+")
+
+def normalize(name: str) -> str:
+    name = _TITLE.sub("", (name or "").lower())
+    return " ".join(_WORD.findall(name))
+
+def trigrams(text: str) -> Set[str]:
+    # Each word padded like pg_trgm: "  sarah " -> "  s", " sa", "sar", ...
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+@dataclass(frozen=True)
+class DoctorEntry:
+    id: int
+    name: str
+    specialty: Optional[str]
+    specialty_id: Optional[int]
+    normalized: str
+
+@dataclass(frozen=True)
+class DoctorMatch:
+    id: int
+    name: str
+    specialty: Optional[str]
+    score: float
+
+class DoctorIndex:
+    def __init__(self, doctors: List[DoctorEntry]):
+        self.doctors: Dict[int, DoctorEntry] = {d.id: d for d in doctors}
+        self._by_name: Dict[str, Set[int]] = defaultdict(set)
+        self._by_token: Dict[str, Set[int]] = defaultdict(set)
+        for d in doctors:
+            self._by_name[d.normalized].add(d.id)
+            for token in d.normalized.split():
+                self._by_token[token].add(d.id)
+        # Trigram postings over distinct tokens (far fewer than doctors)
+        self._token_grams: Dict[str, Set[str]] = {t: trigrams(t) for t in self._by_token}
+        self._by_trigram: Dict[str, Set[str]] = defaultdict(set)
+        for token, grams in self._token_grams.items():
+            for g in grams:
+                self._by_trigram[g].add(token)
+        self._tokens = sorted(self._by_token) # For prefix lookups
+
+    def _prefixed(self, prefix: str):
+        i = bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            yield self._tokens[i]
+            i += 1
+
+    def _similar_tokens(self, token: str) -> Dict[str, float]:
+        """Name tokens resembling one query token: exact/prefix = 1.0, else trigram similarity."""
+        sims = {t: 1.0 for t in (self._prefixed(token) if len(token) >= 3 else [token] if token in self._by_token else [])}
+        grams = trigrams(token)
+        shared: Counter = Counter()
+        for g in grams:
+            shared.update(self._by_trigram.get(g, ()))
+        for t, n in shared.items():
+            if t not in sims:
+                sims[t] = n / (len(grams) + len(self._token_grams[t]) - n)
+        return sims
+
+    def search(self, query: str, limit: int = 5, specialty_id: Optional[int] = None, min_score: float = DOCTOR_MATCH_MIN_SCORE) -> List[DoctorMatch]:
+        q = normalize(query)
+        if not q:
+            return []
+        q_tokens = q.split()
+
+        # Each query token counts its best-matching token in the doctor's name
+        totals: Counter = Counter()
+        for token in q_tokens:
+            best: Dict[int, float] = {}
+            for t, sim in self._similar_tokens(token).items():
+                for i in self._by_token[t]:
+                    if sim > best.get(i, 0.0):
+                        best[i] = sim
+            totals.update(best)
+        scores = {i: 0.9 * total / len(q_tokens) for i, total in totals.items()}
+        for i in self._by_name.get(q, ()):
+            scores[i] = 1.0
+
+        matches = [
+            DoctorMatch(i, self.doctors[i].name, self.doctors[i].specialty, round(score, 3))
+            for i, score in scores.items()
+            if score >= min_score and (specialty_id is None or self.doctors[i].specialty_id == specialty_id)
+        ]
+        matches.sort(key=lambda m: (-m.score, m.name))
+        return matches[:limit]
+
+class DoctorDirectory:
+    def __init__(self, ttl: float = DOCTOR_INDEX_TTL_SECONDS):
+        self.ttl = ttl
+        self._index: Optional[DoctorIndex] = None
+        self._loaded_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def invalidate(self):
+        """Call after adding, renaming or removing doctors."""
+        self._index = None
+
+    async def index(self, session: AsyncSession) -> DoctorIndex:
+        if self._index is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return self._index
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._index is None or time.monotonic() - self._loaded_at >= self.ttl:
+                res = await session.execute(select(Doctor.id, Doctor.name, Doctor.specialty, Doctor.specialty_id))
+                self._index = DoctorIndex([DoctorEntry(i, name, spec, spec_id, normalize(name)) for i, name, spec, spec_id in res.all()])
+                self._loaded_at = time.monotonic()
+        return self._index
+
+    async def resolve(self, session: AsyncSession, query: str, limit: int = 5, specialty: Optional[str] = None) -> List[DoctorMatch]:
+        """Ranked matches for a typed or spoken doctor name, best first; specialty may be any alias."""
+        specialty_id = None
+        if specialty:
+            spec = await resolve_specialty(session, specialty)
+            if spec is None:
+                return []
+            specialty_id = spec.id
+        return (await self.index(session)).search(query, limit=limit, specialty_id=specialty_id)
+
+    async def best(self, session: AsyncSession, query: str, specialty: Optional[str] = None) -> Optional[DoctorMatch]:
+        matches = await self.resolve(session, query, limit=1, specialty=specialty)
+        return matches[0] if matches else None
+
+doctor_directory = DoctorDirectory()
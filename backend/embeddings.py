@@ -0,0 +1,191 @@
+# backend/embeddings.py
+"""
+Pluggable embedding backends for RAG and the semantic cache.
+
+EMBEDDING_BACKEND=huggingface  (default) sentence-transformers on PyTorch
+EMBEDDING_BACKEND=onnx         MiniLM as an int8-quantized ONNX model on CPU
+                               (onnxruntime + tokenizers, no PyTorch loaded)
+
+Export and quantize the ONNX model once (needs `pip install optimum[onnxruntime]`):
+    python -m backend.embeddings export models/minilm-onnx
+
+Concurrent query embeddings are micro-batched: requests that arrive within
+EMBEDDING_BATCH_WINDOW_MS of each other are encoded in one forward pass.
+"""
+import os
+import sys
+import asyncio
+import threading
+from typing import List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from .config import (
+    EMBEDDING_BACKEND, EMBEDDING_ONNX_DIR, EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_THREADS
+)
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_FILE = "model_int8.onnx"
+MAX_SEQ_LENGTH = 256 # MiniLM was trained with 256-token inputs
+
+def embedding_id() -> str:
+    """Identifies the vector space. Part of every chunk ID, so switching backends re-embeds."""
+    return EMBEDDING_MODEL if EMBEDDING_BACKEND == "huggingface" else f"{EMBEDDING_MODEL}|{EMBEDDING_BACKEND}"
+
+# =========================================================================
+# 1. ONNX BACKEND
+# =========================================================================
+class OnnxMiniLMEmbeddings(Embeddings):
+    """
+    Mean-pooled, L2-normalised MiniLM sentence embeddings from an ONNX model.
+    Output matches sentence-transformers up to quantization error.
+    """
+    def __init__(self, model_dir: str = EMBEDDING_ONNX_DIR, threads: int = EMBEDDING_THREADS):
+        import numpy as np
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self._np = np
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(os.path.join(model_dir, ONNX_MODEL_FILE), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        np = self._np
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0] # (batch, tokens, 384)
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        out = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            out.extend(self._encode(texts[start:start + EMBEDDING_BATCH_SIZE]))
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+# =========================================================================
+# 2. MICRO-BATCHING (Async query path)
+# =========================================================================
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Wraps any backend. aembed_query() holds each request for up to
+    EMBEDDING_BATCH_WINDOW_MS and encodes everything that arrived in one
+    batched call on a worker thread. Sync calls pass straight through.
+    """
+    def __init__(self, inner: Embeddings, window_ms: float = EMBEDDING_BATCH_WINDOW_MS, max_batch: int = EMBEDDING_BATCH_SIZE):
+        self.inner = inner
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.queries = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.inner.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        self.batches += 1
+        self.queries += len(batch)
+        try:
+            # embed_documents applies no query-specific prefix for MiniLM, so it is safe for queries
+            vectors = await asyncio.to_thread(self.inner.embed_documents, [text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done(): future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done(): future.set_result(vector)
+
+    def metrics(self):
+        return {"backend": EMBEDDING_BACKEND, "queries": self.queries, "batches": self.batches,
+                "avg_batch": round(self.queries / self.batches, 2) if self.batches else 0.0}
+
+def create_embeddings(backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    if backend == "onnx":
+        return OnnxMiniLMEmbeddings()
+    if backend == "huggingface":
+        from langchain_huggingface import HuggingFaceEmbeddings # Imports PyTorch
+        return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'")
+
+_embeddings: Optional[MicroBatchingEmbeddings] = None
+_embeddings_lock = threading.Lock()
+
+def get_embeddings() -> MicroBatchingEmbeddings:
+    """One embedding model per process, built once even if the warm-up thread and a request race."""
+    global _embeddings
+    if _embeddings is None:
+        with _embeddings_lock:
+            if _embeddings is None:
+                _embeddings = MicroBatchingEmbeddings(create_embeddings())
+    return _embeddings
+
+def embeddings_loaded() -> bool:
+    return _embeddings is not None
+
+# =========================================================================
+# 3. EXPORT + INT8 QUANTIZATION
+# =========================================================================
+def export_onnx_model(out_dir: str):
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from transformers import AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    print(f"EMBEDDINGS: Exporting {EMBEDDING_MODEL} to ONNX...")
+    model = ORTModelForFeatureExtraction.from_pretrained(EMBEDDING_MODEL, export=True)
+    model.save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(EMBEDDING_MODEL).save_pretrained(out_dir) # writes tokenizer.json
+
+    print("EMBEDDINGS: Quantizing weights to int8...")
+    quantize_dynamic(os.path.join(out_dir, "model.onnx"), os.path.join(out_dir, ONNX_MODEL_FILE), weight_type=QuantType.QInt8)
+    print(f"EMBEDDINGS: Done. Set EMBEDDING_BACKEND=onnx and EMBEDDING_ONNX_DIR={out_dir}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "export":
+        export_onnx_model(sys.argv[2])
+    else:
+        print("Usage: python -m backend.embeddings export <out_dir>")
@@ -0,0 +1,141 @@
+# backend/export_api.py
+"""
+Streaming CSV / NDJSON exports for reporting (finance, audit).
+
+Rows are read through a server-side cursor (session.stream + yield_per)
+and written out EXPORT_BATCH_SIZE at a time, so a worker's memory stays
+flat whatever the date range. The session is opened inside the response
+generator: it lives exactly as long as the download, on the read replica
+when one is configured.
+
+    GET /exports/appointments?format=csv&start=2025-01-01&end=2025-12-31&doctor_id=1&status=Completed
+    GET /exports/labs?format=ndjson&status=Completed
+    GET /exports/prescriptions?start=2025-06-01
+"""
+import io
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+from .config import EXPORT_BATCH_SIZE
+from .database import ReadSessionLocal
+from .models import Appointment, AvailabilitySlot, Doctor, LabRequest, Patient, Prescription
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["Exports"]
+)
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    return value
+
+async def stream_rows(stmt: Select, headers: List[str], fmt: str) -> AsyncIterator[str]:
+    async with ReadSessionLocal() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if fmt == "csv":
+            writer.writerow(headers)
+        async for partition in result.partitions():
+            for row in partition:
+                values = [_plain(v) for v in row]
+                if fmt == "csv":
+                    writer.writerow(values)
+                else:
+                    buf.write(json.dumps(dict(zip(headers, values))) + "\n")
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+def _export(name: str, columns: List[Tuple[str, Any]], stmt: Select, fmt: str) -> StreamingResponse:
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    headers = [h for h, _ in columns]
+    filename = f"{name}_{date.today().isoformat()}.{fmt}"
+    return StreamingResponse(
+        stream_rows(stmt, headers, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def _date_range(stmt: Select, column, start: Optional[date], end: Optional[date], is_datetime: bool = False) -> Select:
+    # Inclusive on both ends; datetime columns compare against midnight of the next day
+    if start:
+        stmt = stmt.where(column >= (datetime.combine(start, time.min) if is_datetime else start))
+    if end:
+        stmt = stmt.where(column < datetime.combine(end + timedelta(days=1), time.min)) if is_datetime else stmt.where(column <= end)
+    return stmt
+
+@router.get("/appointments")
+async def export_appointments(format: str = "csv", start: Optional[date] = None, end: Optional[date] = None, doctor_id: Optional[int] = None, status: Optional[str] = None):
+    columns = [
+        ("id", Appointment.id),
+        ("patient_id", Patient.patient_id),
+        ("patient_name", Patient.name),
+        ("doctor_id", Appointment.doctor_id),
+        ("doctor_name", Doctor.name),
+        ("date", AvailabilitySlot.date),
+        ("time", AvailabilitySlot.time),
+        ("consultation_mode", Appointment.consultation_mode),
+        ("reason", Appointment.reason),
+        ("status", Appointment.status),
+        ("cancellation_reason", Appointment.cancellation_reason),
+    ]
+    stmt = (
+        select(*[c for _, c in columns])
+        .outerjoin(Patient, Appointment.patient_id == Patient.id)
+        .outerjoin(Doctor, Appointment.doctor_id == Doctor.id)
+        .outerjoin(AvailabilitySlot, Appointment.slot_id == AvailabilitySlot.id)
+        .order_by(Appointment.id)
+    )
+    stmt = _date_range(stmt, AvailabilitySlot.date, start, end)
+    if doctor_id is not None:
+        stmt = stmt.where(Appointment.doctor_id == doctor_id)
+    if status:
+        stmt = stmt.where(Appointment.status == status)
+    return _export("appointments", columns, stmt, format)
+
+@router.get("/labs")
+async def export_labs(format: str = "csv", start: Optional[date] = None, end: Optional[date] = None, status: Optional[str] = None):
+    columns = [
+        ("id", LabRequest.id),
+        ("patient_id", Patient.patient_id),
+        ("patient_name", Patient.name),
+        ("test_name", LabRequest.test_name),
+        ("date_requested", LabRequest.date_requested),
+        ("status", LabRequest.status),
+    ]
+    stmt = select(*[c for _, c in columns]).outerjoin(Patient, LabRequest.patient_id == Patient.id).order_by(LabRequest.id)
+    stmt = _date_range(stmt, LabRequest.date_requested, start, end)
+    if status:
+        stmt = stmt.where(LabRequest.status == status)
+    return _export("labs", columns, stmt, format)
+
+@router.get("/prescriptions")
+async def export_prescriptions(format: str = "csv", start: Optional[date] = None, end: Optional[date] = None, status: Optional[str] = None):
+    columns = [
+        ("id", Prescription.id),
+        ("patient_id", Patient.patient_id),
+        ("patient_name", Patient.name),
+        ("item", Prescription.image_filename),
+        ("created_at", Prescription.created_at),
+        ("status", Prescription.status),
+        ("pharmacist_note", Prescription.pharmacist_note),
+    ]
+    stmt = select(*[c for _, c in columns]).outerjoin(Patient, Prescription.patient_id == Patient.id).order_by(Prescription.id)
+    stmt = _date_range(stmt, Prescription.created_at, start, end, is_datetime=True)
+    if status:
+        stmt = stmt.where(Prescription.status == status)
+    return _export("prescriptions", columns, stmt, format)
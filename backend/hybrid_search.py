@@ -0,0 +1,119 @@
+# backend/hybrid_search.py
+"""
+Hybrid (BM25 + vector) retrieval over the FAISS docstore.
+
+Each candidate gets one score in [0, 1]:
+    RAG_HYBRID_ALPHA * cosine + (1 - RAG_HYBRID_ALPHA) * normalized BM25
+where BM25 is divided by the query's top BM25 score, so the best lexical
+match gets 1.0 and a query sharing no (non-stopword) term with the corpus
+gets 0. Cosine carries the "is this covered at all" signal; how the
+thresholds map onto it:
+
+    score(top doc) = 0.7 * cosine + 0.3   if it shares a term with the query
+                   = 0.7 * cosine          otherwise
+    RAG_MIN_RELEVANCE 0.45        -> cosine >= 0.21 / >= 0.64
+    RAG_DIRECT_ANSWER_SCORE 0.8   -> cosine >= 0.71 with a shared term
+
+(MiniLM: a question vs its answering passage is typically 0.5-0.75,
+unrelated text under 0.2.)
+
+Print the scores for sample questions when tuning the thresholds:
+    python -m backend.hybrid_search "what is the co-pay" "how do I treat a cold"
+"""
+import re
+import sys
+import math
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+
+from .config import RAG_HYBRID_ALPHA, RAG_CANDIDATES
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how",
+    "i", "if", "in", "is", "it", "my", "of", "on", "or", "the", "to", "what", "when", "where",
+    "which", "who", "will", "with", "you", "your", "we", "our", "me", "there", "this", "that",
+}
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+class BM25:
+    def __init__(self, corpus: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.n = len(corpus)
+        self.lengths = [len(doc) for doc in corpus]
+        self.avgdl = (sum(self.lengths) / self.n) if self.n else 0.0
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list) # term -> [(doc, tf)]
+        for pos, doc in enumerate(corpus):
+            for term, tf in Counter(doc).items():
+                self.postings[term].append((pos, tf))
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (self.n - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: List[str]) -> Dict[int, float]:
+        out: Dict[int, float] = defaultdict(float)
+        for term in set(query):
+            idf = self.idf(term)
+            for pos, tf in self.postings.get(term, ()):
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[pos] / (self.avgdl or 1))
+                out[pos] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return out
+
+class HybridRetriever:
+    def __init__(self, faiss_index: FAISS, alpha: float = RAG_HYBRID_ALPHA, candidates: int = RAG_CANDIDATES):
+        self.faiss_index = faiss_index
+        self.alpha = alpha
+        self.candidates = candidates
+        # Position i in the FAISS index <-> self.docs[i]
+        self.docs: List[Document] = [faiss_index.docstore.search(faiss_index.index_to_docstore_id[i]) for i in range(faiss_index.index.ntotal)]
+        self.bm25 = BM25([tokenize(doc.page_content) for doc in self.docs])
+
+    def _cosine(self, pos: int, vector: np.ndarray) -> float:
+        try:
+            return float(np.dot(self.faiss_index.index.reconstruct(pos), vector))
+        except RuntimeError:
+            return 0.0
+
+    def search(self, query: str, vector, k: int) -> List[Tuple[Document, float]]:
+        """Blocking; returns the top-k (document, hybrid score), best first."""
+        vector = np.asarray(vector, dtype=np.float32)
+        n = min(self.candidates, len(self.docs))
+        if not n: return []
+
+        # Vector side: squared L2 on unit vectors -> cosine = 1 - d/2
+        distances, positions = self.faiss_index.index.search(vector.reshape(1, -1), n)
+        semantic = {int(p): 1 - float(d) / 2 for d, p in zip(distances[0], positions[0]) if p >= 0}
+
+        # Lexical side
+        terms = tokenize(query)
+        raw = self.bm25.scores(terms)
+        top = max(raw.values(), default=0.0)
+        lexical = {pos: score / top for pos, score in raw.items()} if top > 0 else {}
+        for pos in sorted(lexical, key=lexical.get, reverse=True)[:n]:
+            if pos not in semantic:
+                semantic[pos] = self._cosine(pos, vector)
+
+        scored = [
+            (self.docs[pos], self.alpha * max(cos, 0.0) + (1 - self.alpha) * lexical.get(pos, 0.0))
+            for pos, cos in semantic.items()
+        ]
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:k]
+
+if __name__ == "__main__":
+    from .embeddings import get_embeddings
+    from .rag_ingest import load_or_sync_index
+
+    embeddings = get_embeddings()
+    retriever = HybridRetriever(load_or_sync_index(embeddings)[0])
+    for q in sys.argv[1:]:
+        print(f"\n{q}")
+        for doc, score in retriever.search(q, embeddings.embed_query(q), 3):
+            print(f"  {score:.3f}  [{doc.metadata.get('source')}] {doc.page_content[:70]}")
@@ -1,12 +1,19 @@
 # backend/knowledge_api.py
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import asyncio
+import json
 from typing import List
 
-from .llm_integration import query_llm 
-from .rag_integration import query_rag # This is now async
+from .llm_integration import query_llm, stream_llm, triage_query
+from .rag_integration import query_rag, stream_rag # This is now async
 from .schemas import KnowledgeQueryRequest
+from .semantic_cache import cache_metrics
+from .llm_gateway import gateway_metrics
+from .symptom_extractor import fastpath_metrics
+from .triage_classifier import triage_metrics
+from .embeddings import get_embeddings, embeddings_loaded
 
 router = APIRouter(
     prefix="/knowledge",
@@ -33,6 +40,26 @@ async def handle_llm_query(request: KnowledgeQueryRequest):
         print(f"LLM API Error: {e}")
         raise HTTPException(status_code=500, detail="Error processing LLM query.")
 
+class TriageResponse(BaseModel):
+    query: str
+    level: str # Low / Moderate / High / Critical
+    confidence: float
+    source: str # "rule", "model" or "llm"
+    response: str
+
+@router.post("/triage", response_model=TriageResponse)
+async def handle_triage_query(request: KnowledgeQueryRequest):
+    """
+    Risk-level triage. Answered in-process by the local classifier; only
+    ambiguous messages are escalated to the LLM.
+    """
+    try:
+        result = await triage_query(request.query, request.patient_id)
+        return TriageResponse(query=request.query, **result)
+    except Exception as e:
+        print(f"Triage API Error: {e}")
+        raise HTTPException(status_code=500, detail="Error processing triage query.")
+
 @router.post("/rag", response_model=KnowledgeQueryResponse)
 async def handle_rag_query(request: KnowledgeQueryRequest):
     """
@@ -50,4 +77,53 @@ async def handle_rag_query(request: KnowledgeQueryRequest):
         )
     except Exception as e:
         print(f"RAG API Error: {e}")
-        raise HTTPException(status_code=500, detail="Error processing RAG query.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error processing RAG query.")
+
+# --- STREAMING (Server-Sent Events) ---
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} # Stop proxies from buffering tokens
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/llm/stream")
+async def handle_llm_stream(request: KnowledgeQueryRequest):
+    """
+    Streaming variant of /knowledge/llm. Events: token*, done.
+    """
+    async def events():
+        async for token in stream_llm(request.query, request.patient_id):
+            yield sse("token", token)
+        yield sse("done", {})
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/rag/stream")
+async def handle_rag_stream(request: KnowledgeQueryRequest):
+    """
+    Streaming variant of /knowledge/rag. Events: sources, token*, then done,
+    or error if the answer couldn't be completed (no done follows an error).
+    """
+    async def events():
+        async for item in stream_rag(request.query):
+            yield sse(item["event"], item["data"])
+            if item["event"] == "error":
+                return
+        yield sse("done", {})
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.get("/metrics")
+async def get_knowledge_metrics():
+    """
+    Hit rate and saved LLM time for the semantic answer caches, coalesced
+    LLM calls, how often the local symptom extractor and triage classifier
+    answered without the LLM, plus micro-batching stats for the embedding
+    backend (once loaded).
+    """
+    metrics = {
+        "semantic_cache": cache_metrics(),
+        "llm": gateway_metrics(),
+        "symptom_fastpath": fastpath_metrics(),
+        "triage": triage_metrics(),
+    }
+    if embeddings_loaded():
+        metrics["embeddings"] = get_embeddings().metrics()
+    return metrics
@@ -0,0 +1,75 @@
+# backend/llm_gateway.py
+"""
+Single entry point for blocking (non-streaming) LLM calls.
+
+invoke_llm() resolves the call site's provider/model and coalesces identical
+concurrent requests: same (provider, model, temperature, normalized prompt,
+params) -> one upstream call whose result every waiter shares.
+
+Call sites with cache=True are also served from the on-disk exact-match
+response cache (backend/response_cache.py) under the same key. Calls that
+do reach the provider wait their turn in the priority scheduler
+(backend/llm_scheduler.py), capped at the site's output budget
+(backend/token_budget.py).
+"""
+import re
+import json
+import asyncio
+import time
+import hashlib
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from .llm_providers import get_llm_client, resolve_provider
+from .token_budget import budget_for, estimate_request_tokens, token_usage
+from .singleflight import SingleFlight
+from .response_cache import response_cache
+from .llm_scheduler import llm_scheduler, site_priority
+
+_flights = SingleFlight("llm")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_prompt(messages: List[BaseMessage]) -> List[List[str]]:
+    # Whitespace/case-insensitive: "Headache  and fever" == "headache and fever"
+    return [[m.type, _WHITESPACE.sub(" ", str(m.content)).strip().lower()] for m in messages]
+
+def request_key(provider: str, model: str, temperature: float, max_tokens: int, messages: List[BaseMessage], params: Dict[str, Any]) -> str:
+    payload = json.dumps([provider, model, temperature, max_tokens, normalize_prompt(messages), params], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+async def invoke_llm(site: str, messages: List[BaseMessage], temperature: float = 0.3, cache: bool = False, **params: Any) -> AIMessage:
+    """
+    cache=True only for sites where any earlier answer to the same prompt is
+    as good as a fresh one (extraction, triage, RAG) - not for sampling.
+    """
+    provider, model = resolve_provider(site)
+    max_tokens = budget_for(site).max_output_tokens
+    llm = get_llm_client(provider, model, float(temperature), max_tokens)
+    key = request_key(provider, model, float(temperature), max_tokens, messages, params)
+    cache = cache and response_cache.enabled
+
+    if cache:
+        content = response_cache.get(key)
+        if content is not None:
+            return AIMessage(content=content)
+
+    async def call() -> AIMessage:
+        async def provider_call() -> AIMessage:
+            started = time.perf_counter()
+            response = await llm.ainvoke(messages, **params)
+            token_usage.record_response(site, messages, str(response.content), time.perf_counter() - started, response.usage_metadata)
+            return response
+
+        response = await llm_scheduler.run(site_priority(site), provider_call, estimate_request_tokens(site, messages))
+        if cache and response.content:
+            await asyncio.to_thread(response_cache.put, key, response.content)
+        return response
+
+    return await _flights.do(key, call)
+
+def gateway_metrics() -> Dict[str, Any]:
+    metrics = {"single_flight": _flights.metrics(), "scheduler": llm_scheduler.metrics(), "tokens": token_usage.metrics()}
+    if response_cache.enabled:
+        metrics["response_cache"] = response_cache.metrics()
+    return metrics
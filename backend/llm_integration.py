@@ -2,35 +2,34 @@
 import json
 import re
 import os
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, AsyncIterator
 
-# --- NEW IMPORTS FOR GROQ ---
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import SystemMessage, HumanMessage
-from dotenv import load_dotenv
 
-load_dotenv()
+from .llm_providers import get_llm # Provider registry: one pooled client per provider/model
+from .llm_gateway import invoke_llm # Coalesces identical in-flight calls
+from .token_budget import budget_for, estimate_request_tokens, trim_to_tokens, token_usage
+from .llm_scheduler import llm_scheduler, site_priority
+from .symptom_extractor import try_fast_path
+from .triage_classifier import classify_risk, red_flags, TriageResult
+from .config import LLM_PROVIDER, GROQ_API_KEY, SYMPTOM_FASTPATH_ENABLED
 
-# --- CONFIGURATION ---
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-MODEL_NAME = os.getenv("GROQ_MODEL", "llama3-8b-8192")
-
-if not GROQ_API_KEY:
+if LLM_PROVIDER == "groq" and not GROQ_API_KEY:
     print("⚠️ WARNING: GROQ_API_KEY not found in .env. LLM features will fail.")
 
-def get_llm():
-    """
-    Returns the LangChain ChatGroq object for RAG and general use.
-    """
-    return ChatGroq(
-        temperature=0.3,
-        model_name=MODEL_NAME,
-        api_key=GROQ_API_KEY
-    )
+# Returned (never cached) when the LLM call fails
+LLM_UNAVAILABLE_MESSAGE = "System is currently unable to process complex queries."
 
 # --- 1. SYMPTOM EXTRACTION ---
 async def extract_symptoms_from_llm(query: str) -> Dict[str, Any]:
+    # Fast path: the local lexicon matcher covers most messages without a network call
+    if SYMPTOM_FASTPATH_ENABLED:
+        local = try_fast_path(query)
+        if local:
+            return local
+
     print(f"LLM (Groq): Extracting symptoms for: {query}")
     
     prompt = """
@@ -47,9 +46,8 @@ async def extract_symptoms_from_llm(query: str) -> Dict[str, Any]:
     """
     
     try:
-        llm = get_llm()
         # Llama 3 follows instructions well, so we simply ask for JSON
-        response = await llm.ainvoke([HumanMessage(content=prompt.format(query=query))])
+        response = await invoke_llm("extraction", [HumanMessage(content=prompt.format(query=trim_to_tokens(query, budget_for("extraction").max_input_tokens)))], cache=True)
         txt = response.content
         
         # Clean up potential markdown code blocks
@@ -78,8 +76,7 @@ async def simulate_prescription_scan() -> List[Dict[str, str]]:
     """
     
     try:
-        llm = get_llm()
-        response = await llm.ainvoke([HumanMessage(content=prompt)])
+        response = await invoke_llm("prescription", [HumanMessage(content=prompt)])
         txt = response.content.replace("```json", "").replace("```", "").strip()
         
         data = json.loads(txt)
@@ -100,27 +97,93 @@ async def simulate_prescription_scan() -> List[Dict[str, str]]:
         ]
 
 # --- 3. GENERAL QUERY ---
+# PROFESSIONAL PROMPT (Fixes Point #1)
+TRIAGE_SYSTEM_PROMPT = """
+You are an expert AI medical triage assistant.
+Analyze the user's symptoms with clinical precision.
+
+OUTPUT FORMAT:
+**Risk Level:** [Low / Moderate / High / Critical]
+**Clinical Assessment:** [2 sentences explaining the potential condition professionally]
+**Recommended Action:** [1 specific recommendation, e.g., 'Book a GP appointment within 24 hours' or 'Go to ER immediately']
+
+Keep it concise, empathetic, and professional. No disclaimers needed.
+"""
+
+def _triage_messages(query: str):
+    return [
+        SystemMessage(content=TRIAGE_SYSTEM_PROMPT),
+        HumanMessage(content=trim_to_tokens(query, budget_for("triage").max_input_tokens))
+    ]
+
+# Templated answers for levels the local classifier is sure about
+TRIAGE_ACTIONS = {
+    "Low": "Self-care at home; book a GP appointment if it doesn't improve within a few days.",
+    "Moderate": "Book a GP appointment within 24 hours.",
+    "High": "Seek same-day care at an urgent care clinic.",
+    "Critical": "Call emergency services or go to the nearest ER immediately.",
+}
+RISK_LEVEL_RE = re.compile(r"Risk Level:\**\s*\[?(Low|Moderate|High|Critical)", re.IGNORECASE)
+
+def format_triage(result: TriageResult) -> str:
+    assessment = (
+        "Your message mentions warning signs of a medical emergency."
+        if result.source == "rule" else
+        f"Based on the symptoms described, this looks like a {result.level.lower()}-risk presentation."
+    )
+    return (f"**Risk Level:** {result.level}\n"
+            f"**Clinical Assessment:** {assessment}\n"
+            f"**Recommended Action:** {TRIAGE_ACTIONS[result.level]}")
+
+async def triage_query(query: str, patient_id: str = None) -> Dict[str, Any]:
+    """
+    Local classifier first. Emergencies, High/Critical predictions and confident
+    ones are answered in-process; only ambiguous Low/Moderate messages go to the LLM.
+    """
+    result = classify_risk(query)
+    if not result.ambiguous:
+        return {"level": result.level, "confidence": result.confidence, "source": result.source, "response": format_triage(result)}
+
+    response = await query_llm(query, patient_id)
+    match = RISK_LEVEL_RE.search(response)
+    level = match.group(1).capitalize() if match else result.level
+    return {"level": level, "confidence": result.confidence, "source": "llm", "response": response}
+
 async def query_llm(query: str, patient_id: str = None) -> str:
+    # Emergencies never wait on an external API
+    if red_flags(query):
+        return format_triage(classify_risk(query))
+
+    # Exact-match cache only. No semantic reuse: "mild" and "severe" headache embed
+    # almost identically, and one patient's risk level must not answer another's.
     try:
-        # PROFESSIONAL PROMPT (Fixes Point #1)
-        system_prompt = """
-        You are an expert AI medical triage assistant.
-        Analyze the user's symptoms with clinical precision.
-        
-        OUTPUT FORMAT:
-        **Risk Level:** [Low / Moderate / High / Critical]
-        **Clinical Assessment:** [2 sentences explaining the potential condition professionally]
-        **Recommended Action:** [1 specific recommendation, e.g., 'Book a GP appointment within 24 hours' or 'Go to ER immediately']
-        
-        Keep it concise, empathetic, and professional. No disclaimers needed.
-        """
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=query)
-        ]
-        response = await llm.ainvoke(messages)
+        response = await invoke_llm("triage", _triage_messages(query), cache=True)
         return response.content
     except Exception as e:
         print(f"GROQ QUERY ERROR: {e}")
-        return "System is currently unable to process complex queries."
\ No newline at end of file
+        return LLM_UNAVAILABLE_MESSAGE
+
+async def stream_llm(query: str, patient_id: str = None) -> AsyncIterator[str]:
+    """
+    Same as query_llm, but yields tokens as the provider produces them.
+    """
+    # Emergencies never wait on an external API
+    if red_flags(query):
+        yield format_triage(classify_risk(query))
+        return
+
+    parts = []
+    try:
+        llm = get_llm("triage")
+        messages = _triage_messages(query)
+        started = time.perf_counter()
+        async with llm_scheduler.slot(site_priority("triage"), estimate_request_tokens("triage", messages)):
+            async for chunk in llm.astream(messages):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+        token_usage.record_response("triage", messages, "".join(parts), time.perf_counter() - started)
+    except Exception as e:
+        print(f"GROQ STREAM ERROR: {e}")
+        if not parts:
+            yield LLM_UNAVAILABLE_MESSAGE
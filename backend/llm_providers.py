@@ -0,0 +1,191 @@
+# backend/llm_providers.py
+"""
+LLM provider registry.
+
+Providers: "groq", "ollama" and "fake" (deterministic, offline, configurable
+latency - for load-testing triage and RAG without network access).
+
+Each call site picks its provider/model, falling back to LLM_PROVIDER:
+    LLM_TRIAGE_PROVIDER=fake
+    LLM_RAG_MODEL=llama3-70b-8192
+
+Clients are long-lived: one per (provider, model, temperature, output cap),
+all sharing one pooled HTTP connection pool per provider. The output cap
+(max_tokens) comes from the site's budget in backend/token_budget.py.
+"""
+import re
+import json
+import hashlib
+import asyncio
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .llm_scheduler import llm_scheduler
+from .token_budget import budget_for
+from .config import (
+    LLM_PROVIDER, GROQ_API_KEY, GROQ_MODEL, OLLAMA_BASE_URL, OLLAMA_MODEL,
+    LLM_FAKE_LATENCY_MS, LLM_FAKE_TOKEN_MS, LLM_MAX_CONNECTIONS, LLM_TIMEOUT_SECONDS, llm_site_setting
+)
+
+# name -> (factory(model, temperature, max_tokens), default model)
+PROVIDERS: Dict[str, Tuple[Callable[[str, float, Optional[int]], BaseChatModel], str]] = {}
+
+def register_provider(name: str, default_model: str):
+    def wrap(factory):
+        PROVIDERS[name] = (factory, default_model)
+        return factory
+    return wrap
+
+# =========================================================================
+# 1. SHARED HTTP POOLS (One per provider, reused by every model/client)
+# =========================================================================
+_http_clients: Dict[str, httpx.Client] = {}
+_async_http_clients: Dict[str, httpx.AsyncClient] = {}
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+
+def http_client(provider: str) -> httpx.Client:
+    if provider not in _http_clients:
+        _http_clients[provider] = httpx.Client(
+            limits=_limits(), timeout=LLM_TIMEOUT_SECONDS,
+            event_hooks={"response": [llm_scheduler.observe_response_sync]} # Rate-limit headers -> scheduler budget
+        )
+    return _http_clients[provider]
+
+def async_http_client(provider: str) -> httpx.AsyncClient:
+    if provider not in _async_http_clients:
+        _async_http_clients[provider] = httpx.AsyncClient(
+            limits=_limits(), timeout=LLM_TIMEOUT_SECONDS,
+            event_hooks={"response": [llm_scheduler.observe_response]}
+        )
+    return _async_http_clients[provider]
+
+async def close_llm_clients():
+    for client in _async_http_clients.values():
+        await client.aclose()
+    for client in _http_clients.values():
+        client.close()
+    _async_http_clients.clear()
+    _http_clients.clear()
+    get_llm_client.cache_clear()
+
+# =========================================================================
+# 2. PROVIDERS
+# =========================================================================
+@register_provider("groq", default_model=GROQ_MODEL)
+def _groq(model: str, temperature: float, max_tokens: Optional[int]) -> BaseChatModel:
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        temperature=temperature,
+        model_name=model,
+        max_tokens=max_tokens,
+        api_key=GROQ_API_KEY,
+        max_retries=0, # 429 retries/backoff are done by the scheduler
+        http_client=http_client("groq"),
+        http_async_client=async_http_client("groq"),
+    )
+
+@register_provider("ollama", default_model=OLLAMA_MODEL)
+def _ollama(model: str, temperature: float, max_tokens: Optional[int]) -> BaseChatModel:
+    from langchain_ollama import ChatOllama # Holds its own keep-alive client
+    return ChatOllama(model=model, temperature=temperature, num_predict=max_tokens, base_url=OLLAMA_BASE_URL)
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic local stand-in. The same prompt always gets the same reply,
+    shaped like what each call site expects (JSON for extraction, risk level
+    for triage, context echo for RAG). Waits `latency_ms` before answering;
+    when streamed, that is the time to first token and each further token
+    takes `token_ms`. Replies are cut to `max_tokens` words.
+    """
+    model: str = "fake"
+    max_tokens: Optional[int] = None
+    latency_ms: float = LLM_FAKE_LATENCY_MS
+    token_ms: float = LLM_FAKE_TOKEN_MS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-local"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        last = str(messages[-1].content) if messages else ""
+        digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+
+        if '"main_symptom"' in prompt:
+            text = prompt.split("User text:", 1)[-1].strip().strip('"').strip()
+            parts = [p.strip() for p in text.replace(" and ", ",").split(",") if p.strip()]
+            return json.dumps({"main_symptom": parts[0] if parts else text, "associated": parts[1:]})
+        if '"dosage"' in prompt:
+            return json.dumps([
+                {"name": "Paracetamol", "dosage": "650mg", "frequency": "SOS"},
+                {"name": "Cetirizine", "dosage": "10mg", "frequency": "Nightly"},
+                {"name": "Multivitamin", "dosage": "1 tab", "frequency": "Daily"},
+            ])
+        if "Risk Level" in prompt:
+            level = ["Low", "Moderate", "High"][digest % 3]
+            return (f"**Risk Level:** {level}\n"
+                    f"**Clinical Assessment:** Simulated assessment for: {last[:80]}. This response comes from the local fake provider.\n"
+                    f"**Recommended Action:** Book a GP appointment within 24 hours.")
+        if "----------------" in prompt: # RAG "stuff" prompt: echo the first context passage
+            context = prompt.split("----------------", 1)[1].strip().split("\n\n")[0]
+            return context[:400]
+        return f"[fake:{digest % 10000:04d}] {last[:200]}"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        return re.findall(r"\S+\s*|\s+", self._reply(messages))[:self.max_tokens]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_ms / 1000.0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self._tokens(messages))))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000.0)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self._tokens(messages))))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000.0)
+        for i, token in enumerate(self._tokens(messages)):
+            if i: time.sleep(self.token_ms / 1000.0)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000.0)
+        for i, token in enumerate(self._tokens(messages)):
+            if i: await asyncio.sleep(self.token_ms / 1000.0)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+@register_provider("fake", default_model="fake")
+def _fake(model: str, temperature: float, max_tokens: Optional[int]) -> BaseChatModel:
+    return FakeChatModel(model=model, max_tokens=max_tokens)
+
+# =========================================================================
+# 3. LOOKUP
+# =========================================================================
+def resolve_provider(site: str = "default", provider: Optional[str] = None, model: Optional[str] = None) -> Tuple[str, str]:
+    provider = (provider or llm_site_setting(site, "PROVIDER") or LLM_PROVIDER).lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{provider}'. Known: {', '.join(PROVIDERS)}")
+    model = model or llm_site_setting(site, "MODEL") or PROVIDERS[provider][1]
+    return provider, model
+
+@lru_cache(maxsize=None)
+def get_llm_client(provider: str, model: str, temperature: float, max_tokens: Optional[int] = None) -> BaseChatModel:
+    print(f"LLM: Creating {provider} client for model '{model}' (temperature={temperature}, max_tokens={max_tokens}).")
+    factory, _ = PROVIDERS[provider]
+    return factory(model, temperature, max_tokens)
+
+def get_llm(site: str = "default", temperature: float = 0.3, provider: Optional[str] = None, model: Optional[str] = None) -> BaseChatModel:
+    """
+    Returns the long-lived chat model for a call site ("triage", "extraction",
+    "prescription", "rag", ...), capped at the site's output budget.
+    Never builds a new client per request.
+    """
+    return get_llm_client(*resolve_provider(site, provider, model), float(temperature), budget_for(site).max_output_tokens)
@@ -0,0 +1,245 @@
+# backend/llm_scheduler.py
+"""
+Priority- and rate-limit-aware scheduler for outbound LLM calls.
+
+Every call waits for a slot in priority order:
+    TRIAGE > EXTRACTION > QA > BACKGROUND
+At most LLM_MAX_CONCURRENCY calls run at once. The provider's remaining
+request/token budget is read from its rate-limit response headers
+(x-ratelimit-remaining-*, x-ratelimit-reset-*). Lower classes stop early and
+leave a share of the quota (RESERVE) to the classes above them, so triage
+still gets through when we are close to the limit.
+
+A 429 pauses dispatching until Retry-After (or an exponential backoff with
+jitter) and the call is retried, up to LLM_MAX_RETRIES times.
+"""
+import re
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from .config import LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, LLM_BACKOFF_BASE_SECONDS, LLM_BACKOFF_MAX_SECONDS
+
+class Priority(IntEnum):
+    TRIAGE = 0
+    EXTRACTION = 1
+    QA = 2
+    BACKGROUND = 3
+
+SITE_PRIORITY = {
+    "triage": Priority.TRIAGE,
+    "extraction": Priority.EXTRACTION,
+    "rag": Priority.QA,
+    "default": Priority.QA,
+    "prescription": Priority.BACKGROUND,
+}
+
+# Share of the provider quota a class must leave untouched for the classes above it
+RESERVE = {
+    Priority.TRIAGE: 0.0,
+    Priority.EXTRACTION: 0.05,
+    Priority.QA: 0.15,
+    Priority.BACKGROUND: 0.30,
+}
+
+def site_priority(site: str) -> Priority:
+    return SITE_PRIORITY.get(site, Priority.QA)
+
+_DURATION_PART = re.compile(r"([\d.]+)(ms|h|m|s)")
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds from "7.66s", "2m59.56s", "120ms" or a plain "30"."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(n) * scale[unit] for n, unit in parts)
+
+def rate_limit_retry_after(error: Exception) -> Optional[float]:
+    """
+    None if `error` isn't a 429. Otherwise the provider's Retry-After in
+    seconds, or 0.0 if it didn't send one.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    return parse_duration(headers.get("retry-after")) or 0.0
+
+class RateBudget:
+    """Provider quota as last reported in response headers."""
+    def __init__(self):
+        self.limit: Dict[str, Optional[int]] = {"requests": None, "tokens": None}
+        self.remaining: Dict[str, Optional[int]] = {"requests": None, "tokens": None}
+        self.reset_at: Dict[str, float] = {"requests": 0.0, "tokens": 0.0}
+
+    def update(self, headers: Mapping[str, str], now: float):
+        for kind in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if limit is not None and limit.isdigit():
+                self.limit[kind] = int(limit)
+            if remaining is not None and remaining.isdigit():
+                self.remaining[kind] = int(remaining)
+            if reset is not None:
+                self.reset_at[kind] = now + reset
+
+    def _refresh(self, now: float):
+        for kind in ("requests", "tokens"):
+            if self.remaining[kind] is not None and now >= self.reset_at[kind]:
+                self.remaining[kind] = self.limit[kind]
+
+    def wait_time(self, priority: Priority, tokens: int, now: float) -> float:
+        """
+        0 if a call of this class and size may start now, else seconds until the budget resets.
+        A call bigger than the class's whole share is clamped to it: it starts once the
+        budget is full rather than blocking its queue forever.
+        """
+        self._refresh(now)
+        wait = 0.0
+        for kind, cost in (("requests", 1), ("tokens", tokens)):
+            limit, remaining = self.limit[kind], self.remaining[kind]
+            if limit is None or remaining is None:
+                continue # No headers seen yet
+            reserved = RESERVE[priority] * limit
+            if min(cost, limit - reserved) > remaining - reserved:
+                wait = max(wait, self.reset_at[kind] - now, 0.05)
+        return wait
+
+    def consume(self, tokens: int):
+        # Local estimate until the next response headers correct it
+        for kind, cost in (("requests", 1), ("tokens", tokens)):
+            if self.remaining[kind] is not None:
+                self.remaining[kind] = max(self.remaining[kind] - cost, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            kind: {"limit": self.limit[kind], "remaining": self.remaining[kind], "reset_in_s": round(max(self.reset_at[kind] - now, 0.0), 2)}
+            for kind in ("requests", "tokens")
+        }
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.budget = RateBudget()
+        self.active = 0
+        self.paused_until = 0.0 # Set by a 429
+        self._heap: List[Tuple[int, int]] = [] # (priority, arrival): the head is the next to start
+        self._arrival = itertools.count()
+        self._cond: Optional[asyncio.Condition] = None
+        self._waits = {p: deque(maxlen=1000) for p in Priority}
+        self._stats = {p: {"dispatched": 0, "rate_limited": 0, "retries": 0} for p in Priority}
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    def _blocked_for(self, entry: Tuple[int, int], tokens: int, now: float) -> Optional[float]:
+        """0 = may start; a number = retry after that many seconds; None = wait to be notified."""
+        if self._heap[0] != entry or self.active >= self.max_concurrency:
+            return None
+        if now < self.paused_until:
+            return self.paused_until - now
+        return self.budget.wait_time(Priority(entry[0]), tokens, now)
+
+    async def _acquire(self, priority: Priority, tokens: int):
+        entry = (int(priority), next(self._arrival))
+        started = time.monotonic()
+        cond = self._condition()
+        async with cond:
+            heapq.heappush(self._heap, entry)
+            try:
+                while True:
+                    delay = self._blocked_for(entry, tokens, time.monotonic())
+                    if delay == 0:
+                        break
+                    try:
+                        await asyncio.wait_for(cond.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._heap.remove(entry)
+                heapq.heapify(self._heap)
+                cond.notify_all()
+                raise
+            heapq.heappop(self._heap)
+            self.active += 1
+            self.budget.consume(tokens)
+            cond.notify_all() # The new head may be able to start too
+        self._waits[priority].append(time.monotonic() - started)
+        self._stats[priority]["dispatched"] += 1
+
+    async def _release(self):
+        cond = self._condition()
+        async with cond:
+            self.active -= 1
+            cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, tokens: int = 0):
+        """Hold a slot for the duration of a call (e.g. a whole stream)."""
+        await self._acquire(priority, tokens)
+        try:
+            yield
+        finally:
+            await self._release()
+
+    async def run(self, priority: Priority, fn: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        """Runs fn() in a slot, retrying 429s with backoff."""
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            async with self.slot(priority, tokens):
+                try:
+                    return await fn()
+                except Exception as e:
+                    retry_after = rate_limit_retry_after(e)
+                    if retry_after is None or attempt == LLM_MAX_RETRIES:
+                        raise
+                    backoff = min(LLM_BACKOFF_BASE_SECONDS * 2 ** attempt, LLM_BACKOFF_MAX_SECONDS)
+                    delay = max(retry_after, backoff) * random.uniform(1.0, 1.5) # Jitter: don't retry in lockstep
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                    self._stats[priority]["rate_limited"] += 1
+                    self._stats[priority]["retries"] += 1
+                    print(f"LLM SCHEDULER: 429 on {priority.name} call, pausing {delay:.2f}s (attempt {attempt + 1}).")
+
+    # --- httpx response hooks (see llm_providers) ---
+    async def observe_response(self, response):
+        self.budget.update(response.headers, time.monotonic())
+
+    def observe_response_sync(self, response):
+        self.budget.update(response.headers, time.monotonic())
+
+    def metrics(self) -> Dict[str, Any]:
+        classes = {}
+        for p in Priority:
+            waits = sorted(self._waits[p])
+            classes[p.name.lower()] = {
+                **self._stats[p],
+                "queued": sum(1 for prio, _ in self._heap if prio == p),
+                "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                "p95_wait_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+            }
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "paused_for_s": round(max(self.paused_until - time.monotonic(), 0.0), 2),
+            "budget": self.budget.snapshot(),
+            "classes": classes,
+        }
+
+llm_scheduler = LLMScheduler()
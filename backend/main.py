@@ -2,9 +2,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from .database import engine, AsyncSessionLocal
-from .models import Base
+from sqlalchemy import text
+from .config import PATIENT_ID_BLOCK_SIZE
+from .database import engine, read_engine, AsyncSessionLocal
+from .models import Base, Doctor, Appointment, LabRequest, ADDED_INDEXES
 from .utils import create_initial_data  # <--- IMPORT THIS
+from .specialties import seed_specialties
+from .rag_integration import initialize_rag_pipeline
+from .llm_providers import close_llm_clients
+from .triage_classifier import get_classifier
+from .analytics import analytics
 
 # --- IMPORT MODULES ---
 from . import (
@@ -13,11 +20,28 @@ from . import (
     knowledge_api, 
     video_api, 
     dashboard_api,
+    export_api,
+    analytics_api,
     rasa_proxy
 )
 
 import asyncio
 
+# Columns added to existing tables after their first release (create_all only creates missing tables)
+ADDED_COLUMNS = [
+    (Doctor.__table__, "specialty_id"),
+    (Appointment.__table__, "cancellation_reason"),
+    (LabRequest.__table__, "completed_at"),
+    (LabRequest.__table__, "requested_at"),
+]
+
+async def add_missing_columns(conn):
+    for table, name in ADDED_COLUMNS:
+        column = table.c[name]
+        column_type = column.type.compile(dialect=conn.dialect)
+        references = "".join(f" REFERENCES {fk.column.table.name}({fk.column.name})" for fk in column.foreign_keys)
+        await conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {name} {column_type}{references}"))
+
 async def init_db():
     async with engine.begin() as conn:
         # --- RESET LOGIC (Keep this enabled for ONE run, then comment it out) ---
@@ -26,14 +50,31 @@ async def init_db():
         
         # Create Tables
         await conn.run_sync(Base.metadata.create_all)
+        await add_missing_columns(conn)
+        for index in ADDED_INDEXES:
+            await conn.run_sync(lambda sync_conn, index=index: index.create(sync_conn, checkfirst=True))
+        # The allocator's block size must match the sequence step (it may have been created with another)
+        await conn.execute(text(f"ALTER SEQUENCE patient_id_seq INCREMENT BY {PATIENT_ID_BLOCK_SIZE}"))
         print("DATABASE: Tables recreated successfully.")
 
     # --- POPULATE DATA ---
     # We open a new session to run the population script
     async with AsyncSessionLocal() as session:
         await create_initial_data(session)
+        await seed_specialties(session)
+
+async def warm_up_rag():
+    """
+    Loads (or builds, on first boot) the RAG index off the event loop,
+    so the server accepts requests while the index is still loading.
+    """
+    try:
+        await asyncio.to_thread(initialize_rag_pipeline)
+    except Exception as e:
+        print(f"RAG: Warm-up failed: {e}")
 
 app = FastAPI()
+background_tasks = set() # Keep references so warm-up tasks aren't garbage collected
 
 # --- MOUNT STATIC FILES ---
 import os
@@ -58,11 +99,26 @@ app.include_router(appointment_api.router)
 app.include_router(knowledge_api.router)
 app.include_router(video_api.router)
 app.include_router(dashboard_api.router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(export_api.router)
+app.include_router(analytics_api.router)
 app.include_router(rasa_proxy.router)
 
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    get_classifier() # Train the triage classifier before the first request (tens of ms)
+    for coro in (warm_up_rag(), analytics.run()):
+        task = asyncio.create_task(coro)
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    for task in list(background_tasks):
+        task.cancel()
+    await close_llm_clients()
+    for e in {engine, read_engine}:
+        await e.dispose()
 
 @app.get("/")
 def read_root():
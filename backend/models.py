@@ -1,10 +1,15 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Time, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, Time, DateTime, Text, Float, Sequence, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 
+from .config import PATIENT_ID_START, PATIENT_ID_BLOCK_SIZE
+
 Base = declarative_base()
 
+# Numbers for public patient IDs; each nextval() reserves a block (see patient_ids.py)
+patient_id_seq = Sequence("patient_id_seq", start=PATIENT_ID_START, increment=PATIENT_ID_BLOCK_SIZE, metadata=Base.metadata)
+
 # --- 1. PATIENTS ---
 class Patient(Base):
     __tablename__ = "patients"
@@ -21,14 +26,44 @@ class Patient(Base):
     lab_requests = relationship("LabRequest", back_populates="patient")
     prescriptions = relationship("Prescription", back_populates="patient")
 
+class ChatSession(Base):
+    """Rasa sender_id -> the patient it logged in as; see session_store.py."""
+    __tablename__ = "chat_sessions"
+
+    sender_id = Column(String, primary_key=True)
+    patient_id = Column(String, nullable=False)
+    name = Column(String)
+    created = Column(Float, nullable=False) # Unix time
+    last_activity = Column(Float, nullable=False, index=True)
+
 # --- 2. DOCTORS ---
+class Specialty(Base):
+    __tablename__ = "specialties"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False) # "Cardiology"
+
+    aliases = relationship("SpecialtyAlias", back_populates="specialty")
+    doctors = relationship("Doctor", back_populates="specialty_ref")
+
+class SpecialtyAlias(Base):
+    """Normalized department text -> specialty ("heart" -> Cardiology); see specialties.py."""
+    __tablename__ = "specialty_aliases"
+
+    alias = Column(String, primary_key=True)
+    specialty_id = Column(Integer, ForeignKey("specialties.id"), nullable=False, index=True)
+
+    specialty = relationship("Specialty", back_populates="aliases")
+
 class Doctor(Base):
     __tablename__ = "doctors"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    specialty = Column(String) # "Cardiology"
+    specialty = Column(String) # "Cardiology" (display name, kept in step with specialty_id)
+    specialty_id = Column(Integer, ForeignKey("specialties.id"), nullable=True)
     
+    specialty_ref = relationship("Specialty", back_populates="doctors")
     availability = relationship("AvailabilitySlot", back_populates="doctor")
     appointments = relationship("Appointment", back_populates="doctor")
 
@@ -57,6 +92,7 @@ class Appointment(Base):
     consultation_mode = Column(String) # "In-Person" or "Video Call"
     meeting_link = Column(String, nullable=True) # <--- NEW COLUMN FOR ZOOM LINK
     status = Column(String, default="Scheduled")
+    cancellation_reason = Column(String, nullable=True)
     
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("Doctor", back_populates="appointments")
@@ -70,6 +106,8 @@ class LabRequest(Base):
     test_name = Column(String)
     status = Column(String, default="Scheduled") # Scheduled, In Progress, Completed
     date_requested = Column(Date, default=datetime.now().date)
+    requested_at = Column(DateTime, default=datetime.now, nullable=True) # Start of the turnaround clock
+    completed_at = Column(DateTime, nullable=True) # Set when the status becomes Completed (turnaround)
     
     patient = relationship("Patient", back_populates="lab_requests")
 
@@ -83,4 +121,49 @@ class Prescription(Base):
     pharmacist_note = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.now)
     
-    patient = relationship("Patient", back_populates="prescriptions")
\ No newline at end of file
+    patient = relationship("Patient", back_populates="prescriptions")
+
+# --- 6. ANALYTICS ROLLUPS (maintained by analytics.py, read by analytics_api.py) ---
+class DoctorDailyStats(Base):
+    """Slots and appointment outcomes per doctor per slot date."""
+    __tablename__ = "doctor_daily_stats"
+
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    total_slots = Column(Integer, default=0)
+    booked_slots = Column(Integer, default=0)
+    appointments = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    cancelled = Column(Integer, default=0)
+    no_shows = Column(Integer, default=0)
+    refreshed_at = Column(DateTime, default=datetime.now)
+
+class LabDailyStats(Base):
+    """Lab requests by the day they were requested, and how many of them are done."""
+    __tablename__ = "lab_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    requested = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    turnaround_hours_total = Column(Float, default=0.0) # Sum over the completed ones
+    refreshed_at = Column(DateTime, default=datetime.now)
+
+class QueueStats(Base):
+    """Open items per work queue ("lab", "pharmacy") and status."""
+    __tablename__ = "queue_stats"
+
+    queue = Column(String, primary_key=True)
+    status = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
+    refreshed_at = Column(DateTime, default=datetime.now)
+
+# Indexes on pre-existing tables (created by init_db, since create_all skips existing tables)
+ADDED_INDEXES = [
+    Index("ix_doctors_specialty_id", Doctor.specialty_id),
+    # Used by the analytics rollup refreshes
+    Index("ix_availability_slots_doctor_date", AvailabilitySlot.doctor_id, AvailabilitySlot.date),
+    Index("ix_appointments_slot_id", Appointment.slot_id),
+    Index("ix_lab_requests_date_requested", LabRequest.date_requested),
+    Index("ix_lab_requests_status", LabRequest.status),
+    Index("ix_prescriptions_status", Prescription.status),
+]
@@ -1,16 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
 from pydantic import BaseModel
 from typing import Optional
-import random
 
+from .config import ACTION_SERVER_TOKEN
 from .database import get_async_session
 from .models import Patient
+from .session_store import session_store
+from .patient_cache import patient_cache, PatientIdentity
+from .patient_ids import patient_ids
+from .patient_import import FORMATS, detect_format, import_patients
 
 router = APIRouter()
 
+LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+def is_action_server(request: Request) -> bool:
+    """The Rasa action server: the shared X-Action-Token, or (no token configured) a loopback caller."""
+    if ACTION_SERVER_TOKEN:
+        return hmac.compare_digest(request.headers.get("x-action-token", ""), ACTION_SERVER_TOKEN)
+    return request.client is not None and request.client.host in LOOPBACK
+
+def require_action_server(request: Request):
+    """Chat sessions map a sender to a patient: only the action server may read or bind them."""
+    if not is_action_server(request):
+        raise HTTPException(status_code=403, detail="Action server only")
+
 class PatientCreate(BaseModel):
     name: str
     email: str
@@ -18,42 +36,97 @@ class PatientCreate(BaseModel):
     gender: str
     phone: Optional[str] = "0000000000"
     health_conditions: Optional[str] = "None"
+    sender_id: Optional[str] = None # Chat session to log in as the new patient
 
-@router.post("/patients")
-async def create_patient(patient: PatientCreate, db: AsyncSession = Depends(get_async_session)):
-    # Check if email exists first
-    existing = await db.execute(select(Patient).where(Patient.email == patient.email))
-    if existing.scalars().first():
-        raise HTTPException(status_code=409, detail="Email already registered")
+class LoginRequest(BaseModel):
+    sender_id: str
+    patient_id: str
 
+@router.post("/patients")
+async def create_patient(patient: PatientCreate, request: Request, db: AsyncSession = Depends(get_async_session)):
+    if patient.sender_id:
+        require_action_server(request)
+    values = patient.model_dump(exclude={"sender_id"})
     try:
-        pid = f"PID-{random.randint(10000, 99999)}"
-        new_patient = Patient(
-            patient_id=pid,
-            name=patient.name,
-            email=patient.email,
-            age=patient.age,
-            gender=patient.gender,
-            phone=patient.phone,
-            health_conditions=patient.health_conditions
-        )
-        db.add(new_patient)
-        await db.commit()
-        await db.refresh(new_patient)
-        
-        # FIX: Return 'name' so Rasa doesn't crash
-        return {"success": True, "patient_id": pid, "name": new_patient.name} 
-
+        # One statement per attempt: a duplicate email (or a guest row already holding the ID) inserts nothing
+        for _ in range(3):
+            pid = await patient_ids.next_id(db)
+            row = (await db.execute(
+                insert(Patient).values(patient_id=pid, **values)
+                .on_conflict_do_nothing()
+                .returning(Patient.id, Patient.patient_id, Patient.name, Patient.email)
+            )).first()
+            await db.commit()
+            if row:
+                break
+            patient_cache.invalidate(email=patient.email) # Drop a stale "not found" before re-checking
+            if await patient_cache.by_email(db, patient.email):
+                raise HTTPException(status_code=409, detail="Email already registered")
+        else:
+            raise HTTPException(status_code=503, detail="Could not allocate a patient ID, please retry")
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+    identity = patient_cache.remember(PatientIdentity(*row))
+    if patient.sender_id:
+        await session_store.bind(db, patient.sender_id, identity.patient_id, identity.name)
+
+    # FIX: Return 'name' so Rasa doesn't crash
+    return {"success": True, "patient_id": identity.patient_id, "name": identity.name}
+
+@router.post("/patients/import")
+async def bulk_import_patients(request: Request, format: Optional[str] = None, include_ids: bool = False, db: AsyncSession = Depends(get_async_session)):
+    """
+    Bulk registration from a streamed CSV (with header row) or NDJSON body.
+    The format comes from ?format= or the Content-Type (text/csv,
+    application/x-ndjson). Invalid or duplicate rows are reported per line
+    and skipped; the rest are inserted in batches.
+    """
+    fmt = (format or detect_format(request.headers.get("content-type")) or "").lower()
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+
+    report = await import_patients(db, request.stream(), fmt, PatientCreate, include_ids=include_ids)
+    print(f"PATIENT IMPORT: {report.inserted} inserted, {report.failed} failed in {report.batches} batches.")
+    return report.as_dict()
+
 @router.get("/patients/lookup")
 async def lookup_patient(email: str, db: AsyncSession = Depends(get_async_session)):
-    result = await db.execute(select(Patient).where(Patient.email == email))
-    patient = result.scalars().first()
+    # Knowing an email isn't a login: no session is bound here
+    patient = await patient_cache.by_email(db, email)
     
     if patient:
         return {"success": True, "patient_id": patient.patient_id, "name": patient.name}
     else:
-        raise HTTPException(status_code=404, detail="Email not found")
\ No newline at end of file
+        raise HTTPException(status_code=404, detail="Email not found")
+
+@router.post("/patients/login", dependencies=[Depends(require_action_server)])
+async def login_patient(req: LoginRequest, db: AsyncSession = Depends(get_async_session)):
+    pid = req.patient_id.strip().upper()
+    patient = await patient_cache.by_patient_id(db, pid)
+    if not patient:
+        await session_store.unbind(db, req.sender_id)
+        raise HTTPException(status_code=404, detail="Patient ID not found")
+
+    session = await session_store.bind(db, req.sender_id, patient.patient_id, patient.name)
+    return {"success": True, **session.as_dict()}
+
+# --- Chat sessions: O(1) identity for Rasa actions ---
+@router.get("/sessions/{sender_id}", dependencies=[Depends(require_action_server)])
+async def get_session(sender_id: str, db: AsyncSession = Depends(get_async_session)):
+    session = await session_store.get(db, sender_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="No active session")
+    return session.as_dict()
+
+@router.delete("/sessions/{sender_id}", dependencies=[Depends(require_action_server)])
+async def end_session(sender_id: str, db: AsyncSession = Depends(get_async_session)):
+    return {"success": True, "ended": await session_store.unbind(db, sender_id) is not None}
+
+@router.get("/patients/metrics")
+async def get_patient_metrics(db: AsyncSession = Depends(get_async_session)):
+    """Identity cache hit rates and active chat sessions."""
+    return {"identity_cache": patient_cache.metrics(), "sessions": await session_store.metrics(db)}
@@ -0,0 +1,118 @@
+# backend/patient_cache.py
+"""
+Patient identity cache.
+
+Resolves a public patient_id (or an email) to the internal row id and
+name without a query per request. Misses are cached too, for a shorter
+PATIENT_CACHE_NEGATIVE_TTL_SECONDS, so repeated probing with guest or
+mistyped IDs doesn't reach the database each time - but only misses seen
+on the primary: a replica may simply not have the row yet.
+
+Writers call remember() after creating a patient and invalidate() after
+changing one; ensure() creates guest rows race-free (insert ... on
+conflict do nothing). Each worker has its own cache: a patient registered through
+another worker can look missing here for up to the negative TTL.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import PATIENT_CACHE_MAX_ENTRIES, PATIENT_CACHE_TTL_SECONDS, PATIENT_CACHE_NEGATIVE_TTL_SECONDS
+from .database import reads_replica
+from .models import Patient
+from .ttl_cache import TTLCache
+
+@dataclass(frozen=True)
+class PatientIdentity:
+    id: int
+    patient_id: str
+    name: str
+    email: str
+
+class PatientConflictError(ValueError):
+    """ensure() couldn't create the patient: another patient already has its email."""
+
+_NOT_FOUND = object() # Negative entry
+_COLUMNS = (Patient.id, Patient.patient_id, Patient.name, Patient.email)
+
+class PatientIdentityCache:
+    def __init__(self, max_entries: int = PATIENT_CACHE_MAX_ENTRIES, ttl: float = PATIENT_CACHE_TTL_SECONDS, negative_ttl: float = PATIENT_CACHE_NEGATIVE_TTL_SECONDS):
+        self.negative_ttl = negative_ttl
+        self._by_pid: TTLCache = TTLCache("patient_id", max_entries, ttl)
+        self._by_email: TTLCache = TTLCache("patient_email", max_entries, ttl)
+        self.queries = 0
+
+    async def _load(self, session: AsyncSession, column, value: str, cache: TTLCache) -> Optional[PatientIdentity]:
+        cached = cache.get(value)
+        if cached is _NOT_FOUND:
+            return None
+        if cached is not None:
+            return cached
+
+        self.queries += 1
+        res = await session.execute(select(*_COLUMNS).where(column == value))
+        row = res.first()
+        if row is None:
+            if not reads_replica(session):
+                cache.set(value, _NOT_FOUND, ttl=self.negative_ttl)
+            return None
+        identity = PatientIdentity(*row)
+        self._store(identity)
+        return identity
+
+    async def by_patient_id(self, session: AsyncSession, patient_id: str) -> Optional[PatientIdentity]:
+        return await self._load(session, Patient.patient_id, patient_id, self._by_pid)
+
+    async def by_email(self, session: AsyncSession, email: str) -> Optional[PatientIdentity]:
+        return await self._load(session, Patient.email, email, self._by_email)
+
+    async def ensure(self, session: AsyncSession, patient_id: str, **defaults) -> PatientIdentity:
+        """
+        Identity for patient_id, inserting a row with `defaults` if there is
+        none (e.g. guests). Concurrent requests for the same new ID insert it
+        once. Not cached until the caller commits and calls remember().
+        """
+        identity = await self.by_patient_id(session, patient_id)
+        if identity:
+            return identity
+        res = await session.execute(insert(Patient).values(patient_id=patient_id, **defaults).on_conflict_do_nothing().returning(*_COLUMNS))
+        row = res.first()
+        if row is None: # Someone else inserted it first
+            res = await session.execute(select(*_COLUMNS).where(Patient.patient_id == patient_id))
+            row = res.first()
+            if row is None:
+                raise PatientConflictError(f"Could not create patient {patient_id}: its email is already in use")
+        return PatientIdentity(*row)
+
+    def _store(self, identity: PatientIdentity):
+        self._by_pid.set(identity.patient_id, identity)
+        if identity.email:
+            self._by_email.set(identity.email, identity)
+
+    def remember(self, patient) -> PatientIdentity:
+        """Call after committing a new patient (a Patient row or PatientIdentity); replaces any negative entry."""
+        identity = PatientIdentity(patient.id, patient.patient_id, patient.name, patient.email)
+        self._store(identity)
+        return identity
+
+    def invalidate(self, patient_id: Optional[str] = None, email: Optional[str] = None):
+        """Call after a patient's id, name or email changes, or the row is deleted."""
+        cached = self._by_pid.pop(patient_id) if patient_id else None
+        if isinstance(cached, PatientIdentity) and cached.email:
+            self._by_email.pop(cached.email)
+        if email:
+            cached = self._by_email.pop(email)
+            if isinstance(cached, PatientIdentity):
+                self._by_pid.pop(cached.patient_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "by_patient_id": self._by_pid.metrics(),
+            "by_email": self._by_email.metrics(),
+            "db_queries": self.queries,
+        }
+
+patient_cache = PatientIdentityCache()
@@ -0,0 +1,50 @@
+# backend/patient_ids.py
+"""
+Public patient ID allocation.
+
+Numbers come from the Postgres sequence `patient_id_seq`, which steps by
+PATIENT_ID_BLOCK_SIZE: one nextval() reserves a whole block that this
+worker then hands out from memory. IDs are unique across workers and
+restarts (an unused tail of a block is skipped, never reused) and are
+formatted with PATIENT_ID_FORMAT, e.g. "PID-{n}" -> PID-100020.
+"""
+import asyncio
+from typing import List, Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import PATIENT_ID_FORMAT, PATIENT_ID_BLOCK_SIZE
+from .models import patient_id_seq
+
+class PatientIdAllocator:
+    def __init__(self, fmt: str = PATIENT_ID_FORMAT, block_size: int = PATIENT_ID_BLOCK_SIZE):
+        self.fmt = fmt
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0 # Exclusive end of the current block
+        self._lock: Optional[asyncio.Lock] = None
+        self.blocks_fetched = 0
+
+    async def next_id(self, session: AsyncSession) -> str:
+        # nextval() is not rolled back with the caller's transaction, so the block stays ours either way
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._next >= self._end:
+                start = await session.scalar(select(patient_id_seq.next_value()))
+                self._next, self._end = start, start + self.block_size
+                self.blocks_fetched += 1
+            n = self._next
+            self._next += 1
+        return self.fmt.format(n=n)
+
+    async def reserve(self, session: AsyncSession, count: int) -> List[str]:
+        """count IDs for a bulk insert, fetched as whole blocks in one round trip."""
+        blocks = -(-count // self.block_size)
+        res = await session.execute(select(patient_id_seq.next_value()).select_from(func.generate_series(1, blocks)))
+        self.blocks_fetched += blocks
+        numbers = [start + i for start in res.scalars() for i in range(self.block_size)]
+        return [self.fmt.format(n=n) for n in numbers[:count]]
+
+patient_ids = PatientIdAllocator()
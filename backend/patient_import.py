@@ -0,0 +1,160 @@
+# backend/patient_import.py
+"""
+Streaming bulk patient import (CSV or NDJSON).
+
+The body is parsed line by line as it arrives; only the current batch is
+held in memory. Each row is validated with patient_api.PatientCreate,
+batches of PATIENT_IMPORT_BATCH_SIZE are written with one multi-row
+INSERT ... ON CONFLICT DO NOTHING, and IDs come from whole sequence blocks
+(patient_ids.reserve). Every batch commits on its own, so a failure part
+way through keeps the rows already imported.
+
+CSV: a header row naming PatientCreate fields (name, email, age, gender,
+phone, health_conditions); quoted fields must not contain line breaks.
+NDJSON: one JSON object per line.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import PATIENT_IMPORT_BATCH_SIZE, PATIENT_IMPORT_MAX_ERRORS
+from .models import Patient
+from .patient_cache import patient_cache
+from .patient_ids import patient_ids
+
+FORMATS = ("csv", "ndjson")
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    failed: int = 0
+    batches: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    ids: Optional[List[Dict[str, Any]]] = None # line -> patient_id, when requested
+
+    def error(self, line: int, message: str, email: Optional[str] = None):
+        self.failed += 1
+        if len(self.errors) < PATIENT_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "email": email, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        out = {"inserted": self.inserted, "failed": self.failed, "batches": self.batches, "errors": self.errors}
+        if self.errors and self.failed > len(self.errors):
+            out["errors_truncated"] = True
+        if self.ids is not None:
+            out["patients"] = self.ids
+        return out
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct in ("text/csv", "application/csv"):
+        return "csv"
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"):
+        return "ndjson"
+    return None
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    """(line number, text) for each non-blank line of a byte stream."""
+    buf, number = b"", 0
+    async for chunk in chunks:
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for raw in lines:
+            number += 1
+            text = raw.decode("utf-8-sig" if number == 1 else "utf-8").rstrip("\r")
+            if text.strip():
+                yield number, text
+    if buf.strip():
+        yield number + 1, buf.decode("utf-8-sig" if number == 0 else "utf-8").rstrip("\r")
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """(line number, dict) per row; a str instead of a dict means the line couldn't be parsed."""
+    header: Optional[List[str]] = None
+    async for number, text in iter_lines(chunks):
+        if fmt == "ndjson":
+            try:
+                yield number, json.loads(text)
+            except ValueError as e:
+                yield number, f"Invalid JSON: {e}"
+            continue
+
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        if len(values) != len(header):
+            yield number, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells fall back to the schema defaults
+        yield number, {k: v.strip() for k, v in zip(header, values) if v.strip()}
+
+async def _insert_batch(session: AsyncSession, batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport):
+    try:
+        await _write_batch(session, batch, report)
+    except Exception as e:
+        # Only this batch is lost; earlier ones are committed
+        await session.rollback()
+        print(f"PATIENT IMPORT: Batch failed: {e}")
+        for line, values in batch:
+            report.error(line, f"Batch insert failed: {e}", values["email"])
+
+async def _write_batch(session: AsyncSession, batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport):
+    ids = await patient_ids.reserve(session, len(batch))
+    rows = [{**values, "patient_id": pid} for (_, values), pid in zip(batch, ids)]
+    res = await session.execute(
+        insert(Patient).values(rows).on_conflict_do_nothing().returning(Patient.patient_id)
+    )
+    created = set(res.scalars())
+    await session.commit()
+    report.batches += 1
+
+    for (line, values), pid in zip(batch, ids):
+        if pid not in created:
+            report.error(line, "Conflicts with an existing patient (email already registered)", values["email"])
+            continue
+        report.inserted += 1
+        patient_cache.invalidate(email=values["email"]) # Drop any cached "not found"
+        if report.ids is not None:
+            report.ids.append({"line": line, "patient_id": pid, "email": values["email"]})
+
+async def import_patients(
+    session: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    schema: type[BaseModel],
+    include_ids: bool = False,
+    batch_size: int = PATIENT_IMPORT_BATCH_SIZE,
+) -> ImportReport:
+    report = ImportReport(ids=[] if include_ids else None)
+    columns = set(Patient.__table__.columns.keys())
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    batch_emails = set() # One statement can't insert the same email twice
+
+    async for line, record in iter_records(chunks, fmt):
+        if isinstance(record, str):
+            report.error(line, record)
+            continue
+        try:
+            values = schema.model_validate(record).model_dump()
+        except ValidationError as e:
+            report.error(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()), record.get("email") if isinstance(record, dict) else None)
+            continue
+        values = {k: v for k, v in values.items() if k in columns}
+        if values["email"] in batch_emails:
+            report.error(line, "Duplicate email in import", values["email"])
+            continue
+
+        batch.append((line, values))
+        batch_emails.add(values["email"])
+        if len(batch) >= batch_size:
+            await _insert_batch(session, batch, report)
+            batch, batch_emails = [], set()
+
+    if batch:
+        await _insert_batch(session, batch, report)
+    return report
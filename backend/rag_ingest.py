@@ -0,0 +1,246 @@
+# backend/rag_ingest.py
+"""
+Incremental ingestion for the policy knowledge base.
+
+Every chunk gets a content-hash ID. On each sync we diff those IDs against
+the IDs already in the saved FAISS index: only new/changed chunks are
+embedded (in large batches) and removed chunks are deleted in place.
+
+Run offline with:
+    python -m backend.rag_ingest [docs_dir]
+Running workers pick up the new index from the manifest on their next query.
+There is deliberately no HTTP trigger: a sync re-embeds and blocks for as long
+as the corpus takes.
+"""
+import os
+import sys
+import json
+import pickle
+import hashlib
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+import faiss
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from .config import RAG_INDEX_DIR, RAG_INDEX_MMAP, RAG_DOCS_DIR, RAG_EMBED_BATCH_SIZE
+from .embeddings import get_embeddings, embedding_id
+
+try:
+    import fcntl # POSIX only: serialises builds across workers
+except ImportError:
+    fcntl = None
+
+# --- Chunk Settings (part of every chunk ID, with the embedding model: changing them re-embeds everything) ---
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+MANIFEST_FILE = "manifest.json"
+DOC_EXTENSIONS = (".md", ".markdown", ".txt")
+
+def get_mock_policy_documents():
+    """
+    Expanded knowledge base.
+    """
+    return [
+        ("ACCEPTED INSURANCE PLANS: We accept Blue Cross Blue Shield (Gold, Silver, Platinum), Aetna (HMO/PPO), Cigna, and Medicare Part B. We DO NOT accept Medicaid.", {"source": "Insurance Policy"}),
+        ("CO-PAYS: GP visits are $25. Specialist visits are $50. Out-of-network requires 50% upfront payment.", {"source": "Billing Guide"}),
+        ("CANCELLATION POLICY: 24-hour notice required. Late cancellations incur a $25 fee. No-shows are charged $50.", {"source": "Appointment Rules"}),
+        ("PHARMACY: Our in-house pharmacy is open 9 AM - 6 PM. We accept e-prescriptions directly from doctors.", {"source": "Pharmacy Guide"}),
+        ("LAB TESTS: Blood tests require fasting for 8 hours. Results are available in 24-48 hours via the patient portal.", {"source": "Lab Guide"}),
+    ]
+
+# =========================================================================
+# 1. CORPUS (Read & Chunk)
+# =========================================================================
+def _source_title(rel_path: str) -> str:
+    # "billing/co_pays.md" -> "Co Pays"
+    stem = os.path.splitext(os.path.basename(rel_path))[0]
+    return stem.replace("_", " ").replace("-", " ").strip().title()
+
+def load_policy_documents(docs_dir: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    docs_dir = docs_dir or RAG_DOCS_DIR
+    if not os.path.isdir(docs_dir):
+        return get_mock_policy_documents()
+
+    docs = []
+    for root, dirs, files in os.walk(docs_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(DOC_EXTENSIONS): continue
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, docs_dir).replace(os.sep, "/")
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read().replace("\f", "\n\n") # pdftotext page breaks
+            if text.strip():
+                docs.append((text, {"source": _source_title(rel), "path": rel}))
+
+    return docs or get_mock_policy_documents()
+
+def chunk_id(doc: Document) -> str:
+    h = hashlib.sha256()
+    for part in (embedding_id(), str(CHUNK_SIZE), str(CHUNK_OVERLAP), doc.metadata.get("path") or doc.metadata.get("source", ""), doc.page_content):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def chunk_documents(docs_data) -> Dict[str, Document]:
+    """Returns {chunk_id: Document}, in corpus order."""
+    texts = [d[0] for d in docs_data]
+    metadatas = [d[1] for d in docs_data]
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = {}
+    for doc in text_splitter.create_documents(texts, metadatas=metadatas):
+        chunks.setdefault(chunk_id(doc), doc)
+    return chunks
+
+def corpus_fingerprint(chunks: Dict[str, Document]) -> str:
+    return hashlib.sha256("\n".join(sorted(chunks)).encode()).hexdigest()
+
+# =========================================================================
+# 2. INDEX SYNC (Embed new chunks, delete stale ones)
+# =========================================================================
+def sync_index(faiss_index: Optional[FAISS], chunks: Dict[str, Document], embeddings) -> Tuple[Optional[FAISS], Dict[str, int]]:
+    """None for the index if there is nothing to index (no chunks)."""
+    indexed = set(faiss_index.index_to_docstore_id.values()) if faiss_index is not None else set()
+    stale = [cid for cid in indexed if cid not in chunks]
+    fresh = [cid for cid in chunks if cid not in indexed]
+
+    if faiss_index is not None and len(stale) == len(indexed):
+        faiss_index = None # Nothing reusable (e.g. settings changed): start clean
+    elif stale:
+        faiss_index.delete(stale)
+
+    for start in range(0, len(fresh), RAG_EMBED_BATCH_SIZE):
+        batch = fresh[start:start + RAG_EMBED_BATCH_SIZE]
+        texts = [chunks[cid].page_content for cid in batch]
+        metadatas = [chunks[cid].metadata for cid in batch]
+        vectors = embeddings.embed_documents(texts)
+        print(f"RAG INGEST: Embedded {start + len(batch)}/{len(fresh)} new chunks.")
+
+        if faiss_index is None:
+            faiss_index = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=batch)
+        else:
+            faiss_index.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=batch)
+
+    stats = {"added": len(fresh), "deleted": len(stale), "kept": len(indexed) - len(stale), "total": faiss_index.index.ntotal if faiss_index is not None else 0}
+    return faiss_index, stats
+
+# =========================================================================
+# 3. PERSISTENCE (Versioned files + manifest swapped last)
+# =========================================================================
+def manifest_path() -> str:
+    return os.path.join(RAG_INDEX_DIR, MANIFEST_FILE)
+
+def read_manifest() -> Optional[Dict[str, Any]]:
+    try:
+        with open(manifest_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_manifest(manifest: Dict[str, Any]):
+    # Write-then-rename so readers never see a half-written manifest
+    path = manifest_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+def save_index(faiss_index: FAISS, fingerprint: str, stats: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Index files are versioned by fingerprint, and the manifest is swapped last.
+    The previous version is kept for one more generation, so a worker that read
+    the old manifest and is mid-load keeps reading the old files safely.
+    """
+    os.makedirs(RAG_INDEX_DIR, exist_ok=True)
+    version = fingerprint[:16]
+    faiss_index.save_local(RAG_INDEX_DIR, index_name=version)
+
+    previous = read_manifest() or {}
+    kept = previous.get("version") if previous.get("version") != version else previous.get("previous_version")
+    manifest = {"fingerprint": fingerprint, "version": version, "previous_version": kept, "model": embedding_id(), "vectors": faiss_index.index.ntotal, "last_sync": stats}
+    _write_manifest(manifest)
+
+    # Drop version N-2 (and anything older left behind by a crash)
+    for name in os.listdir(RAG_INDEX_DIR):
+        stem, ext = os.path.splitext(name)
+        if ext in (".faiss", ".pkl") and stem not in (version, kept):
+            try: os.remove(os.path.join(RAG_INDEX_DIR, name))
+            except OSError: pass
+    return manifest
+
+def load_index(manifest: Dict[str, Any], embeddings, mmap: bool = RAG_INDEX_MMAP) -> FAISS:
+    """
+    Loads the saved index. With mmap the vectors are mapped read-only, so every
+    worker on the host shares the same page-cache pages. Syncing needs mmap=False:
+    a mapped index cannot be modified.
+    """
+    base = os.path.join(RAG_INDEX_DIR, manifest["version"])
+    index = None
+    if mmap:
+        # IO_FLAG_MMAP_IFC, not IO_FLAG_MMAP: the latter is ignored for the flat
+        # index save_local writes, which then gets read into private memory anyway
+        try:
+            index = faiss.read_index(f"{base}.faiss", faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError as e:
+            # Not every index type supports mmap; fall back to a private copy
+            print(f"RAG: mmap load not supported ({e}). Reading index into private memory.")
+    if index is None:
+        index = faiss.read_index(f"{base}.faiss")
+
+    with open(f"{base}.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embedding_function=embeddings, index=index, docstore=docstore, index_to_docstore_id=index_to_docstore_id)
+
+@contextmanager
+def _build_lock():
+    os.makedirs(RAG_INDEX_DIR, exist_ok=True)
+    with open(os.path.join(RAG_INDEX_DIR, ".build.lock"), "w") as lock:
+        if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
+
+def load_or_sync_index(embeddings, docs_dir: Optional[str] = None) -> Tuple[Optional[FAISS], Dict[str, Any]]:
+    """
+    Unchanged corpus: memory-maps the saved index (milliseconds).
+    Changed corpus: incremental sync under the build lock, then load.
+    Empty corpus: no index, and an empty manifest (nothing is written).
+    """
+    chunks = chunk_documents(load_policy_documents(docs_dir))
+    fingerprint = corpus_fingerprint(chunks)
+    if not chunks:
+        print("RAG INGEST: No policy text to index.")
+        return None, {"fingerprint": fingerprint, "version": None, "model": embedding_id(), "vectors": 0}
+
+    manifest = read_manifest()
+    if manifest and manifest.get("fingerprint") == fingerprint:
+        print(f"RAG: Loading saved index {manifest['version']} ({manifest.get('vectors', '?')} vectors).")
+        return load_index(manifest, embeddings), manifest
+
+    with _build_lock():
+        # Another worker may have finished the sync while we waited on the lock
+        manifest = read_manifest()
+        if manifest and manifest.get("fingerprint") == fingerprint:
+            return load_index(manifest, embeddings), manifest
+
+        current = None
+        if manifest:
+            try:
+                current = load_index(manifest, embeddings, mmap=False)
+            except (OSError, RuntimeError) as e:
+                print(f"RAG INGEST: Saved index unreadable ({e}). Rebuilding.")
+
+        print("RAG INGEST: Corpus changed. Syncing index...")
+        faiss_index, stats = sync_index(current, chunks, embeddings)
+        manifest = save_index(faiss_index, fingerprint, stats)
+        print(f"RAG INGEST: Done. {stats}")
+
+    return load_index(manifest, embeddings), manifest
+
+if __name__ == "__main__":
+    load_or_sync_index(get_embeddings(), sys.argv[1] if len(sys.argv) > 1 else None)
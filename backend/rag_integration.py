@@ -1,89 +1,244 @@
 # backend/rag_integration.py
 import os
+import time
+import asyncio
 from langchain_community.llms import Ollama
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings # Updated import
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain.chains import RetrievalQA
-from .llm_integration import get_llm, query_llm # Import query_llm for fallback
-from typing import Dict, Any, List, Optional, Text
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
+from .llm_integration import get_llm, query_llm, stream_llm, LLM_UNAVAILABLE_MESSAGE # Import query_llm for fallback
+from .llm_gateway import invoke_llm
+from .token_budget import budget_for, count_tokens, estimate_request_tokens, fit_passages, trim_to_tokens, token_usage
+from .llm_scheduler import llm_scheduler, site_priority
+from .embeddings import get_embeddings
+from .rag_ingest import get_mock_policy_documents, load_or_sync_index, load_index, read_manifest, manifest_path
+from .semantic_cache import rag_cache, embed_query
+from .hybrid_search import HybridRetriever
+from .config import RAG_MIN_RELEVANCE, RAG_DIRECT_ANSWER_SCORE
+from typing import Dict, Any, List, Optional, Text, Tuple, AsyncIterator
 
 # --- Global RAG Pipeline ---
-rag_qa_chain: Optional[RetrievalQA] = None
+rag_index: Optional[HybridRetriever] = None
+rag_llm = None
+rag_index_version: Optional[str] = None # Manifest version currently served by this worker
+_manifest_mtime: float = 0.0
 
-def get_mock_policy_documents():
-    """
-    Expanded knowledge base.
-    """
-    return [
-        ("ACCEPTED INSURANCE PLANS: We accept Blue Cross Blue Shield (Gold, Silver, Platinum), Aetna (HMO/PPO), Cigna, and Medicare Part B. We DO NOT accept Medicaid.", {"source": "Insurance Policy"}),
-        ("CO-PAYS: GP visits are $25. Specialist visits are $50. Out-of-network requires 50% upfront payment.", {"source": "Billing Guide"}),
-        ("CANCELLATION POLICY: 24-hour notice required. Late cancellations incur a $25 fee. No-shows are charged $50.", {"source": "Appointment Rules"}),
-        ("PHARMACY: Our in-house pharmacy is open 9 AM - 6 PM. We accept e-prescriptions directly from doctors.", {"source": "Pharmacy Guide"}),
-        ("LAB TESTS: Blood tests require fasting for 8 hours. Results are available in 24-48 hours via the patient portal.", {"source": "Lab Guide"}),
-    ]
+RAG_TOP_K = 2 # Strict context
+
+# Same instructions the old "stuff" RetrievalQA chain used
+RAG_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Use the following pieces of context to answer the user's question. "
+               "If you don't know the answer, just say that you don't know, don't try to make up an answer.\n"
+               "----------------\n{context}"),
+    ("human", "{question}"),
+])
+
+def _install_pipeline(retriever: Optional[HybridRetriever], manifest: Dict[str, Any]):
+    global rag_index, rag_llm, rag_index_version
+    rag_llm = get_llm("rag")
+    rag_index = retriever
+    rag_index_version = manifest["version"]
+
+def _load_retriever(docs_dir: Optional[str] = None):
+    faiss_index, manifest = load_or_sync_index(get_embeddings(), docs_dir)
+    return (HybridRetriever(faiss_index) if faiss_index is not None else None), manifest
 
 def initialize_rag_pipeline():
-    global rag_qa_chain
-    if rag_qa_chain: return
+    """
+    Blocking. Call it from a worker thread (see main.py) or build offline via:
+        python -m backend.rag_ingest
+    """
+    if rag_index: return
 
     print("RAG: Initializing Hybrid RAG pipeline...")
-    docs_data = get_mock_policy_documents()
-    texts = [d[0] for d in docs_data]
-    metadatas = [d[1] for d in docs_data]
-    
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    splits = text_splitter.create_documents(texts, metadatas=metadatas)
-    
-    # Use the updated class to avoid warnings
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    
-    faiss_index = FAISS.from_documents(splits, embeddings)
-    retriever = faiss_index.as_retriever(search_kwargs={"k": 2}) # Strict context
-    
-    llm = get_llm()
-    rag_qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",
-        retriever=retriever,
-        return_source_documents=True
-    )
+    _install_pipeline(*_load_retriever())
     print("RAG: Pipeline initialized.")
 
+async def reload_if_stale():
+    """
+    Cheap check (one stat call) for an index re-ingested by another process,
+    e.g. `python -m backend.rag_ingest` after the policy library changed.
+    """
+    global _manifest_mtime
+    if not rag_index: return
+    try:
+        mtime = os.stat(manifest_path()).st_mtime
+    except OSError:
+        return
+    if mtime == _manifest_mtime: return
+    _manifest_mtime = mtime
+
+    manifest = read_manifest()
+    if manifest and manifest.get("version") != rag_index_version:
+        print(f"RAG: Index changed ({rag_index_version} -> {manifest['version']}). Reloading.")
+        try:
+            retriever = await asyncio.to_thread(lambda: HybridRetriever(load_index(manifest, get_embeddings())))
+        except (OSError, RuntimeError) as e:
+            # Superseded again while we loaded it; retry with the current manifest next time
+            print(f"RAG: Reload of {manifest['version']} failed ({e}). Keeping {rag_index_version}.")
+            _manifest_mtime = None
+            return
+        _install_pipeline(retriever, manifest)
+
+# =========================================================================
+# RETRIEVE ONCE -> GENERATE
+# =========================================================================
+async def retrieve(query: str, vector) -> List[Tuple[Document, float]]:
+    """
+    Single hybrid (BM25 + FAISS) pass for an already-embedded query, off the event loop.
+    """
+    return await asyncio.to_thread(rag_index.search, query, vector, RAG_TOP_K)
+
+def _rag_messages(query: str, docs: List[Document]):
+    # Question gets at most a quarter of the input budget, retrieved context the rest (best passages first)
+    budget = budget_for("rag").max_input_tokens
+    question = trim_to_tokens(query, budget // 4)
+    return RAG_PROMPT.format_messages(
+        context="\n\n".join(fit_passages([doc.page_content for doc in docs], budget - count_tokens(question))),
+        question=question
+    )
+
+async def generate_answer(query: str, docs: List[Document]) -> str:
+    response = await invoke_llm("rag", _rag_messages(query, docs), cache=True)
+    return response.content.strip()
+
+def is_refusal(answer: str) -> bool:
+    """The model said the documents don't cover it; query_rag re-asks the general LLM."""
+    return "I cannot find" in answer or "I don't know" in answer
+
+async def _answer_rag(query: str, vector) -> Dict[Text, Any]:
+    # We verify if the retriever actually finds relevant docs
+    scored = await retrieve(query, vector)
+    docs = [doc for doc, score in scored if score >= RAG_MIN_RELEVANCE]
+
+    if not docs:
+        # 2. FALLBACK: No relevant policy? One general LLM generation, no RAG call.
+        print(f"RAG: No specific policy found for '{query}'. Falling back to LLM.")
+        llm_answer = await query_llm(query)
+        return {
+            "answer": f"I couldn't find a specific hospital policy for that, but generally speaking: {llm_answer}\n\n*(Generated by AI)*",
+            "sources": ["General Medical Knowledge"]
+        }
+
+    # 3. Near-verbatim policy match: the stored text is the answer
+    top_doc, top_score = scored[0]
+    if top_score >= RAG_DIRECT_ANSWER_SCORE:
+        return {"answer": top_doc.page_content, "sources": [top_doc.metadata.get("source", "Unknown")]}
+
+    # If docs found, generate specific answer from exactly those docs
+    answer = await generate_answer(query, docs)
+
+    # Check for hallucination or refusal
+    if is_refusal(answer):
+         llm_answer = await query_llm(query)
+         return {
+            "answer": f"Our policy documents don't cover that explicitly. Generally: {llm_answer}",
+            "sources": ["General Medical Knowledge"]
+        }
+
+    sources = list(set([doc.metadata.get("source", "Unknown") for doc in docs]))
+    return {"answer": answer, "sources": sources}
+
 async def query_rag(query: str) -> Dict[Text, Any]:
-    global rag_qa_chain
-    if not rag_qa_chain:
+    await reload_if_stale()
+    if not rag_index:
         return {"answer": "System initializing, please try again.", "sources": []}
 
+    # 0. Embed once: the same vector serves the semantic cache and the FAISS search
+    vector = await embed_query(query)
+    if vector is None:
+        return {"answer": "Sorry, I'm having trouble accessing the knowledge base.", "sources": []}
+
+    if rag_cache.enabled:
+        rag_cache.ensure_version(rag_index_version)
+        hit = rag_cache.lookup(vector)
+        if hit:
+            return {"answer": hit.answer, "sources": hit.sources}
+
     # 1. Try to answer with RAG (Hospital Policy)
     try:
-        # We verify if the retriever actually finds relevant docs
-        docs = rag_qa_chain.retriever.get_relevant_documents(query)
-        
-        if not docs:
-            # 2. FALLBACK: No internal docs found? Ask the LLM generally.
-            print(f"RAG: No specific policy found for '{query}'. Falling back to LLM.")
-            llm_answer = await query_llm(query)
-            return {
-                "answer": f"I couldn't find a specific hospital policy for that, but generally speaking: {llm_answer}\n\n*(Generated by AI)*",
-                "sources": ["General Medical Knowledge"]
-            }
-
-        # If docs found, generate specific answer
-        result = rag_qa_chain.invoke(query)
-        answer = result.get("result", "").strip()
-        
-        # Check for hallucination or refusal
-        if "I cannot find" in answer or "I don't know" in answer:
-             llm_answer = await query_llm(query)
-             return {
-                "answer": f"Our policy documents don't cover that explicitly. Generally: {llm_answer}",
-                "sources": ["General Medical Knowledge"]
-            }
-
-        sources = list(set([doc.metadata.get("source", "Unknown") for doc in result["source_documents"]]))
-        return {"answer": answer, "sources": sources}
+        started = time.perf_counter()
+        result = await _answer_rag(query, vector)
+        if rag_cache.enabled and LLM_UNAVAILABLE_MESSAGE not in result["answer"]:
+            rag_cache.store(query, vector, result["answer"], result["sources"], time.perf_counter() - started)
+        return result
 
     except Exception as e:
         print(f"RAG Error: {e}")
-        return {"answer": "Sorry, I'm having trouble accessing the knowledge base.", "sources": []}
\ No newline at end of file
+        return {"answer": "Sorry, I'm having trouble accessing the knowledge base.", "sources": []}
+
+# =========================================================================
+# STREAMING (Sources first, then tokens)
+# =========================================================================
+async def stream_rag(query: str) -> AsyncIterator[Dict[Text, Any]]:
+    """
+    Yields {"event": "sources", "data": [...]} first, then
+    {"event": "token", "data": "..."} as the LLM produces them. If retrieval
+    or generation fails, the last item is {"event": "error", "data": {...}}.
+    Unlike query_rag, a streamed answer can't be retracted, so the
+    "I don't know" re-ask is skipped here - and such answers aren't cached,
+    since query_rag would serve them without the re-ask.
+    """
+    await reload_if_stale()
+    if not rag_index:
+        yield {"event": "sources", "data": []}
+        yield {"event": "token", "data": "System initializing, please try again."}
+        return
+
+    vector = await embed_query(query)
+    if vector is None:
+        yield {"event": "sources", "data": []}
+        yield {"event": "token", "data": "Sorry, I'm having trouble accessing the knowledge base."}
+        return
+
+    if rag_cache.enabled:
+        rag_cache.ensure_version(rag_index_version)
+        hit = rag_cache.lookup(vector)
+        if hit:
+            yield {"event": "sources", "data": hit.sources}
+            yield {"event": "token", "data": hit.answer}
+            return
+
+    started = time.perf_counter()
+    parts: List[str] = []
+    try:
+        scored = await retrieve(query, vector)
+        docs = [doc for doc, score in scored if score >= RAG_MIN_RELEVANCE]
+
+        if not docs:
+            sources = ["General Medical Knowledge"]
+            yield {"event": "sources", "data": sources}
+            parts.append("I couldn't find a specific hospital policy for that, but generally speaking: ")
+            yield {"event": "token", "data": parts[-1]}
+            async for token in stream_llm(query):
+                parts.append(token)
+                yield {"event": "token", "data": token}
+            parts.append("\n\n*(Generated by AI)*")
+            yield {"event": "token", "data": parts[-1]}
+
+        elif scored[0][1] >= RAG_DIRECT_ANSWER_SCORE:
+            top_doc = scored[0][0]
+            sources = [top_doc.metadata.get("source", "Unknown")]
+            yield {"event": "sources", "data": sources}
+            parts.append(top_doc.page_content)
+            yield {"event": "token", "data": parts[-1]}
+
+        else:
+            sources = list(set([doc.metadata.get("source", "Unknown") for doc in docs]))
+            yield {"event": "sources", "data": sources}
+            messages = _rag_messages(query, docs)
+            async with llm_scheduler.slot(site_priority("rag"), estimate_request_tokens("rag", messages)):
+                async for chunk in rag_llm.astream(messages):
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield {"event": "token", "data": chunk.content}
+            token_usage.record_response("rag", messages, "".join(parts), time.perf_counter() - started)
+
+    except Exception as e:
+        print(f"RAG Stream Error: {e}")
+        yield {"event": "error", "data": {"message": "Sorry, I'm having trouble accessing the knowledge base.", "partial": bool(parts)}}
+        return
+
+    answer = "".join(parts).strip()
+    if rag_cache.enabled and answer and LLM_UNAVAILABLE_MESSAGE not in answer and not is_refusal(answer):
+        rag_cache.store(query, vector, answer, sources, time.perf_counter() - started)
@@ -0,0 +1,128 @@
+# backend/response_cache.py
+"""
+Exact-match LLM response cache on disk (SQLite).
+
+Keyed on the gateway request key, i.e. a hash of (provider, model,
+temperature, normalized prompt, params). WAL mode lets every uvicorn worker
+share one file, and entries survive restarts. Eviction is LRU by
+last_access, trimmed back to LLM_RESPONSE_CACHE_MAX_ENTRIES. Hits only
+note their access time in memory; the UPDATEs are written in batches by
+put() (which runs off the event loop), so a read never takes a write lock.
+"""
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+from .config import LLM_RESPONSE_CACHE_ENABLED, LLM_RESPONSE_CACHE_PATH, LLM_RESPONSE_CACHE_MAX_ENTRIES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access);
+"""
+TRIM_EVERY = 100 # Inserts between size checks
+
+class ResponseCache:
+    def __init__(self, path: str = LLM_RESPONSE_CACHE_PATH, max_entries: int = LLM_RESPONSE_CACHE_MAX_ENTRIES):
+        self.enabled = LLM_RESPONSE_CACHE_ENABLED
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local() # sqlite3 connections are per thread
+        self._inserts = 0
+        self._touched: Dict[str, float] = {} # key -> last hit, not yet written
+        self._touched_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=0.05, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL") # Losing the last few entries on power loss is fine
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Local read-only query, no network; cheap enough to call on the event loop."""
+        try:
+            row = self._conn().execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with self._touched_lock:
+                self._touched[key] = time.time()
+        except sqlite3.OperationalError as e:
+            # Locked by another worker's write: a miss is cheaper than waiting
+            print(f"RESPONSE CACHE READ ERROR: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, content: str):
+        """Blocking (may wait on another worker's write); call via asyncio.to_thread."""
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, now, now)
+            )
+            self._inserts += 1
+            self.flush_access_times()
+            if self._inserts % TRIM_EVERY == 0:
+                self.trim()
+        except sqlite3.OperationalError as e:
+            print(f"RESPONSE CACHE WRITE ERROR: {e}")
+
+    def flush_access_times(self):
+        """Writes the access times noted by get(). Blocking, like put()."""
+        with self._touched_lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
+        try:
+            self._conn().executemany("UPDATE responses SET last_access = ? WHERE key = ?", [(t, k) for k, t in touched.items()])
+        except sqlite3.OperationalError:
+            # Keep them for the next put, unless newer hits were noted meanwhile
+            with self._touched_lock:
+                for k, t in touched.items():
+                    self._touched.setdefault(k, t)
+            raise
+
+    def trim(self):
+        conn = self._conn()
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                (excess,)
+            )
+
+    def clear(self):
+        self._conn().execute("DELETE FROM responses")
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        try:
+            entries = self._conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        except sqlite3.OperationalError:
+            entries = None
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+response_cache = ResponseCache()
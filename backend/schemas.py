@@ -1,5 +1,5 @@
 # backend/schemas.py
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field
 from typing import List, Optional
 from datetime import date, time
 
@@ -42,6 +42,9 @@ class Doctor(BaseSchema):
     name: str
     specialty: str
 
+class DoctorMatch(Doctor):
+    score: float
+
 class AvailabilitySlot(BaseSchema):
     id: int
     date: date
@@ -105,4 +108,20 @@ class PatientVerifyRequest(BaseModel):
 class PatientLookupRequest(BaseModel):
     """Schema for looking up Patient ID via email."""
     email: EmailStr
-# --- [END] CRITICAL FIX ---
\ No newline at end of file
+# --- [END] CRITICAL FIX ---
+
+# --- Batch Status Updates (dashboards) ---
+class StatusUpdateItem(BaseModel):
+    id: int
+    status: str
+    reason: Optional[str] = None # Cancellation reason (appointments only)
+
+class BatchStatusUpdate(BaseModel):
+    """Target status per item; applied in one transaction."""
+    items: List[StatusUpdateItem] = Field(..., min_length=1, max_length=1000)
+
+class StatusUpdateResult(BaseModel):
+    id: int
+    updated: bool
+    status: Optional[str] = None
+    error: Optional[str] = None
@@ -0,0 +1,124 @@
+# backend/semantic_cache.py
+"""
+Semantic answer cache for knowledge queries.
+
+A new query reuses a stored answer when its MiniLM embedding is within
+SEMANTIC_CACHE_THRESHOLD (cosine) of a cached query. Entries are evicted
+LRU-first and expire after SEMANTIC_CACHE_TTL_SECONDS.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_TTL_SECONDS
+from .embeddings import get_embeddings
+
+@dataclass
+class CacheEntry:
+    query: str
+    vector: np.ndarray
+    answer: str
+    sources: List[str]
+    latency: float # Seconds the original generation took (= time saved per hit)
+    created: float = field(default_factory=time.monotonic)
+
+class SemanticCache:
+    def __init__(self, name: str, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, ttl: float = SEMANTIC_CACHE_TTL_SECONDS, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.name = name
+        self.enabled = SEMANTIC_CACHE_ENABLED
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.version: Optional[str] = None # Corpus version the entries were built from
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._next_key = 0
+        self._matrix: Optional[np.ndarray] = None # Stacked vectors, rebuilt lazily after writes
+        self._keys: List[int] = []
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency = 0.0
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        expired = [k for k, e in self._entries.items() if now - e.created > self.ttl]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, vector: np.ndarray) -> Optional[CacheEntry]:
+        self._purge_expired()
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        if self._matrix is None:
+            self._keys = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[k].vector for k in self._keys])
+
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        key = self._keys[best]
+        self._entries.move_to_end(key) # LRU touch
+        entry = self._entries[key]
+        self.hits += 1
+        self.saved_latency += entry.latency
+        return entry
+
+    def store(self, query: str, vector: np.ndarray, answer: str, sources: List[str], latency: float):
+        self._entries[self._next_key] = CacheEntry(query, vector, answer, sources, latency)
+        self._next_key += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+    def invalidate(self, version: Optional[str] = None):
+        self._entries.clear()
+        self._matrix = None
+        self.version = version
+
+    def ensure_version(self, version: Optional[str]):
+        """Drops every entry when the corpus has been re-ingested."""
+        if version != self.version:
+            if self._entries:
+                print(f"SEMANTIC CACHE [{self.name}]: Corpus changed ({self.version} -> {version}). Invalidating.")
+            self.invalidate(version)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_llm_seconds": round(self.saved_latency, 3),
+        }
+
+# --- RAG answers only. Triage is never reused by similarity: severity words
+# ("mild" vs "severe") barely move the embedding but change the risk level. ---
+rag_cache = SemanticCache("rag")
+
+async def embed_query(query: str) -> Optional[np.ndarray]:
+    """
+    Unit-length MiniLM vector for the query (same model as the RAG index),
+    computed off the event loop and micro-batched with concurrent queries.
+    None if the embedding model failed.
+    """
+    try:
+        vector = await get_embeddings().aembed_query(query.strip())
+    except Exception as e:
+        print(f"EMBEDDING ERROR: {e}")
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def cache_metrics() -> Dict[str, Any]:
+    return {"rag": rag_cache.metrics()}
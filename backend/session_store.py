@@ -0,0 +1,95 @@
+# backend/session_store.py
+"""
+Per-sender chat sessions.
+
+Maps a Rasa sender_id to the patient it has been verified as, so actions
+resolve identity with one primary-key lookup instead of scanning the
+conversation history. A session is bound at login (POST /patients/login)
+and at registration from the chat (POST /patients with a sender_id), and
+ends at logout or after SESSION_TTL_SECONDS without activity.
+
+Sessions are rows in chat_sessions, not process memory: the action server
+may reach any uvicorn worker, and a login on one must be seen by all.
+"""
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import SESSION_TTL_SECONDS
+from .models import ChatSession
+
+_COLUMNS = (ChatSession.sender_id, ChatSession.patient_id, ChatSession.name, ChatSession.created, ChatSession.last_activity)
+
+@dataclass
+class Session:
+    sender_id: str
+    patient_id: str
+    name: str
+    created: float
+    last_activity: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class SessionStore:
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self.hits = 0 # This worker's lookups
+        self.misses = 0
+
+    async def bind(self, db: AsyncSession, sender_id: str, patient_id: str, name: str) -> Session:
+        now = time.time()
+        stmt = insert(ChatSession).values(sender_id=sender_id, patient_id=patient_id, name=name, created=now, last_activity=now)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["sender_id"], set_={"patient_id": patient_id, "name": name, "created": now, "last_activity": now}
+        ))
+        await db.commit()
+        return Session(sender_id, patient_id, name, now, now)
+
+    async def get(self, db: AsyncSession, sender_id: str) -> Optional[Session]:
+        # Lookup and sliding-expiry touch in one statement
+        now = time.time()
+        row = (await db.execute(
+            update(ChatSession)
+            .where(ChatSession.sender_id == sender_id, ChatSession.last_activity > now - self.ttl)
+            .values(last_activity=now)
+            .returning(*_COLUMNS)
+        )).first()
+        await db.commit()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Session(*row)
+
+    async def unbind(self, db: AsyncSession, sender_id: str) -> Optional[Session]:
+        """The session that was active, if any."""
+        row = (await db.execute(delete(ChatSession).where(ChatSession.sender_id == sender_id).returning(*_COLUMNS))).first()
+        await db.commit()
+        if row is None or row.last_activity <= time.time() - self.ttl:
+            return None
+        return Session(*row)
+
+    async def purge_expired(self, db: AsyncSession) -> int:
+        res = await db.execute(delete(ChatSession).where(ChatSession.last_activity <= time.time() - self.ttl))
+        await db.commit()
+        return res.rowcount
+
+    async def metrics(self, db: AsyncSession) -> Dict[str, Any]:
+        purged = await self.purge_expired(db)
+        active = (await db.execute(select(func.count()).select_from(ChatSession))).scalar_one()
+        lookups = self.hits + self.misses
+        return {
+            "entries": active,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired_purged": purged,
+        }
+
+session_store = SessionStore()
@@ -0,0 +1,44 @@
+# backend/singleflight.py
+"""
+In-flight request coalescing ("single flight").
+
+Concurrent callers with the same key share one execution: the first caller
+starts it, everyone else awaits the same task. Once it finishes the key is
+released, so later calls run fresh.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            # Run as its own task: if the first caller is cancelled, the others still get the result
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception() # Mark as retrieved even if every caller went away
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / total, 4) if total else 0.0,
+        }
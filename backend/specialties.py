@@ -0,0 +1,103 @@
+# backend/specialties.py
+"""
+Specialty catalog and department resolution.
+
+Departments typed in the chat ("heart", "Cardiologist", "skin doctor") are
+normalized (lowercase, punctuation and filler words such as "department"
+dropped) and then matched exactly against specialty_aliases, whose
+primary key is the normalized alias. Resolution is one index probe, with
+no LIKE scans. Each specialty's own name is also one of its aliases.
+
+SPECIALTY_CATALOG is seeded at startup (seed_specialties). Doctors link to
+a specialty through Doctor.specialty_id, which is backfilled from their
+free-text specialty column. A doctor specialty missing from the catalog
+becomes a specialty of its own.
+"""
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Doctor, Specialty, SpecialtyAlias
+
+# Canonical name -> what patients call it. Extend as departments are added.
+# Departments and body areas only, never symptoms: "chest pain" typed here
+# must go to triage, not into an ordinary booking form.
+SPECIALTY_CATALOG: Dict[str, List[str]] = {
+    "Cardiology": ["Cardiologist", "Cardiac", "Cardio", "Heart", "Heart Specialist"],
+    "General Medicine": ["General Physician", "General Practice", "General Practitioner", "GP", "Family Medicine", "Internal Medicine", "Physician", "General", "Primary Care"],
+    "Dermatology": ["Dermatologist", "Derm", "Skin", "Skin Care", "Hair"],
+    "Pediatrics": ["Paediatrics", "Pediatric", "Paediatric", "Pediatrician", "Paediatrician", "Child", "Children", "Kids", "Baby"],
+    "Surgery": ["Surgeon", "General Surgery", "Surgical", "Operation"],
+}
+
+# Seeded by earlier versions of the catalog; removed from existing databases
+RETIRED_ALIASES = ["Chest Pain", "Blood Pressure", "Fever", "Rash", "Acne"]
+
+_WORD = re.compile(r"[a-z0-9]+")
+_FILLER = {
+    "the", "a", "an", "of", "for", "my", "department", "dept", "clinic", "ward", "unit", "doctor", "doctors", "dr", "specialist", "specialists",
+    # Chat phrasing around the name ("cardiology please", "I need to see dermatology")
+    "please", "pls", "i", "id", "would", "can", "me", "like", "want", "need", "get", "to", "see", "in", "with", "book", "appointment",
+}
+
+def normalize_department(text: str) -> str:
+    words = [w for w in _WORD.findall((text or "").lower()) if w not in _FILLER]
+    if not words:
+        # e.g. just "Doctor": keep the words rather than return an empty key
+        words = _WORD.findall((text or "").lower())
+    return " ".join(words)
+
+async def resolve_specialty(session: AsyncSession, text: str) -> Optional[Specialty]:
+    """The specialty a department name or alias refers to, or None."""
+    key = normalize_department(text)
+    if not key:
+        return None
+    res = await session.execute(
+        select(Specialty).join(SpecialtyAlias, SpecialtyAlias.specialty_id == Specialty.id).where(SpecialtyAlias.alias == key)
+    )
+    return res.scalars().first()
+
+async def seed_specialties(session: AsyncSession):
+    """Inserts missing catalog entries and links doctors without a specialty_id. Idempotent."""
+    wanted: Dict[str, str] = {} # alias -> specialty name
+    for name, aliases in SPECIALTY_CATALOG.items():
+        for alias in [name, *aliases]:
+            wanted.setdefault(normalize_department(alias), name)
+
+    res = await session.execute(select(Doctor.specialty).distinct().where(Doctor.specialty_id.is_(None), Doctor.specialty.is_not(None)))
+    for spec in res.scalars():
+        key = normalize_department(spec)
+        if key and key not in wanted:
+            wanted[key] = spec.strip()
+
+    # ON CONFLICT: several workers may seed at once, and existing rows win
+    await session.execute(
+        insert(Specialty).values([{"name": n} for n in sorted(set(wanted.values()))]).on_conflict_do_nothing(index_elements=["name"])
+    )
+    ids = dict((await session.execute(select(Specialty.name, Specialty.id))).all())
+    await session.execute(
+        insert(SpecialtyAlias).values([{"alias": a, "specialty_id": ids[n]} for a, n in wanted.items()]).on_conflict_do_nothing(index_elements=["alias"])
+    )
+
+    retired = [normalize_department(a) for a in RETIRED_ALIASES]
+    await session.execute(delete(SpecialtyAlias).where(SpecialtyAlias.alias.in_([a for a in retired if a not in wanted])))
+
+    # Backfill: one UPDATE per specialty, also setting the display name to the canonical one
+    aliases = dict((await session.execute(select(SpecialtyAlias.alias, SpecialtyAlias.specialty_id))).all())
+    names = {i: n for n, i in ids.items()}
+    res = await session.execute(select(Doctor.id, Doctor.specialty).where(Doctor.specialty_id.is_(None), Doctor.specialty.is_not(None)))
+    by_specialty: Dict[int, List[int]] = {}
+    for doctor_id, spec in res.all():
+        specialty_id = aliases.get(normalize_department(spec))
+        if specialty_id is not None:
+            by_specialty.setdefault(specialty_id, []).append(doctor_id)
+    for specialty_id, doctor_ids in by_specialty.items():
+        await session.execute(
+            update(Doctor).where(Doctor.id.in_(doctor_ids)).values(specialty_id=specialty_id, specialty=names[specialty_id])
+        )
+    await session.commit()
+    if by_specialty:
+        print(f"Database: Linked {sum(map(len, by_specialty.values()))} doctors to {len(by_specialty)} specialties.")
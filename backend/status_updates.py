@@ -0,0 +1,69 @@
+# backend/status_updates.py
+"""
+Set-based status transitions for the staff dashboards.
+
+Items are grouped by (status, reason) and each group is one
+    UPDATE <table> SET status = ... WHERE id IN (...) RETURNING id
+so marking 200 lab samples "Completed" is a single statement. All groups
+run in one transaction; IDs that matched no row come back as not found.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .schemas import StatusUpdateItem, StatusUpdateResult
+
+_UNCHANGED = object() # Leave the reason column as it is
+
+def completion_time(status: str, current: Optional[datetime]) -> Optional[datetime]:
+    """completed_at for a single-row update: kept if already set, cleared when moved off Completed."""
+    if status != "Completed":
+        return None
+    return current or datetime.now()
+
+def _reason_value(item: StatusUpdateItem):
+    # Same rules as the single-item PATCH: a reason is kept only on cancellation
+    if item.status == "Cancelled":
+        return item.reason if item.reason else _UNCHANGED
+    return None
+
+async def apply_status_batch(
+    session: AsyncSession,
+    model,
+    items: List[StatusUpdateItem],
+    reason_column: Optional[str] = None,
+    completed_column: Optional[str] = None,
+) -> List[StatusUpdateResult]:
+    latest: Dict[int, StatusUpdateItem] = {item.id: item for item in items} # Last entry per ID wins
+    groups: Dict[Tuple[str, object], List[int]] = defaultdict(list)
+    for item in latest.values():
+        reason = _reason_value(item) if reason_column else _UNCHANGED
+        groups[(item.status, reason)].append(item.id)
+
+    updated = set()
+    try:
+        for (status, reason), ids in groups.items():
+            values = {"status": status}
+            if reason is not _UNCHANGED:
+                values[reason_column] = reason
+            if completed_column:
+                column = getattr(model, completed_column)
+                values[completed_column] = func.coalesce(column, datetime.now()) if status == "Completed" else None
+            res = await session.execute(
+                update(model).where(model.id.in_(ids)).values(**values).returning(model.id)
+                .execution_options(synchronize_session=False)
+            )
+            updated.update(res.scalars())
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+
+    return [
+        StatusUpdateResult(id=i, updated=True, status=item.status) if i in updated
+        else StatusUpdateResult(id=i, updated=False, error="Not found")
+        for i, item in latest.items()
+    ]
@@ -0,0 +1,216 @@
+# backend/symptom_extractor.py
+"""
+Local symptom extractor: the fast path in front of extract_symptoms_from_llm.
+
+One Aho-Corasick automaton over every synonym in SYMPTOM_LEXICON finds all
+mentions in a single pass over the text. Mentions inside a negation scope
+("no fever", "denies chest pain") are dropped. The result has the same shape
+as the LLM extractor: {"main_symptom": str, "associated": [str]}.
+
+coverage is the share of content words the lexicon accounted for. Below
+SYMPTOM_FASTPATH_MIN_COVERAGE, the caller should ask the LLM instead.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import SYMPTOM_FASTPATH_MIN_COVERAGE
+
+# canonical name -> surface forms (lowercase)
+SYMPTOM_LEXICON: Dict[str, List[str]] = {
+    "headache": ["headache", "headaches", "head ache", "head hurts", "head is pounding", "migraine", "head pain"],
+    "fever": ["fever", "feverish", "high temperature", "temperature", "pyrexia", "running a temp"],
+    "chills": ["chills", "shivering", "shivers", "rigors"],
+    "cough": ["cough", "coughing", "dry cough", "wet cough", "productive cough"],
+    "cold": ["cold", "common cold", "runny nose", "blocked nose", "stuffy nose", "nasal congestion", "sneezing"],
+    "sore throat": ["sore throat", "throat pain", "scratchy throat", "throat hurts", "painful swallowing"],
+    "shortness of breath": ["shortness of breath", "short of breath", "breathless", "breathlessness", "difficulty breathing", "trouble breathing", "cant breathe", "can't breathe"],
+    "chest pain": ["chest pain", "chest tightness", "tight chest", "chest pressure", "pain in my chest", "pain in the chest"],
+    "palpitations": ["palpitations", "heart racing", "racing heart", "heart pounding", "irregular heartbeat"],
+    "fatigue": ["fatigue", "tired", "tiredness", "exhausted", "exhaustion", "weakness", "lethargy", "no energy"],
+    "dizziness": ["dizziness", "dizzy", "lightheaded", "light headed", "vertigo", "room spinning"],
+    "fainting": ["fainting", "fainted", "passed out", "blackout", "blacked out", "syncope"],
+    "nausea": ["nausea", "nauseous", "nauseated", "queasy", "feel sick"],
+    "vomiting": ["vomiting", "vomit", "vomited", "throwing up", "threw up"],
+    "diarrhea": ["diarrhea", "diarrhoea", "loose stools", "loose motions", "watery stools"],
+    "constipation": ["constipation", "constipated"],
+    "abdominal pain": ["abdominal pain", "stomach ache", "stomachache", "stomach pain", "tummy ache", "belly pain", "stomach cramps", "abdominal cramps"],
+    "back pain": ["back pain", "backache", "lower back pain", "back hurts"],
+    "joint pain": ["joint pain", "joint aches", "arthralgia", "knee pain", "swollen joints"],
+    "muscle aches": ["muscle aches", "muscle pain", "body aches", "body ache", "body pain", "myalgia", "aching muscles"],
+    "rash": ["rash", "skin rash", "hives", "red spots", "itchy skin", "itching", "itchy"],
+    "swelling": ["swelling", "swollen", "puffy", "edema", "oedema"],
+    "loss of smell": ["loss of smell", "cant smell", "can't smell", "anosmia"],
+    "loss of taste": ["loss of taste", "cant taste", "can't taste"],
+    "ear pain": ["ear pain", "earache", "ear ache", "ear hurts"],
+    "eye pain": ["eye pain", "red eyes", "itchy eyes", "watery eyes", "blurred vision", "blurry vision"],
+    "toothache": ["toothache", "tooth ache", "tooth pain"],
+    "burning urination": ["burning urination", "painful urination", "burning when i pee", "burns when i pee", "dysuria"],
+    "frequent urination": ["frequent urination", "peeing a lot", "urinating frequently"],
+    "insomnia": ["insomnia", "cant sleep", "can't sleep", "trouble sleeping", "sleeplessness"],
+    "anxiety": ["anxiety", "anxious", "panic attack", "panic attacks", "nervous"],
+    "numbness": ["numbness", "numb", "tingling", "pins and needles"],
+    "confusion": ["confusion", "confused", "disoriented"],
+    "weight loss": ["weight loss", "losing weight", "lost weight"],
+    "loss of appetite": ["loss of appetite", "no appetite", "not hungry"],
+    "night sweats": ["night sweats", "sweating at night"],
+    "bleeding": ["bleeding", "blood in stool", "blood in urine", "coughing blood", "coughing up blood", "nosebleed"],
+    "seizure": ["seizure", "seizures", "fits", "convulsions"],
+    "heartburn": ["heartburn", "acid reflux", "indigestion", "acidity"],
+    "wheezing": ["wheezing", "wheeze", "wheezy"],
+}
+
+NEGATION_CUES = ["no", "not", "without", "denies", "deny", "never", "negative for", "free of", "dont have", "don't have", "do not have", "havent had", "haven't had", "no sign of", "no signs of"]
+# Commas don't end the scope: "no fever, chills or cough" negates all three
+SCOPE_BREAKS = {"but", "however", "though", "although", "except", "yet", ".", ";", "!", "?"}
+NEGATION_WINDOW = 5 # Tokens a cue reaches forward
+
+# Words that carry no symptom information; excluded from coverage
+FILLER = {
+    "i", "im", "i'm", "ive", "i've", "me", "my", "a", "an", "the", "and", "or", "with", "have", "has", "had", "having",
+    "am", "is", "are", "was", "been", "be", "feel", "feeling", "felt", "got", "get", "getting", "some", "also", "since",
+    "for", "of", "in", "on", "at", "to", "from", "very", "really", "bit", "little", "lot", "bad", "severe", "mild",
+    "slight", "terrible", "day", "days", "week", "weeks", "yesterday", "today", "morning", "night", "last", "past",
+    "two", "three", "few", "couple", "it", "its", "it's", "this", "that", "like", "kind", "sort", "keep", "keeps",
+    "started", "starting", "constant", "sudden", "suddenly", "now", "still", "again", "just", "so", "too",
+    "hi", "hello", "doctor", "please", "help", "experiencing", "suffering", "symptoms", "symptom",
+} | SCOPE_BREAKS | {","}
+TOKEN_RE = re.compile(r"[a-z0-9']+|[.,;!?]") # Punctuation kept: it ends a negation scope
+
+@dataclass
+class Mention:
+    symptom: str
+    start: int # Token span [start, end)
+    end: int
+    negated: bool = False
+
+@dataclass
+class Extraction:
+    positive: List[str] = field(default_factory=list)
+    negated: List[str] = field(default_factory=list)
+    coverage: float = 0.0
+
+    def as_result(self, query: str) -> Dict[str, Any]:
+        return {
+            "main_symptom": self.positive[0] if self.positive else query,
+            "associated": self.positive[1:],
+        }
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over token sequences: all patterns are found in
+    one left-to-right pass, independent of how many patterns there are.
+    """
+    def __init__(self, patterns: Dict[Tuple[str, ...], Any]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, Any]]] = [[]] # (pattern length, value)
+        for tokens, value in patterns.items():
+            state = 0
+            for tok in tokens:
+                if tok not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                    self.goto[state][tok] = len(self.goto) - 1
+                state = self.goto[state][tok]
+            self.out[state].append((len(tokens), value))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for tok, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(tok, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, tokens: List[str]) -> List[Tuple[int, int, Any]]:
+        """All matches as (start, end, value)."""
+        matches = []
+        state = 0
+        for i, tok in enumerate(tokens):
+            while state and tok not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(tok, 0)
+            for length, value in self.out[state]:
+                matches.append((i + 1 - length, i + 1, value))
+        return matches
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower().replace("’", "'"))
+
+def _build() -> Tuple[AhoCorasick, AhoCorasick]:
+    symptoms = {}
+    for canonical, forms in SYMPTOM_LEXICON.items():
+        for form in [canonical] + forms:
+            symptoms[tuple(tokenize(form))] = canonical
+    negations = {tuple(tokenize(cue)): True for cue in NEGATION_CUES}
+    return AhoCorasick(symptoms), AhoCorasick(negations)
+
+_symptom_matcher, _negation_matcher = _build()
+_stats = {"fast_path": 0, "llm_fallback": 0}
+
+def _longest_non_overlapping(matches: List[Tuple[int, int, Any]]) -> List[Tuple[int, int, Any]]:
+    # Leftmost-longest: "chest pain" wins over "pain", "sore throat" over "throat"
+    matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+    chosen, last_end = [], 0
+    for m in matches:
+        if m[0] >= last_end:
+            chosen.append(m)
+            last_end = m[1]
+    return chosen
+
+def find_mentions(tokens: List[str], matcher: Optional[AhoCorasick] = None) -> List[Mention]:
+    """Lexicon (or `matcher`) mentions in `tokens`, each flagged if negated."""
+    matcher = matcher or _symptom_matcher
+    mentions = [Mention(value, s, e) for s, e, value in _longest_non_overlapping(matcher.find(tokens))]
+    inside = {i for m in mentions for i in range(m.start, m.end)}
+    # A cue that is part of a symptom ("no energy") is not a negation
+    cue_ends = sorted(e for s, e, _ in _longest_non_overlapping(_negation_matcher.find(tokens)) if s not in inside)
+    for m in mentions:
+        for cue_end in cue_ends:
+            if cue_end > m.start: break
+            window = tokens[cue_end:m.start]
+            if len(window) <= NEGATION_WINDOW and not SCOPE_BREAKS.intersection(window):
+                m.negated = True
+    return mentions
+
+def extract_symptoms(text: str) -> Extraction:
+    """Pure CPU, no I/O: a few microseconds for typical chat messages."""
+    tokens = tokenize(text)
+    mentions = find_mentions(tokens)
+
+    covered = set()
+    for m in mentions:
+        covered.update(range(m.start, m.end))
+    cue_positions = {i for s, e, _ in _negation_matcher.find(tokens) for i in range(s, e)}
+    content = [i for i, tok in enumerate(tokens) if tok not in FILLER and i not in cue_positions and not tok.isdigit()]
+    coverage = (sum(1 for i in content if i in covered) / len(content)) if content else 0.0
+
+    result = Extraction(coverage=round(coverage, 3))
+    for m in mentions:
+        bucket = result.negated if m.negated else result.positive
+        if m.symptom not in bucket:
+            bucket.append(m.symptom)
+    result.positive = [s for s in result.positive if s not in result.negated]
+    return result
+
+def try_fast_path(text: str, min_coverage: float = SYMPTOM_FASTPATH_MIN_COVERAGE) -> Optional[Dict[str, Any]]:
+    """
+    The LLM-shaped result when the lexicon explains the text well enough,
+    otherwise None (the caller falls back to the LLM).
+    """
+    extraction = extract_symptoms(text)
+    if extraction.positive and extraction.coverage >= min_coverage:
+        _stats["fast_path"] += 1
+        return extraction.as_result(text)
+    _stats["llm_fallback"] += 1
+    return None
+
+def fastpath_metrics() -> Dict[str, Any]:
+    total = _stats["fast_path"] + _stats["llm_fallback"]
+    return {**_stats, "hit_rate": round(_stats["fast_path"] / total, 4) if total else 0.0}
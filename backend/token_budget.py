@@ -0,0 +1,139 @@
+# backend/token_budget.py
+"""
+Per-call-site token budgets.
+
+Each site gets an input budget (user text / retrieved context, on top of
+its fixed instructions) and an output cap that is sent to the provider as
+max_tokens. Override either with the env, e.g.
+    LLM_TRIAGE_MAX_TOKENS=150  LLM_RAG_MAX_INPUT_TOKENS=2000
+
+Counting uses tiktoken (cl100k_base, close enough to Llama 3 for
+budgeting) when installed, otherwise ~4 characters per token.
+
+TokenUsage records prompt/completion tokens and latency per site, which
+is what p99 latency targets are set from.
+"""
+import math
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage
+
+from .config import llm_site_setting
+
+@dataclass(frozen=True)
+class SiteBudget:
+    max_input_tokens: int
+    max_output_tokens: int
+
+SITE_BUDGETS = {
+    "extraction": SiteBudget(max_input_tokens=300, max_output_tokens=96), # Short JSON
+    "triage": SiteBudget(max_input_tokens=600, max_output_tokens=120), # Three labelled lines
+    "rag": SiteBudget(max_input_tokens=1200, max_output_tokens=256), # Retrieved context
+    "prescription": SiteBudget(max_input_tokens=200, max_output_tokens=160), # JSON list of 3
+    "default": SiteBudget(max_input_tokens=1000, max_output_tokens=256),
+}
+
+@lru_cache(maxsize=None)
+def budget_for(site: str) -> SiteBudget:
+    base = SITE_BUDGETS.get(site, SITE_BUDGETS["default"])
+    return SiteBudget(
+        max_input_tokens=int(llm_site_setting(site, "MAX_INPUT_TOKENS", base.max_input_tokens)),
+        max_output_tokens=int(llm_site_setting(site, "MAX_TOKENS", base.max_output_tokens)),
+    )
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken # Optional: exact counts
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+CHARS_PER_TOKEN = 4
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def count_message_tokens(messages: List[BaseMessage]) -> int:
+    return sum(count_tokens(str(m.content)) + 4 for m in messages) # + role/format overhead
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Keeps the beginning of `text` within max_tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    enc = _encoding()
+    if enc is not None:
+        cut = enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        cut = text[:max_tokens * CHARS_PER_TOKEN]
+    # Don't end mid-word
+    if " " in cut[-20:]:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip() + " …"
+
+def fit_passages(passages: List[str], max_tokens: int) -> List[str]:
+    """
+    Best-first passages that fit in max_tokens; the first one that doesn't
+    fit is trimmed to the space left, the rest are dropped.
+    """
+    out, used = [], 0
+    for text in passages:
+        n = count_tokens(text)
+        if used + n <= max_tokens:
+            out.append(text)
+            used += n
+            continue
+        if max_tokens - used > 50 or not out:
+            out.append(trim_to_tokens(text, max_tokens - used))
+        break
+    return out
+
+def estimate_request_tokens(site: str, messages: List[BaseMessage]) -> int:
+    """Prompt tokens + the site's output cap: what the call can cost against the provider quota."""
+    return count_message_tokens(messages) + budget_for(site).max_output_tokens
+
+class TokenUsage:
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, site: str, prompt_tokens: int, completion_tokens: int, latency: float):
+        self._samples.setdefault(site, deque(maxlen=self.window)).append((prompt_tokens, completion_tokens, latency))
+
+    def record_response(self, site: str, messages: List[BaseMessage], content: str, latency: float, usage: Optional[Dict[str, Any]] = None):
+        # Provider-reported usage when available, else our own count
+        usage = usage or {}
+        self.record(
+            site,
+            usage.get("input_tokens") or count_message_tokens(messages),
+            usage.get("output_tokens") or count_tokens(content),
+            latency,
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        def pct(values, q):
+            values = sorted(values)
+            return values[min(int(len(values) * q), len(values) - 1)]
+        out = {}
+        for site, samples in self._samples.items():
+            prompt, completion, latency = zip(*samples)
+            budget = budget_for(site)
+            out[site] = {
+                "calls": len(samples),
+                "max_input_tokens": budget.max_input_tokens,
+                "max_output_tokens": budget.max_output_tokens,
+                "avg_prompt_tokens": round(sum(prompt) / len(prompt), 1),
+                "avg_completion_tokens": round(sum(completion) / len(completion), 1),
+                "p99_completion_tokens": pct(completion, 0.99),
+                "p50_latency_ms": round(pct(latency, 0.5) * 1000, 1),
+                "p99_latency_ms": round(pct(latency, 0.99) * 1000, 1),
+            }
+        return out
+
+token_usage = TokenUsage()
@@ -0,0 +1,146 @@
+# backend/triage_classifier.py
+"""
+Local risk-level classifier: Low / Moderate / High / Critical.
+
+Two stages, both in-process:
+  1. Red-flag rules (RED_FLAGS). A non-negated match is Critical straight
+     away - emergencies never wait on a model or an external API.
+  2. TF-IDF (word unigrams + bigrams, plus lexicon symptom features) into a
+     softmax linear model, trained at first use from TRIAGE_TRAINING_FILE
+     (CSV with "text,level").
+
+A Low/Moderate prediction below TRIAGE_MIN_CONFIDENCE is marked ambiguous;
+only those are worth an LLM call. A High/Critical top label is never
+ambiguous: a possible emergency is answered locally, however unsure.
+
+    python -m backend.triage_classifier "chest pain spreading to my arm" "runny nose"
+"""
+import csv
+import sys
+import math
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .symptom_extractor import AhoCorasick, find_mentions, tokenize
+from .config import TRIAGE_TRAINING_FILE, TRIAGE_MIN_CONFIDENCE
+
+LEVELS = ["Low", "Moderate", "High", "Critical"]
+
+RED_FLAGS = [
+    "heart attack", "crushing chest pain", "chest pain spreading", "chest pain radiating",
+    "chest pain",
+    "not breathing", "stopped breathing", "cant breathe", "can't breathe", "cannot breathe",
+    "blue lips", "lips turning blue", "lips are turning blue", "lips are blue", "lips went blue", "turning blue",
+    "unconscious", "unresponsive", "not responding", "collapsed",
+    "stroke", "face drooping", "slurred speech", "weakness on one side",
+    "seizure that won't stop", "anaphylaxis", "anaphylactic", "throat closing", "throat is closing",
+    "severe bleeding", "bleeding that won't stop", "heavy bleeding",
+    "kill myself", "suicide", "overdose", "overdosed", "choking",
+    "worst headache of my life", "gunshot", "stabbed",
+]
+_red_flags = AhoCorasick({tuple(tokenize(p)): p for p in RED_FLAGS})
+
+@dataclass
+class TriageResult:
+    level: str
+    confidence: float
+    source: str # "rule" | "model"
+    probabilities: Dict[str, float]
+
+    @property
+    def urgent(self) -> bool:
+        return self.level in ("High", "Critical")
+
+    @property
+    def ambiguous(self) -> bool:
+        return self.source == "model" and not self.urgent and self.confidence < TRIAGE_MIN_CONFIDENCE
+
+def red_flags(text: str) -> List[str]:
+    """Non-negated red-flag phrases in `text`."""
+    return [m.symptom for m in find_mentions(tokenize(text), _red_flags) if not m.negated]
+
+def _features(text: str) -> List[str]:
+    tokens = [t for t in tokenize(text) if t.isalnum() or "'" in t]
+    feats = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    # Canonical lexicon symptoms generalize across synonyms ("dizzy" ~ "lightheaded")
+    for m in find_mentions(tokenize(text)):
+        feats.append(f"neg:{m.symptom}" if m.negated else f"sym:{m.symptom}")
+    return feats
+
+class TriageClassifier:
+    def __init__(self, samples: List[Tuple[str, str]], epochs: int = 500, lr: float = 2.0, l2: float = 1e-3):
+        docs = [Counter(_features(text)) for text, _ in samples]
+        df = Counter(f for doc in docs for f in doc)
+        self.vocab = {f: i for i, f in enumerate(sorted(df))}
+        n = len(docs)
+        self.idf = np.array([math.log((1 + n) / (1 + df[f])) + 1 for f in sorted(df)], dtype=np.float32)
+
+        X = np.zeros((n, len(self.vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            idx, vals = self._vectorize(doc)
+            X[row, idx] = vals
+        y = np.array([LEVELS.index(level) for _, level in samples])
+        Y = np.eye(len(LEVELS), dtype=np.float32)[y]
+
+        # Multinomial logistic regression, full-batch gradient descent
+        self.W = np.zeros((len(self.vocab), len(LEVELS)), dtype=np.float32)
+        self.b = np.zeros(len(LEVELS), dtype=np.float32)
+        for _ in range(epochs):
+            P = self._softmax(X @ self.W + self.b)
+            grad = (P - Y) / n
+            self.W -= lr * (X.T @ grad + l2 * self.W)
+            self.b -= lr * grad.sum(axis=0)
+
+    def _vectorize(self, counts: Counter) -> Tuple[List[int], np.ndarray]:
+        idx = [self.vocab[f] for f in counts if f in self.vocab]
+        if not idx:
+            return [], np.zeros(0, dtype=np.float32)
+        vals = np.array([1 + math.log(counts[f]) for f in counts if f in self.vocab], dtype=np.float32) * self.idf[idx]
+        return idx, vals / np.linalg.norm(vals)
+
+    @staticmethod
+    def _softmax(z: np.ndarray) -> np.ndarray:
+        z = z - z.max(axis=-1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=-1, keepdims=True)
+
+    def predict(self, text: str) -> TriageResult:
+        # Only the rows of W for features present in the text: microseconds
+        idx, vals = self._vectorize(Counter(_features(text)))
+        logits = self.b + (vals @ self.W[idx] if idx else 0)
+        probs = self._softmax(logits)
+        best = int(np.argmax(probs))
+        return TriageResult(LEVELS[best], float(probs[best]), "model", dict(zip(LEVELS, map(lambda p: round(float(p), 4), probs))))
+
+def load_training_data(path: str = TRIAGE_TRAINING_FILE) -> List[Tuple[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [(row["text"], row["level"]) for row in csv.DictReader(f) if row.get("level") in LEVELS]
+
+@lru_cache(maxsize=1)
+def get_classifier() -> TriageClassifier:
+    samples = load_training_data()
+    print(f"TRIAGE: Training classifier on {len(samples)} labeled examples.")
+    return TriageClassifier(samples)
+
+_stats = Counter()
+
+def classify_risk(text: str) -> TriageResult:
+    flags = red_flags(text)
+    if flags:
+        result = TriageResult("Critical", 1.0, "rule", {"Critical": 1.0})
+    else:
+        result = get_classifier().predict(text)
+    _stats["ambiguous" if result.ambiguous else result.source] += 1
+    return result
+
+def triage_metrics() -> Dict[str, Any]:
+    return dict(_stats)
+
+if __name__ == "__main__":
+    for q in sys.argv[1:]:
+        r = classify_risk(q)
+        print(f"{r.level:>9} {r.confidence:.2f} {r.source}{' (ambiguous)' if r.ambiguous else ''}  {q}")
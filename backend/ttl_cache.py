@@ -0,0 +1,81 @@
+# backend/ttl_cache.py
+"""
+Bounded in-process key/value cache with per-entry expiry.
+
+Entries are evicted LRU-first once max_entries is reached and dropped on
+read once older than their TTL. `sliding=True` restarts the TTL on every
+read (session-style expiry) instead of counting from the write.
+
+Not shared between worker processes: each uvicorn worker keeps its own.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+_MISSING = object()
+
+class TTLCache(Generic[V]):
+    def __init__(self, name: str, max_entries: int, ttl: float, sliding: bool = False):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sliding = sliding
+        self._entries: "OrderedDict[Hashable, Tuple[float, V]]" = OrderedDict() # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._entries.get(key)
+        now = time.monotonic()
+        if item is None or item[0] <= now:
+            if item is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key) # LRU touch
+        if self.sliding:
+            self._entries[key] = (now + self.ttl, item[1])
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._entries.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._entries.clear()
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for k in expired:
+            del self._entries[k]
+        return len(expired)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
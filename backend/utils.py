@@ -4,6 +4,15 @@ from sqlalchemy.future import select
 from datetime import time, date, timedelta
 import random
 from .models import Doctor, AvailabilitySlot
+from .doctor_directory import doctor_directory
+
+# Every department offered in the chat (utter_ask_department) needs a doctor here
+SEED_DOCTORS = [
+    ("Dr. Sarah Smith", "Cardiology"), ("Dr. James Wilson", "Cardiology"),
+    ("Dr. John Doe", "General Medicine"), ("Dr. Emily Chen", "General Medicine"),
+    ("Dr. Lisa Kudrow", "Dermatology"), ("Dr. Shaun Murphy", "Pediatrics"),
+    ("Dr. Stephen Strange", "Surgery")
+] # (Add full list if desired)
 
 async def create_initial_data(session: AsyncSession):
     result = await session.execute(select(Doctor))
@@ -14,14 +23,7 @@ async def create_initial_data(session: AsyncSession):
     print("Database: Generating Doctors & Slots (Including Sundays)...")
     
     # 1. Doctors List (Same as before)
-    doctors_data = [
-        ("Dr. Sarah Smith", "Cardiology"), ("Dr. James Wilson", "Cardiology"),
-        ("Dr. John Doe", "General Medicine"), ("Dr. Emily Chen", "General Medicine"),
-        ("Dr. Lisa Kudrow", "Dermatology"), ("Dr. Shaun Murphy", "Pediatrics"),
-        ("Dr. Stephen Strange", "Surgery")
-    ] # (Add full list if desired)
-
-    all_doctors = [Doctor(name=n, specialty=s) for n, s in doctors_data]
+    all_doctors = [Doctor(name=n, specialty=s) for n, s in SEED_DOCTORS]
     session.add_all(all_doctors)
     await session.flush()
 
@@ -40,4 +42,5 @@ async def create_initial_data(session: AsyncSession):
     
     session.add_all(slots)
     await session.commit()
+    doctor_directory.invalidate()
     print("Database: Full schedule generated.")
\ No newline at end of file
@@ -1,8 +1,9 @@
-from typing import Any, Text, Dict, List
+from typing import Any, Text, Dict, List, Optional
 from rasa_sdk import Action, Tracker, FormValidationAction
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.types import DomainDict
 from rasa_sdk.events import SlotSet, FollowupAction, Restarted, AllSlotsReset, ActiveLoop
+import os
 import requests
 import datetime
 import re
@@ -10,6 +11,36 @@ import json
 
 BACKEND_URL = "http://127.0.0.1:8000"
 
+# Identifies us to the backend's session routes (see ACTION_SERVER_TOKEN there)
+ACTION_HEADERS = {"X-Action-Token": os.getenv("ACTION_SERVER_TOKEN", "")}
+
+# --- HELPER: WHO IS THIS SENDER? ---
+def resolve_patient_id(tracker: Tracker) -> Optional[Text]:
+    """The patient_id slot, else the backend session bound to this sender at login/registration."""
+    pid = tracker.get_slot("patient_id")
+    if pid:
+        return pid
+    try:
+        resp = requests.get(f"{BACKEND_URL}/sessions/{tracker.sender_id}", headers=ACTION_HEADERS, timeout=5)
+        if resp.status_code == 200:
+            return resp.json().get("patient_id")
+    except Exception:
+        pass
+    return None
+
+# --- HELPER: DOCTOR NAME -> ID ---
+def resolve_doctor_id(doc_name: Optional[Text], default: int = 1) -> int:
+    """Best match from the backend's doctor index; the default doctor if nothing matches."""
+    if not doc_name:
+        return default
+    try:
+        resp = requests.get(f"{BACKEND_URL}/appointments/doctors/resolve", params={"name": doc_name, "limit": 1}, timeout=5)
+        if resp.status_code == 200 and resp.json():
+            return resp.json()[0]["id"]
+    except Exception:
+        pass
+    return default
+
 # --- HELPER: MAIN MENU BUTTONS ---
 def get_main_menu_buttons():
     return [
@@ -38,34 +69,19 @@ class ActionRestartConversation(Action):
     def name(self) -> Text: return "action_restart_conversation"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         dispatcher.utter_message(text="🔒 **Logging out...**\nClearing session.")
+        try: requests.delete(f"{BACKEND_URL}/sessions/{tracker.sender_id}", headers=ACTION_HEADERS, timeout=5)
+        except: pass
         dispatcher.utter_message(json_message={"custom": {"logout": True}})
         return [Restarted()]
 
 # -------------------------------------------------------------------------
-# 2. STATUS REPORT (FIX: HISTORY SCANNER for PID)
+# 2. STATUS REPORT
 # -------------------------------------------------------------------------
 class ActionShowAppointmentMenu(Action):
     def name(self) -> Text: return "action_show_appointment_menu"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        # 1. Try to get ID from Slot
-        pid = tracker.get_slot("patient_id")
-        
-        # 2. SAFETY NET: If Slot is empty, Scan History
-        if not pid:
-            print("DEBUG: Slot 'patient_id' is missing. Scanning history...")
-            for event in reversed(tracker.events):
-                if event.get("event") == "user" and "text" in event:
-                    text = event.get("text", "")
-                    # Look for pattern PID-12345
-                    match = re.search(r'PID-\d+', text, re.IGNORECASE)
-                    if match:
-                        pid = match.group(0).upper()
-                        print(f"DEBUG: Recovered {pid} from history.")
-                        break
-        
-        # 3. Fallback
-        if not pid: 
-            pid = "PID-GUEST"
+        # Slot, else the sender's backend session (no history scan)
+        pid = resolve_patient_id(tracker) or "PID-GUEST"
 
         try:
             resp = requests.get(f"{BACKEND_URL}/appointments/status/{pid}")
@@ -148,6 +164,9 @@ class ValidateAppointmentForm(FormValidationAction):
                     btns.append({"title": "Any Available Doctor", "payload": "Any Available Doctor"})
                     d.utter_message(text=f"Physicians available in {v}:", buttons=btns)
                     return {"department": v}
+            elif resp.status_code == 404:
+                d.utter_message(text=f"I couldn't find a department called '{v}'. Please reply with just the department, e.g. Cardiology, Dermatology or Pediatrics. (For symptoms like chest pain, use 🩺 Check Symptoms.)")
+                return {"department": None}
         except: pass
         return {"department": v}
 
@@ -178,17 +197,12 @@ class ActionSubmitAppointment(Action):
     def name(self) -> Text: return "action_submit_appointment"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         try:
-            pid = tracker.get_slot("patient_id") or "PID-GUEST"
+            pid = resolve_patient_id(tracker) or "PID-GUEST"
             doc_name = tracker.get_slot("doctor_name")
             mode = tracker.get_slot("consultation_mode")
             
-            # Map ID - John Doe REMOVED
-            doc_id = 1
-            if doc_name:
-                n = doc_name.lower()
-                if "chen" in n: doc_id = 4
-                elif "smith" in n: doc_id = 1
-                elif "wilson" in n: doc_id = 2
+            # Map name -> ID ("Any Available Doctor" and unknown names fall back to doctor 1)
+            doc_id = resolve_doctor_id(doc_name)
             
             payload = {
                 "patient_id": pid, "doctor_id": doc_id, 
@@ -248,7 +262,7 @@ class ActionTriggerUpload(Action):
 class ActionOrderOTC(Action):
     def name(self) -> Text: return "action_order_otc"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        pid = tracker.get_slot("patient_id") or "PID-GUEST"
+        pid = resolve_patient_id(tracker) or "PID-GUEST"
         try:
             requests.post(f"{BACKEND_URL}/pharmacy/order_otc", json={"patient_id": pid})
             dispatcher.utter_message(text="💊 **OTC Request Placed.**\nCheck Dashboard for status.")
@@ -278,7 +292,7 @@ class ActionSubmitLabBooking(Action):
     def name(self) -> Text: return "action_submit_lab_booking"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
         test_name = next(tracker.get_latest_entity_values("test_name"), "General Test")
-        pid = tracker.get_slot("patient_id") or "PID-GUEST"
+        pid = resolve_patient_id(tracker) or "PID-GUEST"
         try:
             requests.post(f"{BACKEND_URL}/appointments/book_lab", json={"patient_id": pid, "test_name": test_name})
             dispatcher.utter_message(text=f"✅ **Booked:** {test_name}\nStatus: Scheduled")
@@ -338,10 +352,11 @@ class ActionCreateNewPatient(Action):
         payload = {
             "name": s.get("patient_name"), "email": s.get("patient_email"),
             "phone": s.get("patient_phone"), "age": int(s.get("patient_age") or 0),
-            "gender": s.get("patient_gender"), "health_conditions": s.get("health_conditions")
+            "gender": s.get("patient_gender"), "health_conditions": s.get("health_conditions"),
+            "sender_id": tracker.sender_id
         }
         try:
-            resp = requests.post(f"{BACKEND_URL}/patients", json=payload)
+            resp = requests.post(f"{BACKEND_URL}/patients", json=payload, headers=ACTION_HEADERS)
             if resp.status_code == 200:
                 data = resp.json()
                 dispatcher.utter_message(text=f"🎉 **Registered!** ID: **{data['patient_id']}**")
@@ -363,8 +378,18 @@ class ActionLoginPatient(Action):
              dispatcher.utter_message(text="⚠️ That ID format looks wrong. It should look like 'PID-12345'.")
              return [SlotSet("patient_id", None)]
 
-        dispatcher.utter_message(text=f"✅ Logged in as **{pid}**.")
-        return [SlotSet("patient_id", pid), SlotSet("user_name", "Patient"), FollowupAction("action_suggest_next_steps")]
+        try:
+            resp = requests.post(f"{BACKEND_URL}/patients/login", json={"sender_id": tracker.sender_id, "patient_id": pid}, headers=ACTION_HEADERS, timeout=5)
+        except Exception:
+            dispatcher.utter_message(text="⚠️ Offline. Please try again shortly.")
+            return [SlotSet("patient_id", None)]
+        if resp.status_code != 200:
+            dispatcher.utter_message(text=f"❌ No patient found with ID **{pid}**.", buttons=[{"title": "🆔 Recover ID", "payload": "/forgotten_id"}])
+            return [SlotSet("patient_id", None)]
+
+        data = resp.json()
+        dispatcher.utter_message(text=f"✅ Logged in as **{data['name']}** ({data['patient_id']}).")
+        return [SlotSet("patient_id", data['patient_id']), SlotSet("user_name", data['name']), FollowupAction("action_suggest_next_steps")]
 
 class ActionLookupPatientId(Action):
     def name(self) -> Text: return "action_lookup_patient_id"
@@ -416,8 +441,21 @@ class ActionPayAtVisit(Action):
 class ActionRunTriage(Action):
     def name(self) -> Text: return "action_run_triage"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        symptoms = tracker.get_slot("symptom_description")
-        dispatcher.utter_message(text=f"🧠 **Analyzing:** {symptoms}...\nRecommended: General Consultation.")
+        symptoms = tracker.get_slot("symptom_description") or ""
+        try:
+            # Classified in the backend; emergencies are answered without an LLM call
+            resp = requests.post(f"{BACKEND_URL}/knowledge/triage", json={"query": symptoms, "patient_id": tracker.get_slot("patient_id")}, timeout=30)
+            result = resp.json()
+            level, ai_text = result.get("level"), result.get("response", "")
+        except Exception:
+            level, ai_text = None, ""
+
+        if level == "Critical":
+            dispatcher.utter_message(text=f"🟥 **CRITICAL ALERT**\nYour symptoms suggest a medical emergency.\n\n{ai_text}")
+        elif ai_text:
+            dispatcher.utter_message(text=f"**Symptom Analysis:**\n{ai_text}")
+        else:
+            dispatcher.utter_message(text="🟧 **Urgent Care**\nI couldn't analyze your symptoms right now. If they are severe, call emergency services; otherwise please consult a doctor.")
         return [FollowupAction("action_suggest_next_steps")]
 
 class ValidateSymptomCheckerForm(FormValidationAction):
@@ -427,7 +465,7 @@ class ValidateSymptomCheckerForm(FormValidationAction):
 class ActionCancelAppointment(Action):
     def name(self) -> Text: return "action_submit_cancel_form"
     def run(self, dispatcher: CollectingDispatcher, tracker: Tracker, domain: Dict[Text, Any]):
-        pid = tracker.get_slot("patient_id") or "PID-GUEST"
+        pid = resolve_patient_id(tracker) or "PID-GUEST"
         try:
             status_resp = requests.get(f"{BACKEND_URL}/appointments/status/{pid}")
             if status_resp.status_code == 200:
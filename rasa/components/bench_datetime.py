@@ -0,0 +1,80 @@
+# rasa/components/bench_datetime.py
+"""
+Local date/time/number extractor vs Duckling: latency and agreement.
+
+    cd rasa
+    python -m components.bench_datetime                                   # local only
+    python -m components.bench_datetime --duckling http://localhost:8008  # compare
+
+Agreement = both return the same set of (entity, value[, grain]) for a
+message; time values are compared to the minute, ignoring the UTC offset.
+"""
+import sys
+import json
+import time
+import statistics
+from datetime import datetime, timezone
+
+from .datetime_parser import parse
+
+SAMPLES = [
+    "tomorrow", "today", "day after tomorrow", "next Monday", "this friday", "on wednesday",
+    "2:30 pm", "2pm", "14:30", "at 9", "noon", "midnight",
+    "2025-11-20", "2025-11-20T14:30", "tomorrow at 3pm", "3pm tomorrow", "friday at 10:30",
+    "next monday 9am", "in 3 days", "in 2 weeks", "next week",
+    "dec 25th", "25 December", "12/25", "11/30/2025",
+    "I need 2 tablets", "twenty one", "age 34", "book me for thursday at 4:15 pm please",
+]
+ROUNDS = 200
+REFERENCE = datetime(2025, 11, 4, 10, 0, tzinfo=timezone.utc) # A Tuesday morning
+
+def _key(entity: dict):
+    if entity["entity"] == "time":
+        return ("time", str(entity["value"])[:16], entity.get("additional_info", {}).get("grain"))
+    return ("number", float(entity["value"]))
+
+def duckling_parse(url: str, text: str):
+    import requests
+    resp = requests.post(f"{url.rstrip('/')}/parse", data={
+        "locale": "en_US", "text": text, "tz": "UTC",
+        "reftime": int(REFERENCE.timestamp() * 1000), "dims": json.dumps(["time", "number"]),
+    }, timeout=5)
+    resp.raise_for_status()
+    return [
+        {"entity": m["dim"], "value": m["value"].get("value"), "additional_info": m["value"]}
+        for m in resp.json() if m["dim"] in ("time", "number") and "value" in m["value"]
+    ]
+
+def timed(fn, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        for text in SAMPLES:
+            t = time.perf_counter()
+            fn(text)
+            samples.append(time.perf_counter() - t)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+def main(duckling_url=None):
+    local = lambda text: parse(text, REFERENCE, ["time", "number"], timezone.utc)
+    med, p99 = timed(local, ROUNDS)
+    print(f"local:    median {med * 1e6:8.1f} us   p99 {p99 * 1e6:8.1f} us")
+    if not duckling_url:
+        return
+
+    med, p99 = timed(lambda text: duckling_parse(duckling_url, text), 5)
+    print(f"duckling: median {med * 1e6:8.1f} us   p99 {p99 * 1e6:8.1f} us")
+
+    agree = 0
+    for text in SAMPLES:
+        ours = {_key(e) for e in local(text)}
+        theirs = {_key(e) for e in duckling_parse(duckling_url, text)}
+        if ours == theirs:
+            agree += 1
+        else:
+            print(f"  differs: {text!r}\n    local:    {sorted(ours, key=str)}\n    duckling: {sorted(theirs, key=str)}")
+    print(f"agreement: {agree}/{len(SAMPLES)} ({agree / len(SAMPLES):.0%})")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(args[args.index("--duckling") + 1] if "--duckling" in args else None)
@@ -0,0 +1,63 @@
+# rasa/components/datetime_extractor.py
+"""
+In-process replacement for DucklingEntityExtractor.
+
+Same entities ("time", "number") and value format, parsed by
+components.datetime_parser with compiled regexes - no HTTP round trip and
+no Duckling server to run. In config.yml:
+
+    - name: components.datetime_extractor.LocalDateTimeExtractor
+      dimensions: [time, number]
+      timezone: UTC
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Text
+from zoneinfo import ZoneInfo
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.extractors.extractor import EntityExtractorMixin
+from rasa.shared.nlu.constants import ENTITIES, TEXT
+from rasa.shared.nlu.training_data.message import Message
+
+from .datetime_parser import parse
+
+@DefaultV1Recipe.register(DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR, is_trainable=False)
+class LocalDateTimeExtractor(GraphComponent, EntityExtractorMixin):
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            "dimensions": ["time", "number"], # Same names as Duckling's
+            "timezone": None, # IANA name; default: TZ env, else UTC
+        }
+
+    def __init__(self, config: Dict[Text, Any]) -> None:
+        self.component_config = config
+        self.tz = ZoneInfo(config.get("timezone") or os.getenv("TZ") or "UTC")
+
+    @classmethod
+    def create(cls, config: Dict[Text, Any], model_storage: ModelStorage, resource: Resource, execution_context: ExecutionContext) -> "LocalDateTimeExtractor":
+        return cls(config)
+
+    def _reference_time(self, message: Message) -> datetime:
+        # Like Duckling: the message timestamp (ms) if the channel sent one
+        ref = message.get("time")
+        if ref:
+            try:
+                return datetime.fromtimestamp(int(ref) / 1000, self.tz)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return datetime.now(self.tz)
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        for message in messages:
+            text: Optional[Text] = message.get(TEXT)
+            if not text:
+                continue
+            entities = parse(text, self._reference_time(message), self.component_config["dimensions"], self.tz)
+            entities = self.add_extractor_name(entities)
+            message.set(ENTITIES, message.get(ENTITIES, []) + entities, add_to_output=True)
+        return messages
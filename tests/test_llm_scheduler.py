@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.llm_scheduler import LLMScheduler, Priority, RateBudget
+
+def _budget(limit, remaining, reset_in=60.0):
+    budget = RateBudget()
+    budget.update({
+        "x-ratelimit-limit-tokens": str(limit),
+        "x-ratelimit-remaining-tokens": str(remaining),
+        "x-ratelimit-reset-tokens": f"{reset_in}s",
+    }, time.monotonic())
+    return budget
+
+def test_call_within_the_share_starts_now():
+    budget = _budget(1000, 1000)
+    assert budget.wait_time(Priority.BACKGROUND, 700, time.monotonic()) == 0
+    assert budget.wait_time(Priority.BACKGROUND, 701, time.monotonic()) == 0 # Clamped to the share
+
+def test_reserve_holds_back_lower_classes():
+    budget = _budget(1000, 500)
+    now = time.monotonic()
+    assert budget.wait_time(Priority.BACKGROUND, 300, now) > 0
+    assert budget.wait_time(Priority.TRIAGE, 300, now) == 0
+
+@pytest.mark.parametrize("priority", list(Priority))
+def test_oversized_call_starts_once_the_budget_is_full(priority):
+    budget = _budget(1000, 1000)
+    assert budget.wait_time(priority, 50_000, time.monotonic()) == 0
+
+    budget = _budget(1000, 990, reset_in=30.0)
+    now = time.monotonic()
+    assert 0 < budget.wait_time(priority, 50_000, now) <= 30.0
+    assert budget.wait_time(priority, 50_000, now + 31.0) == 0
+
+@pytest.mark.anyio
+async def test_oversized_call_does_not_block_its_queue():
+    scheduler = LLMScheduler(max_concurrency=2)
+    scheduler.budget = _budget(1000, 1000, reset_in=0.2)
+    done = []
+
+    async def call(name):
+        done.append(name)
+
+    await asyncio.wait_for(asyncio.gather(
+        scheduler.run(Priority.QA, lambda: call("huge"), tokens=50_000),
+        scheduler.run(Priority.QA, lambda: call("small"), tokens=10),
+    ), timeout=2)
+    # The huge call used up the window; the small one goes after the reset, not never
+    assert done == ["huge", "small"]
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from backend import rag_ingest
+
+DIM = 8
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_ingest, "RAG_INDEX_DIR", str(tmp_path))
+    return tmp_path
+
+def _index(seed):
+    rng = np.random.default_rng(seed)
+    texts = [f"policy {seed}-{i}" for i in range(20)]
+    vectors = rng.random((len(texts), DIM)).tolist()
+    return FAISS.from_embeddings(list(zip(texts, vectors)), FakeEmbeddings(size=DIM), ids=texts)
+
+def _mapped(path):
+    with open("/proc/self/maps") as f:
+        return any(line.rstrip().endswith(str(path)) for line in f)
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc")
+def test_saved_index_is_memory_mapped(index_dir):
+    manifest = rag_ingest.save_index(_index(1), "a" * 64, {})
+    path = index_dir / f"{manifest['version']}.faiss"
+
+    loaded = rag_ingest.load_index(manifest, FakeEmbeddings(size=DIM))
+    assert loaded.index.ntotal == 20
+    assert _mapped(path)
+
+    private = rag_ingest.load_index(manifest, FakeEmbeddings(size=DIM), mmap=False)
+    assert private.index.ntotal == 20
+
+def test_previous_version_survives_one_generation(index_dir):
+    first = rag_ingest.save_index(_index(1), "a" * 64, {})
+    second = rag_ingest.save_index(_index(2), "b" * 64, {})
+
+    # A worker that read the first manifest can still load it
+    assert second["previous_version"] == first["version"]
+    assert rag_ingest.load_index(first, FakeEmbeddings(size=DIM)).index.ntotal == 20
+
+    third = rag_ingest.save_index(_index(3), "c" * 64, {})
+    files = {p.name for p in index_dir.iterdir()}
+    assert f"{first['version']}.faiss" not in files and f"{first['version']}.pkl" not in files
+    assert {f"{v}.{ext}" for v in (second["version"], third["version"]) for ext in ("faiss", "pkl")} <= files
+
+def test_resaving_the_same_version_keeps_the_previous_one(index_dir):
+    first = rag_ingest.save_index(_index(1), "a" * 64, {})
+    rag_ingest.save_index(_index(2), "b" * 64, {})
+    again = rag_ingest.save_index(_index(2), "b" * 64, {})
+    assert again["previous_version"] == first["version"]
+    assert (index_dir / f"{first['version']}.faiss").exists()
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.models import ChatSession
+from backend.session_store import SessionStore
+
+@pytest.fixture
+async def workers(tmp_path):
+    """Two session factories on one database, standing in for two uvicorn workers."""
+    url = f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}"
+    engines = [create_async_engine(url), create_async_engine(url)]
+    async with engines[0].begin() as conn:
+        await conn.run_sync(lambda c: ChatSession.metadata.create_all(c, tables=[ChatSession.__table__]))
+    yield [async_sessionmaker(e, expire_on_commit=False) for e in engines]
+    for e in engines:
+        await e.dispose()
+
+@pytest.mark.anyio
+async def test_session_bound_on_one_worker_is_seen_by_another(workers):
+    a, b = SessionStore(), SessionStore()
+    async with workers[0]() as db:
+        await a.bind(db, "sender-1", "PID-1001", "Ada")
+    async with workers[1]() as db:
+        session = await b.get(db, "sender-1")
+        assert (session.patient_id, session.name) == ("PID-1001", "Ada")
+
+        # Logging in again as someone else rebinds the sender
+        await b.bind(db, "sender-1", "PID-1002", "Grace")
+    async with workers[0]() as db:
+        assert (await a.get(db, "sender-1")).patient_id == "PID-1002"
+        assert (await a.unbind(db, "sender-1")).patient_id == "PID-1002"
+    async with workers[1]() as db:
+        assert await b.get(db, "sender-1") is None
+
+@pytest.mark.anyio
+async def test_idle_sessions_expire(workers, monkeypatch):
+    store = SessionStore(ttl=60)
+    async with workers[0]() as db:
+        await store.bind(db, "sender-1", "PID-1001", "Ada")
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 30)
+        assert await store.get(db, "sender-1") is not None # Touch restarts the TTL
+        monkeypatch.setattr(time, "time", lambda: now + 80)
+        assert await store.get(db, "sender-1") is not None
+        monkeypatch.setattr(time, "time", lambda: now + 200)
+        assert await store.get(db, "sender-1") is None
+        assert await store.unbind(db, "sender-1") is None
+        assert (await store.metrics(db))["entries"] == 0
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+import yaml
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from backend.models import Doctor, Specialty, SpecialtyAlias
+from backend.specialties import normalize_department, resolve_specialty, seed_specialties
+from backend.utils import SEED_DOCTORS
+
+DOMAIN = os.path.join(os.path.dirname(__file__), "..", "rasa", "data", "domain.yml")
+
+def _department_buttons():
+    with open(DOMAIN) as f:
+        domain = yaml.safe_load(f)
+    return [b["payload"] for r in domain["responses"]["utter_ask_department"] for b in r.get("buttons", [])]
+
+@pytest.fixture
+async def session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'specialties.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Doctor.metadata.create_all(c, tables=[Specialty.__table__, SpecialtyAlias.__table__, Doctor.__table__]))
+    async with async_sessionmaker(engine, expire_on_commit=False)() as s:
+        s.add_all([Doctor(name=n, specialty=sp) for n, sp in SEED_DOCTORS])
+        await s.commit()
+        await seed_specialties(s)
+        yield s
+    await engine.dispose()
+
+@pytest.mark.anyio
+async def test_every_department_button_has_doctors(session):
+    payloads = _department_buttons()
+    assert payloads
+    for payload in payloads:
+        specialty = await resolve_specialty(session, payload)
+        assert specialty is not None, f"{payload!r} does not resolve"
+        doctors = (await session.execute(select(Doctor).where(Doctor.specialty_id == specialty.id))).scalars().all()
+        assert doctors, f"no seeded doctor for {payload!r}"
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("text, expected", [
+    ("heart", "Cardiology"),
+    ("cardiology please", "Cardiology"),
+    ("I need to see a skin doctor", "Dermatology"),
+    ("Paediatrician", "Pediatrics"),
+])
+async def test_aliases_resolve(session, text, expected):
+    assert (await resolve_specialty(session, text)).name == expected
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("text", ["chest pain", "fever", "rash", "Neurology"])
+async def test_symptoms_and_unknown_departments_do_not_resolve(session, text):
+    assert await resolve_specialty(session, text) is None
+
+def test_normalize_department():
+    assert normalize_department("The Cardiology Department") == "cardiology"
+    assert normalize_department("Doctor") == "doctor"
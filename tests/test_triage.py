@@ -0,0 +1,86 @@
+import pytest
+
+from backend import llm_integration
+from backend.config import TRIAGE_MIN_CONFIDENCE
+from backend.triage_classifier import TriageResult, classify_risk, red_flags
+
+@pytest.mark.parametrize("text", [
+    "chest pain",
+    "I have chest pain since this morning",
+    "crushing chest pain spreading to my arm",
+    "my lips are turning blue",
+    "his lips went blue",
+    "blue lips and I can't breathe",
+    "I think I'm having a stroke",
+])
+def test_red_flags_are_critical(text):
+    result = classify_risk(text)
+    assert red_flags(text)
+    assert (result.level, result.source, result.ambiguous) == ("Critical", "rule", False)
+
+@pytest.mark.parametrize("text", [
+    "no chest pain",
+    "I don't have chest pain, just a cough",
+    "runny nose and sneezing",
+])
+def test_negated_or_absent_red_flags_do_not_fire(text):
+    assert red_flags(text) == []
+    assert classify_risk(text).source == "model"
+
+def _model(level, confidence):
+    return TriageResult(level, confidence, "model", {level: confidence})
+
+@pytest.mark.parametrize("level", ["Low", "Moderate"])
+def test_unsure_low_and_moderate_are_ambiguous(level):
+    assert _model(level, TRIAGE_MIN_CONFIDENCE - 0.01).ambiguous
+    assert not _model(level, TRIAGE_MIN_CONFIDENCE).ambiguous
+
+@pytest.mark.parametrize("level", ["High", "Critical"])
+def test_high_and_critical_are_never_ambiguous(level):
+    assert not _model(level, 0.3).ambiguous
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+    async def fake_query_llm(query, patient_id=None):
+        calls.append(query)
+        return "**Risk Level:** Moderate\n**Clinical Assessment:** x\n**Recommended Action:** y"
+    monkeypatch.setattr(llm_integration, "query_llm", fake_query_llm)
+    return calls
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("text", ["chest pain", "difficulty breathing", "bleeding a lot"])
+async def test_urgent_triage_never_waits_on_the_llm(text, llm_calls):
+    out = await llm_integration.triage_query(text)
+    assert out["level"] in ("High", "Critical")
+    assert out["source"] != "llm"
+    assert llm_calls == []
+
+@pytest.mark.anyio
+async def test_ambiguous_triage_goes_to_the_llm(monkeypatch, llm_calls):
+    monkeypatch.setattr(llm_integration, "classify_risk", lambda q: _model("Moderate", TRIAGE_MIN_CONFIDENCE - 0.1))
+    out = await llm_integration.triage_query("something vague")
+    assert (out["source"], out["level"], llm_calls) == ("llm", "Moderate", ["something vague"])
+
+@pytest.mark.anyio
+async def test_stream_answers_emergencies_locally(monkeypatch):
+    def no_llm(*args, **kwargs):
+        raise AssertionError("LLM called for an emergency")
+    monkeypatch.setattr(llm_integration, "get_llm", no_llm)
+    parts = [p async for p in llm_integration.stream_llm("my lips are turning blue")]
+    assert len(parts) == 1 and "**Risk Level:** Critical" in parts[0]
+
+@pytest.mark.anyio
+async def test_similar_triage_messages_are_not_answered_from_each_other(monkeypatch):
+    calls = []
+    class Reply:
+        def __init__(self, content): self.content = content
+    async def fake_invoke_llm(site, messages, cache=False):
+        calls.append(messages[-1].content)
+        return Reply(f"**Risk Level:** {'High' if 'severe' in messages[-1].content else 'Low'}")
+    monkeypatch.setattr(llm_integration, "invoke_llm", fake_invoke_llm)
+
+    mild = await llm_integration.query_llm("mild headache for two days")
+    severe = await llm_integration.query_llm("severe headache for two days")
+    assert calls == ["mild headache for two days", "severe headache for two days"]
+    assert "Low" in mild and "High" in severe